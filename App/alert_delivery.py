@@ -0,0 +1,260 @@
+import itertools
+import queue
+import random
+import smtplib
+import threading
+import time
+from email import policy
+from email.message import EmailMessage
+from email.utils import formataddr
+from metrics import REGISTRY as metrics
+
+# Delivery states reported on a DeliveryReceipt.
+QUEUED = "queued"
+SENT = "sent"
+FAILED = "failed"
+
+
+def build_template(sender, subject, body):
+    """
+    Renders the headers and body shared by every recipient of an alert.
+    Args:
+        sender (str): From address.
+        subject (str): Email subject.
+        body (str): Plain-text email body.
+    Returns:
+        bytes: The message without its To header, with CRLF line endings.
+    """
+    msg = EmailMessage(policy=policy.SMTP)
+    msg["From"] = sender
+    msg["Subject"] = subject
+    msg.set_content(body)
+    return msg.as_bytes()
+
+
+class DeliveryReceipt:
+    """
+    Status of one alert to one recipient, updated by the delivery worker.
+    """
+    __slots__ = ("message_id", "recipient", "status", "attempts", "error", "sent_at", "_done")
+
+    def __init__(self, message_id, recipient):
+        self.message_id = message_id
+        self.recipient = recipient
+        self.status = QUEUED
+        self.attempts = 0
+        self.error = None
+        self.sent_at = None
+        self._done = threading.Event()
+
+    def _finish(self, status, error=None):
+        self.status = status
+        self.error = error
+        if status == SENT:
+            self.sent_at = time.time()
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """
+        Blocks until the message is sent or has failed for good.
+        Args:
+            timeout (float): Maximum seconds to wait.
+        Returns:
+            str: Current status.
+        """
+        self._done.wait(timeout)
+        return self.status
+
+    def as_dict(self):
+        return {
+            "message_id": self.message_id,
+            "recipient": self.recipient,
+            "status": self.status,
+            "attempts": self.attempts,
+            "error": self.error
+        }
+
+
+class AlertDeliveryService:
+    """
+    Sends alert emails from a queue on a pool of worker threads. Each worker
+    keeps one SMTP connection open across messages, so the TCP/TLS handshake
+    and login are paid once per worker instead of once per alert. Message
+    bodies are rendered once per alert and shared by all its recipients.
+    Transient failures (dropped connections, 4xx replies) are retried with
+    jittered exponential backoff; 5xx replies fail the message at once.
+    """
+    def __init__(self, host, port, sender, username=None, password=None, use_tls=True,
+                 pool_size=8, max_attempts=3, min_backoff=0.5, max_backoff=30.0, timeout=10.0):
+        """
+        Args:
+            host (str): SMTP server.
+            port (int): SMTP port.
+            sender (str): Envelope and From address.
+            username, password (str): Login credentials; None skips login.
+            use_tls (bool): Whether to STARTTLS after connecting.
+            pool_size (int): Worker threads, each with one SMTP connection.
+            max_attempts (int): Attempts per message before it is marked failed.
+            min_backoff, max_backoff (float): Retry delay bounds in seconds.
+            timeout (float): Socket timeout of the SMTP connections.
+        """
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.pool_size = pool_size
+        self.max_attempts = max_attempts
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.connections_opened = 0
+        self._ids = itertools.count(1)
+        self._queue = queue.SimpleQueue()
+        self._workers = []
+        self._lock = threading.Lock()
+        # Guards the counters, which every worker updates.
+        self._counts_lock = threading.Lock()
+
+    def _ensure_workers(self):
+        with self._lock:
+            if self._workers:
+                return
+            for i in range(self.pool_size):
+                worker = threading.Thread(target=self._run, name=f"alert-delivery-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def submit(self, recipients, subject, body):
+        """
+        Queues one alert for a list of recipients and returns at once.
+        Args:
+            recipients (List[str]): Recipient email addresses.
+            subject (str): Email subject.
+            body (str): Plain-text email body.
+        Returns:
+            List[DeliveryReceipt]: One receipt per recipient; raises ValueError, queuing
+            nothing, if an address contains a line break.
+        """
+        for recipient in recipients:
+            if "\r" in recipient or "\n" in recipient:
+                raise ValueError(f"Invalid recipient address: {recipient!r}")
+        self._ensure_workers()
+        template = build_template(self.sender, subject, body)
+        receipts = []
+        for recipient in recipients:
+            receipt = DeliveryReceipt(next(self._ids), recipient)
+            self._queue.put((receipt, template))
+            receipts.append(receipt)
+        return receipts
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+        except BaseException:
+            server.close()
+            raise
+        self._count("connections_opened")
+        return server
+
+    def _count(self, counter):
+        with self._counts_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _backoff(self, attempt):
+        delay = min(self.max_backoff, self.min_backoff * 2 ** (attempt - 1))
+        time.sleep(random.uniform(0, delay))
+
+    def _run(self):
+        server = None
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            receipt, template = item
+            while True:
+                receipt.attempts += 1
+                try:
+                    to = formataddr((None, receipt.recipient)).encode("utf-8")
+                    message = b"To: " + to + b"\r\n" + template
+                    if server is None:
+                        with metrics.timer("smtp_connect"):
+                            server = self._connect()
+                    with metrics.timer("smtp_send"):
+                        server.sendmail(self.sender, [receipt.recipient], message)
+                    self._count("sent")
+                    receipt._finish(SENT)
+                    break
+                except smtplib.SMTPRecipientsRefused as e:
+                    refusal = e.recipients.get(receipt.recipient)
+                    # 4xx refusals (mailbox busy, greylisting) are transient; the connection stays usable.
+                    transient = refusal is not None and 400 <= refusal[0] < 500
+                    if not transient or receipt.attempts >= self.max_attempts:
+                        self._count("failed")
+                        receipt._finish(FAILED, str(refusal or e))
+                        break
+                    self._count("retries")
+                    self._backoff(receipt.attempts)
+                except OSError as e:
+                    # SMTPException derives from OSError, so this also covers
+                    # dropped connections and error replies.
+                    permanent = isinstance(e, smtplib.SMTPResponseException) and e.smtp_code >= 500
+                    if not isinstance(e, smtplib.SMTPResponseException) or e.smtp_code == 421:
+                        server = None  # Connection is gone; reconnect on the next attempt.
+                    if permanent or receipt.attempts >= self.max_attempts:
+                        self._count("failed")
+                        receipt._finish(FAILED, str(e))
+                        break
+                    self._count("retries")
+                    self._backoff(receipt.attempts)
+                except Exception as e:
+                    # Anything else (a bad address or header, a bug) is not worth a retry,
+                    # but must not kill the worker and leave the receipt queued.
+                    if server is not None:
+                        server.close()  # The SMTP transaction may be half done.
+                        server = None
+                    self._count("failed")
+                    receipt._finish(FAILED, f"{type(e).__name__}: {e}")
+                    break
+        if server is not None:
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+
+    def close(self):
+        """
+        Stops the workers after the queued messages are delivered and closes their connections.
+        Args: None
+        Returns: None
+        """
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for _ in workers:
+            self._queue.put(None)
+        for worker in workers:
+            worker.join()
+
+    def stats(self):
+        """
+        Returns delivery counters.
+        Args: None
+        Returns: dict
+        """
+        with self._counts_lock:
+            return {
+                "queued": self._queue.qsize(),
+                "sent": self.sent,
+                "failed": self.failed,
+                "retries": self.retries,
+                "workers": len(self._workers),
+                "connections_opened": self.connections_opened
+            }
@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Escalation levels; index 0 means no alert.
+LEVEL_NAMES = ("none", "precaution", "warning", "critical")
+NONE, PRECAUTION, WARNING, CRITICAL = range(len(LEVEL_NAMES))
+
+
+def escalation_level(value, thresholds, current=NONE, hysteresis=0.0):
+    """
+    Maps a measurement to an escalation level. A level is entered when the
+    value passes its threshold, but only left once the value falls a further
+    hysteresis fraction of the threshold back, so readings hovering around a
+    boundary do not flip the level back and forth.
+    Args:
+        value (float): Measurement; larger means more dangerous.
+        thresholds (tuple): Ascending values above which PRECAUTION, WARNING and CRITICAL start.
+        current (int): Level currently held.
+        hysteresis (float): Fraction of a threshold the value must retreat to drop below it.
+    Returns:
+        int: New level.
+    """
+    level = sum(value > threshold for threshold in thresholds)
+    while level < current:
+        threshold = thresholds[current - 1]
+        if value > threshold - hysteresis * abs(threshold):
+            return current
+        current -= 1
+    return level
+
+
+class _AlertState:
+    __slots__ = ("level", "delivered_level", "delivered_at", "seen_at")
+
+    def __init__(self):
+        self.level = NONE
+        self.delivered_level = NONE
+        self.delivered_at = float("-inf")
+        self.seen_at = float("-inf")
+
+
+class AlertStateMachine:
+    """
+    Tracks the alert level of every (storm, recipient) pair in a dict and
+    decides which observations are worth a delivery. Only escalations are
+    delivered: an escalation past the highest level already sent goes out
+    at once, while re-escalating to a level sent within the cooldown window
+    is suppressed. De-escalations only update the state. Pairs not observed
+    for idle_ttl are dropped, oldest first, as are the least recently observed
+    pairs beyond max_tracked, so recipients that stop reporting do not pile up.
+    """
+    def __init__(self, cooldown=900.0, hysteresis=0.1, idle_ttl=86400.0, max_tracked=None):
+        """
+        Args:
+            cooldown (float): Seconds before the same or a lower level is delivered again.
+            hysteresis (float): Fraction of a threshold a reading must retreat to lower the level.
+            idle_ttl (float): Seconds after its last observation that a pair is dropped;
+                              never less than cooldown, so dropping a pair cannot cut a cooldown short.
+            max_tracked (int): Most pairs kept; None for no limit.
+        """
+        self.cooldown = cooldown
+        self.hysteresis = hysteresis
+        self.idle_ttl = max(idle_ttl, cooldown)
+        self.max_tracked = max_tracked
+        # Ordered by last observation, oldest first.
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+        self.observations = 0
+        self.deliveries = 0
+        self.suppressed = 0
+        self.evicted = 0
+
+    def _evict(self, now):
+        states = self._states
+        while states:
+            key, oldest = next(iter(states.items()))
+            within_limit = self.max_tracked is None or len(states) <= self.max_tracked
+            if within_limit and now - oldest.seen_at <= self.idle_ttl:
+                break
+            del states[key]
+            self.evicted += 1
+
+    def observe(self, storm_id, recipient, value, thresholds, minimum=NONE, now=None):
+        """
+        Feeds one measurement for a recipient and returns the level to deliver, if any.
+        Args:
+            storm_id: Storm the measurement refers to.
+            recipient: User, address or channel the alert would go to.
+            value (float): Measurement; larger means more dangerous.
+            thresholds (tuple): Ascending PRECAUTION, WARNING and CRITICAL thresholds.
+            minimum (int): Lowest level to report regardless of the value.
+            now (float): Current time.monotonic(); looked up if omitted.
+        Returns:
+            int: Level to deliver, or None when nothing should be sent.
+        """
+        now = time.monotonic() if now is None else now
+        key = (storm_id, recipient)
+        with self._lock:
+            self.observations += 1
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = _AlertState()
+            else:
+                self._states.move_to_end(key)
+            state.seen_at = now
+            self._evict(now)
+            previous = state.level
+            state.level = max(escalation_level(value, thresholds, previous, self.hysteresis), minimum)
+
+            if state.level <= previous:
+                if state.level == NONE and now - state.delivered_at >= self.cooldown:
+                    del self._states[key]
+                return None
+            if state.level <= state.delivered_level and now - state.delivered_at < self.cooldown:
+                self.suppressed += 1
+                return None
+            state.delivered_level = state.level
+            state.delivered_at = now
+            self.deliveries += 1
+            return state.level
+
+    def level(self, storm_id, recipient):
+        """
+        Args:
+            storm_id: Storm id.
+            recipient: Recipient.
+        Returns:
+            int: Level currently held for the pair.
+        """
+        state = self._states.get((storm_id, recipient))
+        return NONE if state is None else state.level
+
+    def forget_storm(self, storm_id):
+        """
+        Drops the state of every recipient of a storm.
+        Args:
+            storm_id: Storm id.
+        Returns: None
+        """
+        with self._lock:
+            for key in [key for key in self._states if key[0] == storm_id]:
+                del self._states[key]
+
+    def stats(self):
+        """
+        Returns state machine counters.
+        Args: None
+        Returns: dict
+        """
+        return {
+            "tracked": len(self._states),
+            "observations": self.observations,
+            "deliveries": self.deliveries,
+            "suppressed": self.suppressed,
+            "evicted": self.evicted
+        }
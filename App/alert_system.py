@@ -1,63 +1,90 @@
 from typing import List, Dict
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from alert_delivery import AlertDeliveryService
+from alert_state import AlertStateMachine, LEVEL_NAMES
 
 # Alert thresholds
 CYCLONIC_SEVERITY_THRESHOLD = 7.0
+# Severities above which precaution, warning and critical emails go out.
+SEVERITY_LEVEL_THRESHOLDS = (CYCLONIC_SEVERITY_THRESHOLD, 8.5, 9.5)
+# Seconds before a recipient is emailed again at a level they already received.
+ALERT_COOLDOWN = 1800.0
+ALERT_HYSTERESIS = 0.1
+
+# Recipients of the alert
+ALERT_RECIPIENTS = ["recipient1@example.com", "recipient2@example.com"]
 
 # Sample email notification configuration
 SMTP_SERVER = "smtp.gmail.com"
 SMTP_PORT = 587
 EMAIL_ADDRESS = "your_email@gmail.com"
 EMAIL_PASSWORD = "your_password"
+SMTP_USE_TLS = True
+
+# Delivery pool: one persistent SMTP connection per worker.
+ALERT_DELIVERY_WORKERS = 8
+ALERT_MAX_ATTEMPTS = 3
+
+delivery_service = AlertDeliveryService(
+    SMTP_SERVER, SMTP_PORT, EMAIL_ADDRESS,
+    username=EMAIL_ADDRESS, password=EMAIL_PASSWORD, use_tls=SMTP_USE_TLS,
+    pool_size=ALERT_DELIVERY_WORKERS, max_attempts=ALERT_MAX_ATTEMPTS
+)
+alert_states = AlertStateMachine(cooldown=ALERT_COOLDOWN, hysteresis=ALERT_HYSTERESIS)
 
 def send_email_alert(recipients: List[str], subject: str, message: str):
     """
+    Queues an email alert for delivery and returns without waiting for the SMTP server.
     Args:
         recipients (List[str]): List of recipient email addresses.
         subject (str): Email subject.
         message (str): Email body.
     Returns:
-        None
+        List[DeliveryReceipt]: Per-recipient delivery status, updated as messages are sent.
     """
-    try:
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()
-        server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-
-        for recipient in recipients:
-            msg = MIMEMultipart()
-            msg["From"] = EMAIL_ADDRESS
-            msg["To"] = recipient
-            msg["Subject"] = subject
-            msg.attach(MIMEText(message, "plain"))
-            server.sendmail(EMAIL_ADDRESS, recipient, msg.as_string())
-
-        server.quit()
-        print("Email alerts sent successfully.")
-    except Exception as e:
-        print(f"Failed to send email alerts: {e}")
-
-def check_cyclonic_alerts(weather_data: Dict):
+    return delivery_service.submit(recipients, subject, message)
+
+def check_cyclonic_alerts(weather_data: Dict, storm_id: str = "primary", recipients: List[str] = None):
     """
+    Emails recipients whose alert level for the storm escalated since their last alert.
+    Repeated calls at an unchanged level send nothing.
     Args:
         weather_data (Dict): Weather data containing at least 'Cyclonic Severity', 'Latitude', and 'Longitude'.
+        storm_id (str): Storm the weather data describes.
+        recipients (List[str]): Addresses to alert (default ALERT_RECIPIENTS).
     Returns:
-        dict: Alert status and message.
+        dict: Alert status and message; alert_triggered is True only if emails were queued.
     """
-    if weather_data.get("Cyclonic Severity", 0) > CYCLONIC_SEVERITY_THRESHOLD:
-        severity = weather_data["Cyclonic Severity"]
-        location = f"Lat: {weather_data['Latitude']}, Lon: {weather_data['Longitude']}"
-        subject = "Cyclone Alert: Severe Weather Detected!"
-        message = (
-            f"A cyclonic condition has been detected in your area.\n"
-            f"Location: {location}\n"
-            f"Severity: {severity}\n"
-            f"Please take necessary precautions immediately."
-        )
-        # Recipients of the alert
-        recipients = ["recipient1@example.com", "recipient2@example.com"]
-        send_email_alert(recipients, subject, message)
-        return {"alert_triggered": True, "message": message}
-    return {"alert_triggered": False, "message": "No severe weather detected."}
+    severity = weather_data.get("Cyclonic Severity", 0)
+    if severity <= CYCLONIC_SEVERITY_THRESHOLD:
+        # Still observed so that recipients can step down and later be re-alerted.
+        for recipient in recipients or ALERT_RECIPIENTS:
+            alert_states.observe(storm_id, recipient, severity, SEVERITY_LEVEL_THRESHOLDS)
+        return {"alert_triggered": False, "message": "No severe weather detected."}
+
+    # Group recipients by the level they escalated to, one email per level.
+    escalated = {}
+    for recipient in recipients or ALERT_RECIPIENTS:
+        level = alert_states.observe(storm_id, recipient, severity, SEVERITY_LEVEL_THRESHOLDS)
+        if level is not None:
+            escalated.setdefault(level, []).append(recipient)
+
+    location = f"Lat: {weather_data['Latitude']}, Lon: {weather_data['Longitude']}"
+    message = (
+        f"A cyclonic condition has been detected in your area.\n"
+        f"Location: {location}\n"
+        f"Severity: {severity}\n"
+        f"Please take necessary precautions immediately."
+    )
+    if not escalated:
+        return {"alert_triggered": False, "message": "Alert already sent; no recipient escalated.", "message_ids": []}
+
+    message_ids = []
+    for level, level_recipients in escalated.items():
+        subject = f"Cyclone Alert ({LEVEL_NAMES[level].capitalize()}): Severe Weather Detected!"
+        receipts = send_email_alert(level_recipients, subject, message)
+        message_ids.extend(receipt.message_id for receipt in receipts)
+    return {
+        "alert_triggered": True,
+        "message": message,
+        "message_ids": message_ids
+    }
@@ -0,0 +1,87 @@
+import joblib
+import numpy as np
+
+# Nearest windows fetched per requested analog, so that several windows of one storm can be collapsed.
+OVERSAMPLE = 8
+
+
+def format_time(value):
+    """
+    Args:
+        value (int): Best-track time as YYYYMMDDHHMM.
+    Returns:
+        str: ISO 8601 time.
+    """
+    text = f"{int(value):012d}"
+    return f"{text[:4]}-{text[4:6]}-{text[6:8]}T{text[8:10]}:{text[10:]}"
+
+
+class AnalogSearch:
+    """
+    k-nearest-neighbour search over sliding windows of the historical tracks,
+    using the index built by Src/analogs.py.
+    """
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Index file written by Src/analogs.py.
+        """
+        index = joblib.load(path)
+        self.tree = index["tree"]
+        self.features = index["features"]
+        self.window = index["window"]
+        self.horizon = index["horizon"]
+        self.mean = index["mean"]
+        self.scale = index["scale"]
+        self.starts = index["starts"]
+        self.segment_ends = index["segment_ends"]
+        self.values = index["values"]
+        self.storm_ids = index["storm_ids"]
+        self.names = index["names"]
+        self.times = index["times"]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _fixes(self, rows):
+        return [
+            {"time": format_time(self.times[row]),
+             **{name: float(value) for name, value in zip(self.features, self.values[row])}}
+            for row in rows
+        ]
+
+    def query(self, track, k=5, one_per_storm=True):
+        """
+        Args:
+            track (np.ndarray): Last self.window fixes, oldest first, shape (window, len(features)).
+            k (int): Number of analogs.
+            one_per_storm (bool): Keep only the closest window of each storm.
+        Returns:
+            list: Per analog, the storm, distance, matched fixes and the fixes that followed.
+        """
+        track = np.asarray(track, dtype=np.float64)
+        if track.shape != (self.window, len(self.features)):
+            raise ValueError(f"Expected {self.window} fixes of {self.features}.")
+        point = ((track - self.mean) / self.scale).reshape(1, -1)
+
+        n_neighbors = min(len(self), k * OVERSAMPLE if one_per_storm else k)
+        distances, windows = self.tree.query(point, k=n_neighbors)
+        analogs = []
+        seen = set()
+        for distance, w in zip(distances[0], windows[0]):
+            storm = self.storm_ids[self.starts[w]]
+            if one_per_storm and storm in seen:
+                continue
+            seen.add(storm)
+            start = self.starts[w]
+            end = start + self.window
+            analogs.append({
+                "storm_id": str(storm),
+                "name": str(self.names[start]),
+                "distance": float(distance),
+                "matched": self._fixes(range(start, end)),
+                "evolution": self._fixes(range(end, min(end + self.horizon, self.segment_ends[w]))),
+            })
+            if len(analogs) == k:
+                break
+        return analogs
@@ -1,16 +1,45 @@
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Body, Request, Response
+from fastapi.responses import JSONResponse
+from typing import List, Optional, Union
 import joblib
+import os
+import numpy as np
 import pandas as pd
-import requests
 import threading
 import time
 import math
-from datetime import datetime, timedelta
+from datetime import datetime
 from pydantic import BaseModel
 import random
+import warnings
+import json
+import asyncio
+from micro_batcher import MicroBatcher
+from broadcaster import Broadcaster, DROP_OLDEST
+from proximity import ProximityEngine, haversine, calculate_danger_radius
+from weather_source import InProcessWeatherSource, HttpWeatherSource
+from state_store import StateStore
+from forecast import ForecastCache, MAX_MEMBERS, MAX_HOURS
+from alert_state import AlertStateMachine, LEVEL_NAMES, PRECAUTION
+from forest_predictor import CompiledForest, META_FILE as FOREST_META_FILE
+from history_store import HistoryStore
+from analog_search import AnalogSearch
+from shelters import ShelterRegistry
+from metrics import REGISTRY as metrics, MetricsMiddleware, SamplingProfiler, CONTENT_TYPE as METRICS_CONTENT_TYPE
 
 app = FastAPI()
 
+# Request and stage timings served on /metrics. When False, stage timers are
+# no-ops and the request middleware is not installed.
+METRICS_ENABLED = True
+METRICS_MAX_PROFILE_SECONDS = 60.0
+metrics.enabled = METRICS_ENABLED
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, registry=metrics)
+
+# The batch path feeds plain NumPy matrices to a model fitted on a DataFrame.
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
 # Testing flags
 TEST_MODE = True
 HARSH_TEST = True  # When True, force harsh weather conditions
@@ -27,7 +56,7 @@ RANGES = {
 }
 
 # Initial weather state.
-STATE = {
+STATE = StateStore({
     "Latitude": 20.0,
     "Longitude": 80.0,
     "Maximum Wind": 100.0,
@@ -46,14 +75,19 @@ STATE = {
     "High Wind SW": 70.0,
     "Cyclonic": False,
     "Cyclonic Severity": 0.0
-}
+})
 
 #############################################
 # Load the trained cyclone prediction model
 #############################################
 model_path = "models/cyclone_model.pkl"
+# Exported by Src/model.py; memory-mapped and preferred over the pickle when present.
+FOREST_DIR = "models/cyclone_forest"
 try:
-    model = joblib.load(model_path)
+    if os.path.exists(os.path.join(FOREST_DIR, FOREST_META_FILE)):
+        model = CompiledForest(FOREST_DIR)
+    else:
+        model = joblib.load(model_path)
 except FileNotFoundError:
     raise RuntimeError("Model file not found. Train and save the model first.")
 
@@ -70,40 +104,143 @@ CYCLONE_STATUS_DESCRIPTIONS = {
     9: "Disturbance: Weather disturbance; unlikely to develop into a cyclone."
 }
 
+# Descriptions of the HURDAT Status labels, used when the encoding artifact is present.
+STATUS_LABEL_DESCRIPTIONS = {
+    "TD": "Tropical Depression: Weak cyclone; minimal impact expected.",
+    "TS": "Tropical Storm: Moderate cyclone; potential for rain and strong winds.",
+    "HU": "Hurricane: Severe cyclone; prepare for heavy rain, strong winds, and damage.",
+    "EX": "Extratropical Cyclone: Cyclone formed outside the tropics; strong winds possible.",
+    "SD": "Subtropical Depression: Weak storm; limited impact expected.",
+    "SS": "Subtropical Storm: Moderate storm; expect rain and moderate winds.",
+    "LO": "Low Pressure: Localized low-pressure system; no major impact.",
+    "WV": "Tropical Wave: Weak atmospheric wave; no immediate threat.",
+    "DB": "Disturbance: Weather disturbance; unlikely to develop into a cyclone."
+}
+UNKNOWN_STATUS_DESCRIPTION = "Unknown cyclone status."
+
+# Status label of each class code, written next to the model by Src/model.py.
+STATUS_ENCODING_PATH = "models/status_encoding.json"
+STATUS_ENCODING_VERSION = 1
+
+def load_status_descriptions(encoding_path, n_codes):
+    """
+    Builds the description of every class code, so decoding is an array lookup.
+    Args:
+        encoding_path (str): Status encoding artifact saved with the model.
+        n_codes (int): Number of codes to cover.
+    Returns:
+        np.ndarray: Object array; element i describes class code i.
+    """
+    descriptions = np.full(n_codes, UNKNOWN_STATUS_DESCRIPTION, dtype=object)
+    try:
+        with open(encoding_path) as f:
+            encoding = json.load(f)
+    except FileNotFoundError:
+        # Models trained before the artifact existed: fall back to the fixed table.
+        for code, description in CYCLONE_STATUS_DESCRIPTIONS.items():
+            if code < n_codes:
+                descriptions[code] = description
+        return descriptions
+    if encoding.get("version") != STATUS_ENCODING_VERSION:
+        raise RuntimeError(f"Unsupported Status encoding version: {encoding.get('version')}")
+    for code, label in enumerate(encoding["labels"][:n_codes]):
+        descriptions[code] = STATUS_LABEL_DESCRIPTIONS.get(label.strip(), UNKNOWN_STATUS_DESCRIPTION)
+    return descriptions
+
+STATUS_DESCRIPTIONS = load_status_descriptions(STATUS_ENCODING_PATH, int(model.classes_.max()) + 1)
+
+# Descriptions aligned with model.classes_ so a batch can be decoded by index.
+CLASS_DESCRIPTIONS = STATUS_DESCRIPTIONS[model.classes_.astype(int)]
+
 #############################################
 # Background Weather State Updater
 #############################################
-def apply_trends():
+def step_trends(state):
     """
-    Updates the global STATE with new weather trends.
-    Args: None
+    Advances a weather state dict by one step of the weather trends.
+    Args:
+        state (dict): Weather fields, modified in place.
     Returns: None
     """
-    global STATE
     trend_factor = 0.1  # Base fluctuation factor
 
-    if STATE["Cyclonic"]:
-        STATE["Minimum Pressure"] -= random.uniform(0.5, 1.0)
-        STATE["Minimum Pressure"] = max(STATE["Minimum Pressure"], RANGES["Minimum Pressure"][0])
-        STATE["Cyclonic Severity"] = min(STATE["Cyclonic Severity"] + 0.1, 10.0)
+    if state["Cyclonic"]:
+        state["Minimum Pressure"] -= random.uniform(0.5, 1.0)
+        state["Minimum Pressure"] = max(state["Minimum Pressure"], RANGES["Minimum Pressure"][0])
+        state["Cyclonic Severity"] = min(state["Cyclonic Severity"] + 0.1, 10.0)
     else:
-        STATE["Minimum Pressure"] += random.uniform(-0.2, 0.5)
-        STATE["Minimum Pressure"] = min(STATE["Minimum Pressure"], RANGES["Minimum Pressure"][1])
+        state["Minimum Pressure"] += random.uniform(-0.2, 0.5)
+        state["Minimum Pressure"] = min(state["Minimum Pressure"], RANGES["Minimum Pressure"][1])
 
-    pressure_diff = 1013 - STATE["Minimum Pressure"]
+    pressure_diff = 1013 - state["Minimum Pressure"]
     wind_multiplier = 1 + (pressure_diff / 1000)
 
-    for key in STATE:
+    for key in state:
         if "Wind" in key:
-            base_wind = STATE[key]
+            base_wind = state[key]
             fluctuation = random.uniform(-1, 1) * trend_factor
-            STATE[key] = max(base_wind * wind_multiplier + fluctuation, 0)
+            state[key] = max(base_wind * wind_multiplier + fluctuation, 0)
 
-    if STATE["Minimum Pressure"] < 980.0:
-        STATE["Cyclonic"] = True
-    elif STATE["Minimum Pressure"] > 995.0:
-        STATE["Cyclonic"] = False
-        STATE["Cyclonic Severity"] = max(STATE["Cyclonic Severity"] - 0.1, 0)
+    if state["Minimum Pressure"] < 980.0:
+        state["Cyclonic"] = True
+    elif state["Minimum Pressure"] > 995.0:
+        state["Cyclonic"] = False
+        state["Cyclonic Severity"] = max(state["Cyclonic Severity"] - 0.1, 0)
+
+def harsh_test_position():
+    """
+    Picks a cyclone centre 20-30 km from the HARSH_TEST reference point.
+    Args: None
+    Returns:
+        dict: Latitude and Longitude fields.
+    """
+    reference_lat = 20.0
+    reference_lon = 80.0
+    # Offset for 20-30 km: between ~0.18 and 0.27 degrees
+    offset = random.uniform(0.18, 0.27)
+    angle = random.uniform(0, 2 * math.pi)
+    delta_lat = offset * math.cos(angle)
+    delta_lon = offset * math.sin(angle) / math.cos(math.radians(reference_lat))
+    return {
+        "Latitude": reference_lat + delta_lat,
+        "Longitude": reference_lon + delta_lon
+    }
+
+# Conditions HARSH_TEST forces on every published state.
+HARSH_TEST_CONDITIONS = {
+    "Minimum Pressure": 960.0,    # Very low pressure
+    "Maximum Wind": 200.0,        # High wind speed
+    "Cyclonic": True,
+    "Cyclonic Severity": 7.0,     # High severity
+    "Low Wind NE": 50.0,
+    "Moderate Wind NE": 100.0,
+    "High Wind NE": 150.0
+}
+
+def apply_harsh_test(state):
+    """
+    Moves the cyclone next to the HARSH_TEST reference point and forces harsh conditions.
+    Args:
+        state (dict): Weather fields, modified in place.
+    Returns: None
+    """
+    state.update(harsh_test_position())
+    state.update(HARSH_TEST_CONDITIONS)
+
+def apply_trends():
+    """
+    Publishes a new STATE snapshot with updated weather trends. Under HARSH_TEST
+    the harsh conditions are applied here, once per update, so every reader of
+    STATE (the feed, /current and the ETags it serves) sees the same snapshot.
+    Args: None
+    Returns: None
+    """
+    def advance(state):
+        step_trends(state)
+        if HARSH_TEST:
+            apply_harsh_test(state)
+
+    STATE.modify(advance)
 
 def background_updater():
     """
@@ -111,7 +248,6 @@ def background_updater():
     Args: None
     Returns: None
     """
-    global STATE
     while True:
         apply_trends()
         time.sleep(60)  # Update every minute
@@ -121,89 +257,481 @@ thread = threading.Thread(target=background_updater, daemon=True)
 thread.start()
 
 #############################################
-# Global Weather Data Fetching (for our own API)
+# Global Weather Data Feed
 #############################################
+# "in_process" reads STATE directly; "http" long-polls a separate weather service.
+WEATHER_SOURCE = "in_process"
 WEATHER_API_URL = "http://127.0.0.1:8000/current"
+WEATHER_WAIT_TIMEOUT = 30.0
 latest_weather_data = {}
+latest_weather_received_at = None
+
+# Every weather update the feed sees is recorded for /history.
+# 90 days of one-minute ticks is about 10 MB; set HISTORY_DIR to keep it across restarts.
+HISTORY_CAPACITY = 60 * 24 * 90
+HISTORY_DIR = None
+HISTORY_MAX_POINTS = 5000
+history = HistoryStore(list(STATE.snapshot), HISTORY_CAPACITY, HISTORY_DIR)
+
+def create_weather_source():
+    """
+    Builds the weather source selected by WEATHER_SOURCE.
+    Args: None
+    Returns:
+        WeatherSource: Source read by fetch_weather_data.
+    """
+    if WEATHER_SOURCE == "http":
+        return HttpWeatherSource(WEATHER_API_URL)
+    return InProcessWeatherSource(STATE)
 
 def fetch_weather_data():
     """
-    Continuously fetches live weather data and updates latest_weather_data.
+    Continuously waits for new weather data and updates latest_weather_data.
     Args: None
     Returns: None
     """
-    global latest_weather_data
+    global latest_weather_data, latest_weather_received_at
+    source = create_weather_source()
+    version = None
     while True:
         try:
-            response = requests.get(WEATHER_API_URL)
-            if response.status_code == 200:
-                latest_weather_data = response.json().get("weather_data", {})
-            else:
-                print(f"Weather API error: {response.status_code} - {response.text}")
+            update = source.next_update(version, WEATHER_WAIT_TIMEOUT)
+            if update is None:
+                continue
+            version, weather_data = update
+            latest_weather_received_at = time.time()
+            if weather_data != latest_weather_data:
+                if latest_weather_data.get("Cyclonic") and not weather_data.get("Cyclonic"):
+                    # The storm has dissipated; the next one starts from fresh alert levels.
+                    proximity_alert_states.forget_storm(CYCLONE_STORM_ID)
+                with metrics.timer("weather_update"):
+                    latest_weather_data = weather_data
+                    history.append(latest_weather_received_at, weather_data)
+                    prediction_cache.invalidate()
+                    refresh_zone_assignment()
+                    publish_weather_update()
         except Exception as e:
             print(f"Error fetching weather data: {e}")
-        time.sleep(10)
+            time.sleep(1)
+
+#############################################
+# Snapshot Prediction Cache
+#############################################
+class SnapshotPredictionCache:
+    """
+    Holds the real-time prediction for the current weather snapshot.
+    fetch_weather_data invalidates it whenever latest_weather_data changes,
+    so the model runs once per snapshot however many clients are polling.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entry = None  # (version, response)
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self):
+        """
+        Marks the cached prediction as stale.
+        Args: None
+        Returns: None
+        """
+        with self._lock:
+            self.version += 1
+
+    def get_entry(self, compute):
+        """
+        Returns the cached response and its version, computing it on a miss.
+        Args:
+            compute (callable): Builds the response from the current snapshot.
+        Returns:
+            tuple: (version, response)
+        """
+        entry = self._entry
+        if entry is not None and entry[0] == self.version:
+            with self._lock:
+                self.hits += 1
+            return entry
+        with self._lock:
+            # Another request may have filled the cache while we waited.
+            entry = self._entry
+            if entry is not None and entry[0] == self.version:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            version = self.version
+            self._entry = (version, compute())
+            return self._entry
+
+    def get(self, compute):
+        """
+        Returns the cached response for the current version, computing it on a miss.
+        Args:
+            compute (callable): Builds the response from the current snapshot.
+        Returns:
+            dict: Cached response.
+        """
+        return self.get_entry(compute)[1]
+
+    def stats(self):
+        """
+        Returns cache counters.
+        Args: None
+        Returns: dict
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+prediction_cache = SnapshotPredictionCache()
+
+#############################################
+# Bulk Danger-Zone Classification
+#############################################
+user_locations = ProximityEngine()
+latest_zone_assignment = {}
+
+def refresh_zone_assignment():
+    """
+    Classifies every registered user into the danger zones of the latest snapshot.
+    Args: None
+    Returns:
+        dict: Danger zones and the slot indices of the users in each zone.
+    """
+    global latest_zone_assignment
+    weather_data = latest_weather_data
+    cyclone_lat = weather_data.get("Latitude")
+    cyclone_lon = weather_data.get("Longitude")
+    if cyclone_lat is None or cyclone_lon is None:
+        return {}
+    registry_version = user_locations.version
+    danger_zones = calculate_danger_radius(
+        weather_data.get("Cyclonic Severity", 0), weather_data.get("Maximum Wind", 0)
+    )
+    latest_zone_assignment = {
+        "weather_version": prediction_cache.version,
+        "registry_version": registry_version,
+        "danger_zones": danger_zones,
+        "zones": user_locations.classify(cyclone_lat, cyclone_lon, danger_zones)
+    }
+    return latest_zone_assignment
 
-threading.Thread(target=fetch_weather_data, daemon=True).start()
 
 #############################################
 # Prediction Endpoints
 #############################################
-@app.post("/predict")
-def predict(features: dict):
+def predict_cyclone_status(features: dict):
     """
+    Runs the model on a single feature dictionary.
     Args:
         features (dict): Dictionary of input features for prediction.
     Returns:
         dict: Cyclone status and description.
     """
-    try:
+    with metrics.timer("build_dataframe"):
         input_df = pd.DataFrame([features])
         expected_features = model.feature_names_in_
         missing_features = set(expected_features) - set(input_df.columns)
         if missing_features:
             raise ValueError(f"Missing features: {missing_features}")
         input_df = input_df[expected_features]
+        require_finite(input_df.to_numpy(dtype=np.float32), expected_features)
+    with metrics.timer("model_predict"):
         prediction = model.predict(input_df)[0]
-        description = CYCLONE_STATUS_DESCRIPTIONS.get(prediction, "Unknown cyclone status.")
-        return {"cyclone_status": int(prediction), "description": description}
+    description = STATUS_DESCRIPTIONS[int(prediction)]
+    return {"cyclone_status": int(prediction), "description": description}
+
+def require_finite(matrix, feature_names):
+    """
+    Rejects feature values that are missing or outside the float32 range. The
+    sklearn forest routes NaN while CompiledForest refuses it, so the API refuses
+    it whichever is loaded; it also keeps one bad row out of a shared micro-batch.
+    Args:
+        matrix (np.ndarray): Feature matrix in feature_names order.
+        feature_names (array-like): Feature order of the matrix columns.
+    Returns: None
+    """
+    bad = ~np.isfinite(matrix)
+    if bad.any():
+        row, column = np.argwhere(bad)[0]
+        raise ValueError(f"Row {row}: feature '{feature_names[column]}' must be a finite float32 value.")
+
+# Micro-batching of concurrent /predict calls.
+PREDICT_BATCH_WINDOW_MS = 2.0
+PREDICT_MAX_BATCH_SIZE = 256
+
+@metrics.timed("model_predict_batch")
+def predict_class_index(matrix):
+    """
+    Returns the index into model.classes_ predicted for each row.
+    Args:
+        matrix (np.ndarray): Feature matrix in model.feature_names_in_ order.
+    Returns:
+        np.ndarray: Class indices.
+    """
+    return model.predict_proba(matrix).argmax(axis=1)
+
+predict_batcher = MicroBatcher(
+    predict_class_index,
+    max_batch_size=PREDICT_MAX_BATCH_SIZE,
+    max_wait_ms=PREDICT_BATCH_WINDOW_MS
+)
+
+@app.post("/predict")
+async def predict(features: dict):
+    """
+    Args:
+        features (dict): Dictionary of input features for prediction.
+    Returns:
+        dict: Cyclone status and description.
+    """
+    try:
+        missing_features = set(model.feature_names_in_) - set(features)
+        if missing_features:
+            raise ValueError(f"Missing features: {missing_features}")
+        row = build_feature_matrix([features], model.feature_names_in_)
+        require_finite(row, model.feature_names_in_)
+        class_index = await predict_batcher.submit(row)
+        return {
+            "cyclone_status": int(model.classes_[class_index]),
+            "description": CLASS_DESCRIPTIONS[class_index]
+        }
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Prediction failed: {str(e)}")
 
+@app.get("/predict/metrics")
+def predict_metrics():
+    """
+    Returns queue depth, batch size and latency metrics of the /predict micro-batcher.
+    Args: None
+    Returns: dict
+    """
+    return predict_batcher.stats()
+
+MAX_BATCH_ROWS = 100_000
+
+def build_feature_matrix(payload, feature_names):
+    """
+    Builds a contiguous float32 matrix from row-wise or columnar feature data.
+    Args:
+        payload (list | dict): List of feature dicts, or a dict mapping each feature to a list of values.
+        feature_names (array-like): Feature order expected by the model.
+    Returns:
+        np.ndarray: Matrix of shape (n_rows, n_features).
+    """
+    feature_names = list(feature_names)
+    if isinstance(payload, dict):
+        missing_features = set(feature_names) - set(payload)
+        if missing_features:
+            raise ValueError(f"Missing features: {missing_features}")
+        n_rows = len(payload[feature_names[0]])
+        matrix = np.empty((n_rows, len(feature_names)), dtype=np.float32)
+        for j, name in enumerate(feature_names):
+            column = payload[name]
+            if len(column) != n_rows:
+                raise ValueError(f"Column '{name}' has {len(column)} values, expected {n_rows}.")
+            matrix[:, j] = column
+        return matrix
+
+    values = []
+    for i, row in enumerate(payload):
+        try:
+            values.append([row[name] for name in feature_names])
+        except KeyError as e:
+            raise ValueError(f"Row {i}: missing feature {e}")
+        except TypeError:
+            raise ValueError(f"Row {i}: expected an object of feature values.")
+    return np.array(values, dtype=np.float32).reshape(len(values), len(feature_names))
+
+def batch_rows(payload):
+    """
+    Counts the rows of a batch payload without building its matrix, so that
+    oversized requests are refused before anything is allocated.
+    Args:
+        payload (list | dict): Row-wise or columnar feature data.
+    Returns:
+        int: Number of rows; for columnar data, the length of the longest column.
+    """
+    if isinstance(payload, dict):
+        return max((len(column) for column in payload.values() if isinstance(column, list)), default=0)
+    return len(payload)
+
+@app.post("/predict/batch")
+def predict_batch(payload: Union[list, dict] = Body(...)):
+    """
+    Args:
+        payload (list | dict): JSON array of feature dicts, or columnar arrays keyed by feature name.
+    Returns:
+        dict: Cyclone statuses and descriptions, one per input row.
+    """
+    if batch_rows(payload) > MAX_BATCH_ROWS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_BATCH_ROWS} rows.")
+    try:
+        matrix = build_feature_matrix(payload, model.feature_names_in_)
+        require_finite(matrix, model.feature_names_in_)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Prediction failed: {str(e)}")
+    if len(matrix) == 0:
+        return JSONResponse({"count": 0, "cyclone_status": [], "description": []})
+
+    class_index = predict_class_index(matrix)
+    # Plain lists of ints and strings need no jsonable_encoder pass.
+    return JSONResponse({
+        "count": len(matrix),
+        "cyclone_status": model.classes_[class_index].astype(int).tolist(),
+        "description": CLASS_DESCRIPTIONS[class_index].tolist()
+    })
+
+def build_real_time_response():
+    """
+    Builds the real-time prediction response for the current snapshot.
+    Args: None
+    Returns: dict
+    """
+    weather_data = latest_weather_data
+    return {
+        "timestamp": weather_data.get("timestamp"),
+        "weather_data": weather_data,
+        "cyclone_prediction": predict_cyclone_status(weather_data),
+    }
+
 @app.get("/real_time_prediction")
 def real_time_cyclone_prediction():
     """
     Returns real-time cyclone prediction based on latest weather data.
+    The prediction is computed once per weather snapshot and shared by all callers.
     Args: None
     Returns: dict
     """
-    global latest_weather_data
     if not latest_weather_data:
         raise HTTPException(status_code=503, detail="No weather data available.")
     try:
-        input_df = pd.DataFrame([latest_weather_data])
-        expected_features = model.feature_names_in_
-        missing_features = set(expected_features) - set(input_df.columns)
-        if missing_features:
-            raise ValueError(f"Missing features: {missing_features}")
-        input_df = input_df[expected_features]
-        prediction = model.predict(input_df)[0]
-        description = CYCLONE_STATUS_DESCRIPTIONS.get(prediction, "Unknown cyclone status.")
-        return {
-            "timestamp": latest_weather_data.get("timestamp"),
-            "weather_data": latest_weather_data,
-            "cyclone_prediction": {"cyclone_status": int(prediction), "description": description},
-        }
+        return prediction_cache.get(build_real_time_response)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Real-time prediction failed: {str(e)}")
 
+@app.get("/real_time_prediction/stats")
+def real_time_prediction_stats():
+    """
+    Returns hit and miss counters of the real-time prediction cache.
+    Args: None
+    Returns: dict
+    """
+    return prediction_cache.stats()
+
 #############################################
 # WebSocket Notification Setup
 #############################################
-active_connections = []
+# Per-client outbound queue length, send timeout and slow-consumer policy.
+WS_QUEUE_SIZE = 32
+WS_SEND_TIMEOUT = 5.0
+WS_SLOW_CONSUMER_POLICY = DROP_OLDEST
+
+broadcaster = Broadcaster(
+    queue_size=WS_QUEUE_SIZE, send_timeout=WS_SEND_TIMEOUT, policy=WS_SLOW_CONSUMER_POLICY
+)
+active_connections = broadcaster.clients
+
+# Clients send {"action": "subscribe", "channel": "weather"} to get a snapshot
+# followed by deltas whenever latest_weather_data or the prediction changes.
+WEATHER_CHANNEL = "weather"
+pushed_weather = {"version": 0, "weather_data": {}, "cyclone_prediction": None}
+
+def encode_message(message: dict):
+    """
+    Args:
+        message (dict): Message to send over the WebSocket.
+    Returns:
+        str: JSON text.
+    """
+    return json.dumps(message, default=str)
+
+def weather_snapshot_message():
+    """
+    Builds a full snapshot message for a new or resyncing subscriber.
+    Args: None
+    Returns: dict
+    """
+    if not latest_weather_data:
+        return {"type": "snapshot", "version": prediction_cache.version,
+                "weather_data": {}, "cyclone_prediction": None}
+    version, response = prediction_cache.get_entry(build_real_time_response)
+    return {
+        "type": "snapshot",
+        "version": version,
+        "timestamp": response["timestamp"],
+        "weather_data": response["weather_data"],
+        "cyclone_prediction": response["cyclone_prediction"]
+    }
+
+def publish_weather_update():
+    """
+    Pushes the fields of latest_weather_data that changed since the last push,
+    plus the prediction when it changed, to every weather subscriber. Each
+    delta names the version it applies on top of so clients can detect gaps
+    and ask for a resync.
+    Args: None
+    Returns: None
+    """
+    global pushed_weather
+    if not latest_weather_data:
+        return
+    version, response = prediction_cache.get_entry(build_real_time_response)
+    weather_data = response["weather_data"]
+    previous = pushed_weather["weather_data"]
+    message = {
+        "type": "delta",
+        "version": version,
+        "base_version": pushed_weather["version"],
+        "changes": {key: value for key, value in weather_data.items() if previous.get(key) != value},
+        "removed": [key for key in previous if key not in weather_data]
+    }
+    if response["cyclone_prediction"] != pushed_weather["cyclone_prediction"]:
+        message["cyclone_prediction"] = response["cyclone_prediction"]
+    pushed_weather = {
+        "version": version,
+        "weather_data": weather_data,
+        "cyclone_prediction": response["cyclone_prediction"]
+    }
+    broadcaster.publish_threadsafe(encode_message(message), WEATHER_CHANNEL)
+
+async def handle_client_message(websocket: WebSocket, data: str):
+    """
+    Handles subscription commands; any other text is echoed back.
+    Args:
+        websocket: WebSocket connection object.
+        data (str): Received text.
+    Returns: None
+    """
+    try:
+        command = json.loads(data) if data.startswith("{") else None
+    except ValueError:
+        command = None
+    if not isinstance(command, dict) or "action" not in command:
+        broadcaster.send(websocket, f"Server received: {data}")
+        return
+
+    action = command["action"]
+    channel = command.get("channel", WEATHER_CHANNEL)
+    if channel != WEATHER_CHANNEL:
+        broadcaster.send(websocket, encode_message({"type": "error", "detail": f"Unknown channel: {channel}"}))
+    elif action in ("subscribe", "resync"):
+        broadcaster.subscribe(websocket, channel)
+        loop = asyncio.get_running_loop()
+        snapshot = await loop.run_in_executor(None, weather_snapshot_message)
+        broadcaster.send(websocket, encode_message(snapshot))
+    elif action == "unsubscribe":
+        broadcaster.unsubscribe(websocket, channel)
+    else:
+        broadcaster.send(websocket, encode_message({"type": "error", "detail": f"Unknown action: {action}"}))
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket):
+async def websocket_endpoint(websocket: WebSocket):
     """
     WebSocket endpoint for real-time communication.
     Args:
@@ -211,33 +739,56 @@ async def websocket_endpoint(websocket):
     Returns: None
     """
     await websocket.accept()
-    active_connections.append(websocket)
+    broadcaster.register(websocket)
     try:
         while True:
             data = await websocket.receive_text()
-            await websocket.send_text(f"Server received: {data}")
+            await handle_client_message(websocket, data)
     except WebSocketDisconnect:
-        active_connections.remove(websocket)
+        pass
+    finally:
+        broadcaster.unregister(websocket)
 
+@metrics.timed("broadcast")
 async def broadcast_notification(message: str):
     """
-    Broadcasts a message to all active WebSocket connections.
+    Queues a message for all active WebSocket connections. Each connection is
+    written by its own task, so this returns without waiting on any client.
     Args:
         message (str): Message to send.
-    Returns: None
+    Returns:
+        int: Number of connections the message was queued for.
     """
-    for connection in active_connections:
-        try:
-            await connection.send_text(message)
-        except Exception as e:
-            print("Error sending notification to a connection:", e)
+    return broadcaster.publish(message)
+
+@app.get("/ws/stats")
+def websocket_stats():
+    """
+    Returns WebSocket broadcaster counters.
+    Args: None
+    Returns: dict
+    """
+    return broadcaster.stats()
 
 #############################################
 # Proximity Alert Endpoint (Using WebSocket Notifications)
 #############################################
+# Per-storm, per-user alert levels; only escalations are pushed to clients.
+PROXIMITY_ALERT_COOLDOWN = 900.0
+PROXIMITY_ALERT_HYSTERESIS = 0.1
+# Anonymous callers are tracked by rounded coordinates, so idle entries must expire.
+PROXIMITY_ALERT_IDLE_TTL = 3600.0
+PROXIMITY_ALERT_MAX_TRACKED = 100_000
+CYCLONE_STORM_ID = "primary"
+proximity_alert_states = AlertStateMachine(
+    cooldown=PROXIMITY_ALERT_COOLDOWN, hysteresis=PROXIMITY_ALERT_HYSTERESIS,
+    idle_ttl=PROXIMITY_ALERT_IDLE_TTL, max_tracked=PROXIMITY_ALERT_MAX_TRACKED
+)
+
 class ProximityRequest(BaseModel):
     latitude: float
     longitude: float
+    user_id: Optional[str] = None
 
 @app.post("/check_proximity")
 async def check_proximity(request: ProximityRequest):
@@ -255,20 +806,34 @@ async def check_proximity(request: ProximityRequest):
     if cyclone_lat is None or cyclone_lon is None:
         raise HTTPException(status_code=500, detail="Cyclone center coordinates not available.")
     
+    if request.user_id is not None:
+        user_locations.upsert(request.user_id, request.latitude, request.longitude)
+
     distance = haversine(request.latitude, request.longitude, cyclone_lat, cyclone_lon)
     severity = latest_weather_data.get("Cyclonic Severity", 0)
     max_wind = latest_weather_data.get("Maximum Wind", 0)
     danger_zones = calculate_danger_radius(severity, max_wind)
     
-    if distance <= danger_zones["yellow_zone"] or TEST_MODE:
-        if distance <= danger_zones["red_zone"]:
-            alert_level = "critical"
-        elif distance <= danger_zones["orange_zone"]:
-            alert_level = "warning"
-        else:
-            alert_level = "precaution"
-        
+    # Distances enter escalation_level negated, so that closer is more dangerous.
+    thresholds = (-danger_zones["yellow_zone"], -danger_zones["orange_zone"], -danger_zones["red_zone"])
+    recipient = request.user_id or f"{request.latitude:.2f},{request.longitude:.2f}"
+    delivered = proximity_alert_states.observe(
+        CYCLONE_STORM_ID, recipient, -distance, thresholds,
+        minimum=PRECAUTION if TEST_MODE else 0
+    )
+    level = proximity_alert_states.level(CYCLONE_STORM_ID, recipient)
+
+    if level:
+        alert_level = LEVEL_NAMES[level]
         test_note = " [TEST MODE]" if TEST_MODE else ""
+        if delivered is None:
+            return {
+                "message": f"{alert_level.capitalize()} alert already sent{test_note}.",
+                "alert_level": alert_level,
+                "distance": distance,
+                "danger_zones": danger_zones
+            }
+
         message_text = (
             f"Cyclone Alert{test_note}! A cyclone is approximately {round(distance, 2)} km away from your location. "
             "Please take necessary precautions."
@@ -277,6 +842,7 @@ async def check_proximity(request: ProximityRequest):
         
         return {
             "message": f"{alert_level.capitalize()} alert sent via in-app notification{test_note}.",
+            "alert_level": alert_level,
             "distance": distance,
             "danger_zones": danger_zones
         }
@@ -287,41 +853,231 @@ async def check_proximity(request: ProximityRequest):
             "danger_zones": danger_zones
         }
 
+@app.get("/check_proximity/stats")
+def get_proximity_alert_stats():
+    """
+    Returns how many proximity checks produced notifications.
+    Args: None
+    Returns: dict
+    """
+    return proximity_alert_states.stats()
+
+class UserLocationBatch(BaseModel):
+    user_ids: List[str]
+    latitudes: List[float]
+    longitudes: List[float]
+
+@app.post("/users/locations")
+def register_user_locations(batch: UserLocationBatch):
+    """
+    Registers or moves users for bulk danger-zone classification.
+    Args:
+        batch (UserLocationBatch): Columnar user ids and coordinates.
+    Returns:
+        dict: Number of users updated and registered in total.
+    """
+    try:
+        user_locations.upsert_many(batch.user_ids, batch.latitudes, batch.longitudes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"updated": len(batch.user_ids), "registered": len(user_locations)}
+
+@app.delete("/users/locations/{user_id}")
+def remove_user_location(user_id: str):
+    """
+    Args:
+        user_id (str): User to unregister.
+    Returns:
+        dict: Confirmation message.
+    """
+    if not user_locations.remove(user_id):
+        raise HTTPException(status_code=404, detail="User not registered.")
+    return {"message": "User location removed.", "registered": len(user_locations)}
+
+@app.get("/proximity/zones")
+def get_zone_membership(include_users: bool = True):
+    """
+    Returns the danger-zone membership of every registered user.
+    Args:
+        include_users (bool): When False, only zone counts are returned.
+    Returns:
+        dict: Danger zones with the users (or counts) in each zone.
+    """
+    if not latest_weather_data:
+        raise HTTPException(status_code=503, detail="No weather data available.")
+    assignment = latest_zone_assignment
+    if (assignment.get("weather_version") != prediction_cache.version
+            or assignment.get("registry_version") != user_locations.version):
+        assignment = refresh_zone_assignment()
+    if not assignment:
+        raise HTTPException(status_code=500, detail="Cyclone center coordinates not available.")
+
+    zones = assignment["zones"]
+    response = {
+        "danger_zones": assignment["danger_zones"],
+        "registered": len(user_locations),
+        "counts": {name: len(slots) for name, slots in zones.items()}
+    }
+    if include_users:
+        response["users"] = {name: user_locations.user_ids(slots) for name, slots in zones.items()}
+    return response
+
+#############################################
+# Shelters
+#############################################
+# Optional JSON list of shelters (id, latitude, longitude, name, address, contact, capacity, currentOccupancy).
+SHELTERS_PATH = "data/shelters.json"
+MAX_SHELTERS_K = 50
+
+def load_shelters(file_path):
+    """
+    Args:
+        file_path (str): JSON file with a list of shelters.
+    Returns:
+        list: Shelters, or an empty list if the file does not exist.
+    """
+    if not os.path.exists(file_path):
+        return []
+    with open(file_path) as f:
+        return json.load(f)
+
+shelter_registry = ShelterRegistry(load_shelters(SHELTERS_PATH))
+
+def shelter_exclusion():
+    """
+    Disc covering the red and orange zones of the latest snapshot; shelters inside are not offered.
+    Args: None
+    Returns:
+        tuple: (latitude, longitude, radius_km), or None without a cyclone centre.
+    """
+    weather_data = latest_weather_data
+    cyclone_lat = weather_data.get("Latitude")
+    cyclone_lon = weather_data.get("Longitude")
+    if cyclone_lat is None or cyclone_lon is None:
+        return None
+    danger_zones = calculate_danger_radius(
+        weather_data.get("Cyclonic Severity", 0), weather_data.get("Maximum Wind", 0)
+    )
+    return (float(cyclone_lat), float(cyclone_lon), danger_zones["orange_zone"])
+
+def check_shelters_k(k):
+    """
+    Validates the number of shelters requested per location.
+    Args:
+        k (int): Shelters per location.
+    Returns: None; raises 400 if k is outside [1, MAX_SHELTERS_K].
+    """
+    if k < 1 or k > MAX_SHELTERS_K:
+        raise HTTPException(status_code=400, detail=f"k must be between 1 and {MAX_SHELTERS_K}.")
+
+@app.post("/shelters")
+def upsert_shelters(shelters: List[dict] = Body(...)):
+    """
+    Adds or updates shelters; the index absorbs the change without a full rebuild.
+    Args:
+        shelters (list): Shelters with id, latitude, longitude and optional details.
+    Returns:
+        dict: Number of shelters updated and registered in total.
+    """
+    try:
+        updated = shelter_registry.upsert(shelters)
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid shelter: {e}")
+    return {"updated": updated, "registered": len(shelter_registry)}
+
+@app.delete("/shelters/{shelter_id}")
+def remove_shelter(shelter_id: str):
+    """
+    Args:
+        shelter_id (str): Shelter to remove.
+    Returns:
+        dict: Confirmation message.
+    """
+    if not shelter_registry.remove(shelter_id):
+        raise HTTPException(status_code=404, detail="Shelter not registered.")
+    return {"message": "Shelter removed.", "registered": len(shelter_registry)}
+
+@app.get("/nearest_shelters")
+def get_nearest_shelters(latitude: float, longitude: float, k: int = 5):
+    """
+    Returns the closest shelters outside the current red and orange zones.
+    Args:
+        latitude, longitude (float): User location.
+        k (int): Number of shelters.
+    Returns:
+        dict: Excluded disc and the shelters, nearest first.
+    """
+    check_shelters_k(k)
+    exclude = shelter_exclusion()
+    return {
+        "excluded_zone": None if exclude is None else dict(zip(("latitude", "longitude", "radius_km"), exclude)),
+        "shelters": shelter_registry.nearest(latitude, longitude, k, exclude)
+    }
+
+@app.post("/nearest_shelters/bulk")
+def assign_nearest_shelters(batch: UserLocationBatch, k: int = 5, include_candidates: bool = False):
+    """
+    Assigns a batch of users to shelters outside the current red and orange zones.
+    Each user gets the nearest of their k closest shelters with room left.
+    Args:
+        batch (UserLocationBatch): Columnar user ids and coordinates.
+        k (int): Shelters considered per user.
+        include_candidates (bool): Also return each user's k closest shelters.
+    Returns:
+        dict: Columnar assigned shelter ids and their distances; null where none had room.
+    """
+    check_shelters_k(k)
+    if not (len(batch.user_ids) == len(batch.latitudes) == len(batch.longitudes)):
+        raise HTTPException(status_code=400, detail="user_ids, latitudes and longitudes must have the same length.")
+    ids, km, assigned, assigned_km = shelter_registry.assign(
+        batch.latitudes, batch.longitudes, k, shelter_exclusion()
+    )
+    response = {
+        "user_ids": batch.user_ids,
+        "shelters": assigned.tolist(),
+        "distance_km": np.where(np.isinf(assigned_km), None, assigned_km).tolist()
+    }
+    if include_candidates:
+        response["candidates"] = ids.tolist()
+        response["candidate_km"] = np.where(np.isinf(km), None, km).tolist()
+    return JSONResponse(response)
+
 #############################################
 # Weather Data Endpoints
 #############################################
+# Upper bound for ?wait= on /current.
+MAX_LONG_POLL = 30.0
+
+# Forecast trajectories for recent state versions; unused entries expire after FORECAST_CACHE_TTL seconds.
+FORECAST_CACHE_SIZE = 32
+FORECAST_CACHE_TTL = 600.0
+forecast_cache = ForecastCache(
+    RANGES["Minimum Pressure"], max_entries=FORECAST_CACHE_SIZE, ttl=FORECAST_CACHE_TTL
+)
+
 @app.get("/current")
-def get_current_weather():
+async def get_current_weather(request: Request, response: Response, since: Optional[int] = None, wait: float = 0):
     """
-    Returns the current weather data.
-    Args: None
+    Returns the current weather data. Long-polls wait on the event loop, so
+    they do not tie up threadpool workers.
+    Args:
+        since (int): Version the caller already has; with wait, the request is held until it changes.
+        wait (float): Seconds to hold the request open waiting for a newer version.
     Returns: dict
     """
-    if HARSH_TEST:
-        reference_lat = 20.0
-        reference_lon = 80.0
-        # Offset for 20-30 km: between ~0.18 and 0.27 degrees
-        offset = random.uniform(0.18, 0.27)
-        angle = random.uniform(0, 2 * math.pi)
-        delta_lat = offset * math.cos(angle)
-        delta_lon = offset * math.sin(angle) / math.cos(math.radians(reference_lat))
-        STATE["Latitude"] = reference_lat + delta_lat
-        STATE["Longitude"] = reference_lon + delta_lon
-        
-        # Force harsh weather parameters:
-        STATE["Minimum Pressure"] = 960.0    # Very low pressure
-        STATE["Maximum Wind"] = 200.0        # High wind speed
-        STATE["Cyclonic"] = True
-        STATE["Cyclonic Severity"] = 7.0     # High severity
-        
-        # Optionally, adjust other wind parameters if needed:
-        STATE["Low Wind NE"] = 50.0
-        STATE["Moderate Wind NE"] = 100.0
-        STATE["High Wind NE"] = 150.0
+    if since is not None and wait > 0:
+        snapshot = await STATE.wait_async(since, min(wait, MAX_LONG_POLL))
+    else:
+        snapshot = STATE.snapshot
 
+    etag = f'"{snapshot.version}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return {
-        "timestamp": datetime.now(),
-        "weather_data": STATE
+        "timestamp": snapshot.timestamp,
+        "version": snapshot.version,
+        "weather_data": snapshot.as_dict()
     }
 
 @app.post("/simulate_cyclone")
@@ -331,28 +1087,16 @@ def simulate_cyclonic_condition():
     Args: None
     Returns: dict
     """
-    global STATE
-    STATE["Cyclonic"] = True
-    STATE["Minimum Pressure"] = min(STATE["Minimum Pressure"], 970.0)
-    
-    if HARSH_TEST:
-        reference_lat = 20.0
-        reference_lon = 80.0
-        offset = random.uniform(0.18, 0.27)
-        angle = random.uniform(0, 2 * math.pi)
-        delta_lat = offset * math.cos(angle)
-        delta_lon = offset * math.sin(angle) / math.cos(math.radians(reference_lat))
-        STATE["Latitude"] = reference_lat + delta_lat
-        STATE["Longitude"] = reference_lon + delta_lon
-        
-        # Force harsh weather parameters:
-        STATE["Minimum Pressure"] = 960.0
-        STATE["Maximum Wind"] = 200.0
-        STATE["Cyclonic Severity"] = 7.0
+    def force_cyclone(state):
+        state["Cyclonic"] = True
+        state["Minimum Pressure"] = min(state["Minimum Pressure"], 970.0)
+        if HARSH_TEST:
+            apply_harsh_test(state)
 
+    snapshot = STATE.modify(force_cyclone)
     return {
         "message": "Cyclonic condition simulated.",
-        "weather_data": STATE
+        "weather_data": snapshot.as_dict()
     }
 
 @app.post("/reset")
@@ -362,7 +1106,6 @@ def reset_weather():
     Args: None
     Returns: dict
     """
-    global STATE
     STATE.update({
         "Latitude": random.uniform(*RANGES["Latitude"]),
         "Longitude": random.uniform(*RANGES["Longitude"]),
@@ -386,32 +1129,225 @@ def reset_weather():
     return {"message": "Weather state reset to baseline."}
 
 @app.get("/forecast")
-def get_weather_forecast(hours: int = 6):
+def get_weather_forecast(hours: int = 6, mode: str = "single", members: int = 1000, seed: Optional[int] = None):
     """
+    Forecasts are cached per state version, so repeated requests between
+    weather updates are served without re-simulating.
     Args:
         hours (int): Number of hours to forecast (default 6).
+        mode (str): "single" for one random path, "ensemble" for percentile bands over many paths.
+        members (int): Ensemble size when mode is "ensemble".
+        seed (int): Random seed; defaults to the state version, so the forecast is stable until the state changes.
     Returns:
         dict: Forecast data for the specified hours.
     """
-    if hours < 1 or hours > 48:
-        raise HTTPException(status_code=400, detail="Forecast range must be between 1 and 48 hours.")
-
-    forecast = []
-    simulated_state = STATE.copy()
-
-    for hour in range(1, hours + 1):
-        simulated_state["Minimum Pressure"] += random.uniform(-0.3, 0.3)
-        simulated_state["Minimum Pressure"] = max(min(simulated_state["Minimum Pressure"], RANGES["Minimum Pressure"][1]), RANGES["Minimum Pressure"][0])
-        pressure_diff = 1013 - simulated_state["Minimum Pressure"]
-        wind_multiplier = 1 + (pressure_diff / 1000)
-        for key in simulated_state:
-            if "Wind" in key:
-                fluctuation = random.uniform(-0.5, 0.5)
-                simulated_state[key] = max(simulated_state[key] * wind_multiplier + fluctuation, 0)
-        forecast.append({
-            "hour": hour,
-            "timestamp": (datetime.now() + timedelta(hours=hour)).isoformat(),
-            "weather_data": simulated_state.copy()
+    if hours < 1 or hours > MAX_HOURS:
+        raise HTTPException(status_code=400, detail=f"Forecast range must be between 1 and {MAX_HOURS} hours.")
+    snapshot = STATE.snapshot
+    if seed is None:
+        seed = snapshot.version
+    if mode == "ensemble":
+        if members < 1 or members > MAX_MEMBERS:
+            raise HTTPException(status_code=400, detail=f"Ensemble size must be between 1 and {MAX_MEMBERS}.")
+        forecast = forecast_cache.ensemble(snapshot, hours, members, seed)
+        return JSONResponse({
+            "mode": "ensemble", "version": snapshot.version, "members": members, "seed": seed, "forecast": forecast
         })
+    if mode != "single":
+        raise HTTPException(status_code=400, detail="Forecast mode must be 'single' or 'ensemble'.")
 
-    return {"forecast": forecast}
+    forecast = forecast_cache.single(snapshot, hours, seed)
+    return JSONResponse({"version": snapshot.version, "seed": seed, "forecast": forecast})
+
+@app.get("/forecast/stats")
+def get_forecast_stats():
+    """
+    Returns forecast cache hit rate and size.
+    Args: None
+    Returns: dict
+    """
+    return forecast_cache.stats()
+
+@app.get("/history")
+def get_weather_history(since: Optional[datetime] = None, until: Optional[datetime] = None,
+                        fields: Optional[str] = None, max_points: int = HISTORY_MAX_POINTS):
+    """
+    Returns recorded weather updates between two times, one array per field.
+    Args:
+        since (datetime): Earliest update to include (ISO 8601 or Unix time); default the oldest kept.
+        until (datetime): Latest update to include; default the newest.
+        fields (str): Comma-separated fields to return; default all of them.
+        max_points (int): Longer ranges are thinned to every k-th update ("stride").
+    Returns:
+        dict: Timestamps as Unix seconds and the requested columns.
+    """
+    if max_points < 1 or max_points > HISTORY_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"max_points must be between 1 and {HISTORY_MAX_POINTS}.")
+    names = [name.strip() for name in fields.split(",") if name.strip()] if fields else None
+    try:
+        result = history.query(
+            since.timestamp() if since else None,
+            until.timestamp() if until else None,
+            names,
+            max_points
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=str(e.args[0]))
+    return JSONResponse({
+        "count": len(result["timestamps"]),
+        "stride": result["stride"],
+        "timestamps": result["timestamps"].tolist(),
+        "values": {name: column.tolist() for name, column in result["values"].items()}
+    })
+
+#############################################
+# Historical Analogs
+#############################################
+# Built by Src/analogs.py; /analogs is unavailable until it exists.
+ANALOG_INDEX_PATH = "models/analog_index.pkl"
+# Spacing of best-track fixes, used to sample the recorded history into a track.
+ANALOG_FIX_INTERVAL = 6 * 3600
+ANALOG_MAX_K = 50
+analog_search = AnalogSearch(ANALOG_INDEX_PATH) if os.path.exists(ANALOG_INDEX_PATH) else None
+# Index features the history does not record; GET /analogs needs all of them, POST does not.
+analog_unrecorded = [name for name in analog_search.features if name not in history.fields] if analog_search else []
+if analog_unrecorded:
+    print(f"Analog index features not in the recorded history: {analog_unrecorded}. GET /analogs is disabled.")
+
+def recent_track(features, fixes, interval):
+    """
+    Samples the recorded history into a track of evenly spaced fixes.
+    Fixes older than the history are filled with the oldest record.
+    Args:
+        features (list): Fields of each fix.
+        fixes (int): Number of fixes.
+        interval (float): Seconds between fixes.
+    Returns:
+        np.ndarray: Shape (fixes, len(features)), oldest first.
+    """
+    targets = time.time() - interval * np.arange(fixes - 1, -1, -1)
+    recorded = history.query(since=targets[0] - interval, fields=features)
+    timestamps = recorded["timestamps"]
+    if not len(timestamps):
+        return np.tile([float(latest_weather_data[name]) for name in features], (fixes, 1))
+    rows = np.clip(np.searchsorted(timestamps, targets, side="right") - 1, 0, None)
+    return np.column_stack([recorded["values"][name][rows] for name in features])
+
+def require_analog_search():
+    """
+    Args: None
+    Returns:
+        AnalogSearch: The loaded index; raises 503 if it was not built.
+    """
+    if analog_search is None:
+        raise HTTPException(status_code=503, detail="Analog index not built. Run Src/analogs.py first.")
+    return analog_search
+
+def find_analogs(track, k, one_per_storm):
+    """
+    Args:
+        track (array-like): Fixes of the index features, oldest first.
+        k (int): Number of analogs.
+        one_per_storm (bool): Return at most one matching segment per storm.
+    Returns:
+        dict: The features, the query track and the analogs.
+    """
+    if k < 1 or k > ANALOG_MAX_K:
+        raise HTTPException(status_code=400, detail=f"k must be between 1 and {ANALOG_MAX_K}.")
+    try:
+        analogs = analog_search.query(track, k, one_per_storm)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"features": analog_search.features, "track": np.asarray(track).tolist(), "analogs": analogs}
+
+@app.get("/analogs")
+def get_analogs(k: int = 5, one_per_storm: bool = True):
+    """
+    Finds the historical storms whose tracks looked most like the recent weather.
+    Args:
+        k (int): Number of analogs.
+        one_per_storm (bool): Return at most one matching segment per storm.
+    Returns:
+        dict: The query track and, per analog, the matched fixes and how the storm evolved.
+    """
+    search = require_analog_search()
+    if analog_unrecorded:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Analog index features not in the recorded history: {analog_unrecorded}. Use POST /analogs."
+        )
+    if not latest_weather_data:
+        raise HTTPException(status_code=503, detail="Weather data not yet available.")
+    track = recent_track(search.features, search.window, ANALOG_FIX_INTERVAL)
+    return find_analogs(track, k, one_per_storm)
+
+@app.post("/analogs")
+def post_analogs(track: List[dict] = Body(..., embed=True), k: int = 5, one_per_storm: bool = True):
+    """
+    Finds the historical storms most like a given track.
+    Args:
+        track (list): Six-hourly fixes, oldest first, each with the index features.
+        k (int): Number of analogs.
+        one_per_storm (bool): Return at most one matching segment per storm.
+    Returns:
+        dict: Per analog, the matched fixes and how the storm evolved.
+    """
+    search = require_analog_search()
+    matrix = []
+    for i, fix in enumerate(track):
+        row = []
+        for name in search.features:
+            try:
+                row.append(float(fix[name]))
+            except KeyError:
+                raise HTTPException(status_code=400, detail=f"Fix {i}: missing feature '{name}'.")
+            except (ValueError, TypeError):
+                raise HTTPException(status_code=400, detail=f"Fix {i}: feature '{name}' must be a number.")
+        matrix.append(row)
+    return find_analogs(matrix, k, one_per_storm)
+
+#############################################
+# Metrics
+#############################################
+metrics.gauge("active_connections", "Open WebSocket connections.", function=lambda: len(broadcaster.clients))
+metrics.gauge(
+    "weather_data_age_seconds", "Seconds since the weather feed last delivered data.",
+    function=lambda: None if latest_weather_received_at is None else time.time() - latest_weather_received_at
+)
+metrics.gauge("weather_history_entries", "Weather updates kept for /history.", function=lambda: len(history))
+metrics.gauge("registered_users", "Users registered for zone classification.", function=lambda: len(user_locations))
+metrics.gauge("registered_shelters", "Shelters in the registry.", function=lambda: len(shelter_registry))
+
+@app.get("/metrics")
+def get_metrics():
+    """
+    Returns request, stage and gauge metrics in the Prometheus text format.
+    Args: None
+    Returns: Response
+    """
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled.")
+    return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/metrics/profile")
+def get_profile(seconds: float = 5.0, interval: float = 0.005):
+    """
+    Samples the stacks of all threads for a while; nothing is sampled outside these calls.
+    Args:
+        seconds (float): Sampling duration.
+        interval (float): Seconds between samples.
+    Returns: Response with folded stacks, for flame graph tools.
+    """
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled.")
+    if not 0 < seconds <= METRICS_MAX_PROFILE_SECONDS or not 0.001 <= interval <= 1.0:
+        raise HTTPException(
+            status_code=400,
+            detail=f"seconds must be in (0, {METRICS_MAX_PROFILE_SECONDS}] and interval in [0.001, 1]."
+        )
+    return Response(SamplingProfiler(interval).profile(seconds), media_type="text/plain")
+
+#############################################
+# Start Background Weather Feed
+#############################################
+threading.Thread(target=fetch_weather_data, daemon=True).start()
@@ -0,0 +1,205 @@
+import asyncio
+
+# What to do when a slow client's outbound queue is full.
+DROP_OLDEST = "drop_oldest"      # discard the oldest queued message
+DROP_NEWEST = "drop_newest"      # discard the message being published
+COALESCE = "coalesce"            # discard everything queued, keep only the newest
+DISCONNECT = "disconnect"        # evict the client
+SLOW_CONSUMER_POLICIES = (DROP_OLDEST, DROP_NEWEST, COALESCE, DISCONNECT)
+
+
+class _Client:
+    __slots__ = ("websocket", "queue", "writer", "topics", "sent", "dropped")
+
+    def __init__(self, websocket, queue_size):
+        self.websocket = websocket
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.topics = set()
+        self.writer = None
+        self.sent = 0
+        self.dropped = 0
+
+
+class Broadcaster:
+    """
+    Fans messages out to WebSocket clients. Every client gets its own bounded
+    outbound queue drained by its own writer task, so publishing never waits on
+    a socket and one slow client cannot delay the others.
+    """
+    def __init__(self, queue_size=32, send_timeout=5.0, policy=DROP_OLDEST):
+        """
+        Args:
+            queue_size (int): Outbound messages buffered per client.
+            send_timeout (float): Seconds a single send may take before the client is evicted.
+            policy (str): Slow-consumer policy, one of SLOW_CONSUMER_POLICIES.
+        """
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow-consumer policy: {policy}")
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.policy = policy
+        self.clients = {}
+        self.published = 0
+        self.dropped = 0
+        self.evicted = 0
+        self._loop = None
+
+    def __len__(self):
+        return len(self.clients)
+
+    def register(self, websocket):
+        """
+        Starts the writer task of an accepted connection.
+        Args:
+            websocket: Accepted WebSocket connection.
+        Returns: None
+        """
+        self._loop = asyncio.get_running_loop()
+        client = _Client(websocket, self.queue_size)
+        client.writer = self._loop.create_task(self._write(client))
+        self.clients[websocket] = client
+
+    def unregister(self, websocket):
+        """
+        Stops the writer task of a connection and forgets it.
+        Args:
+            websocket: WebSocket connection.
+        Returns: None
+        """
+        client = self.clients.pop(websocket, None)
+        if client is not None and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+
+    def _enqueue(self, client, message):
+        queue = client.queue
+        if queue.full():
+            if self.policy == DROP_OLDEST:
+                queue.get_nowait()
+                self._count_drop(client)
+            elif self.policy == COALESCE:
+                while not queue.empty():
+                    queue.get_nowait()
+                    self._count_drop(client)
+            else:
+                self._count_drop(client)
+                if self.policy == DISCONNECT:
+                    self._evict(client)
+                return False
+        queue.put_nowait(message)
+        return True
+
+    def _count_drop(self, client):
+        client.dropped += 1
+        self.dropped += 1
+
+    def send(self, websocket, message):
+        """
+        Queues a message for a single connection.
+        Args:
+            websocket: WebSocket connection.
+            message (str): Message to send.
+        Returns:
+            bool: True if the message was queued.
+        """
+        client = self.clients.get(websocket)
+        return client is not None and self._enqueue(client, message)
+
+    def subscribe(self, websocket, topic):
+        """
+        Args:
+            websocket: WebSocket connection.
+            topic (str): Topic to receive messages for.
+        Returns:
+            bool: True if the connection is registered.
+        """
+        client = self.clients.get(websocket)
+        if client is None:
+            return False
+        client.topics.add(topic)
+        return True
+
+    def unsubscribe(self, websocket, topic):
+        """
+        Args:
+            websocket: WebSocket connection.
+            topic (str): Topic to stop receiving.
+        Returns: None
+        """
+        client = self.clients.get(websocket)
+        if client is not None:
+            client.topics.discard(topic)
+
+    def publish(self, message, topic=None):
+        """
+        Queues a message without waiting for any socket. Must be called from the
+        event loop thread.
+        Args:
+            message (str): Message to send.
+            topic (str): Only connections subscribed to this topic receive it;
+                None sends to every connection.
+        Returns:
+            int: Number of connections the message was queued for.
+        """
+        self.published += 1
+        queued = 0
+        for client in list(self.clients.values()):
+            if topic is None or topic in client.topics:
+                queued += self._enqueue(client, message)
+        return queued
+
+    def publish_threadsafe(self, message, topic=None):
+        """
+        Schedules publish() on the event loop from another thread.
+        Args:
+            message (str): Message to send.
+            topic (str): See publish().
+        Returns: None
+        """
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.publish, message, topic)
+
+    def _evict(self, client):
+        if self.clients.pop(client.websocket, None) is None:
+            return
+        self.evicted += 1
+        if client.writer is not asyncio.current_task():
+            client.writer.cancel()
+        asyncio.get_running_loop().create_task(self._close(client.websocket))
+
+    @staticmethod
+    async def _close(websocket):
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+
+    async def _write(self, client):
+        websocket = client.websocket
+        while True:
+            message = await client.queue.get()
+            try:
+                await asyncio.wait_for(websocket.send_text(message), self.send_timeout)
+                client.sent += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print("Evicting WebSocket connection after failed send:", repr(e))
+                self._evict(client)
+                return
+
+    def stats(self):
+        """
+        Returns broadcaster counters.
+        Args: None
+        Returns: dict
+        """
+        return {
+            "connections": len(self.clients),
+            "subscriptions": sum(len(client.topics) for client in self.clients.values()),
+            "policy": self.policy,
+            "queue_size": self.queue_size,
+            "published": self.published,
+            "dropped": self.dropped,
+            "evicted": self.evicted,
+            "queued": sum(client.queue.qsize() for client in self.clients.values())
+        }
@@ -0,0 +1,298 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import threading
+import time
+import numpy as np
+
+# Pressure below which a forecast member counts as cyclonic, as in apply_trends.
+CYCLONIC_PRESSURE = 980.0
+PERCENTILES = (10, 50, 90)
+MAX_MEMBERS = 10_000
+MAX_HOURS = 48
+
+
+def wind_fields(state):
+    """
+    Args:
+        state (Mapping): Weather fields.
+    Returns:
+        list: Keys of the wind fields the forecast perturbs.
+    """
+    return [key for key in state if "Wind" in key]
+
+
+def initial_members(state, members):
+    """
+    Replicates a weather state into ensemble arrays.
+    Args:
+        state (Mapping): Weather fields to start from.
+        members (int): Ensemble size.
+    Returns:
+        tuple: (pressure of shape (members,), winds of shape (n_wind_fields, members))
+    """
+    pressure = np.full(members, float(state["Minimum Pressure"]))
+    winds = np.repeat(np.array([[float(state[key])] for key in wind_fields(state)]), members, axis=1)
+    return pressure, winds
+
+
+def simulate_ensemble(pressure, winds, hours, rng, pressure_range):
+    """
+    Advances every ensemble member hour by hour with the /forecast trend rules.
+    Each hour is a single vectorized update over all members and wind fields.
+    Args:
+        pressure (np.ndarray): Member pressures, shape (members,); updated in place.
+        winds (np.ndarray): Member winds, shape (n_wind_fields, members); updated in place.
+        hours (int): Number of hours to simulate.
+        rng (np.random.Generator): Random source.
+        pressure_range (tuple): (min, max) pressure.
+    Returns:
+        tuple: (pressure path of shape (hours, members), wind path of shape (hours, n_wind_fields, members))
+    """
+    n_fields, members = winds.shape
+    pressure_path = np.empty((hours, members))
+    wind_path = np.empty((hours, n_fields, members))
+    for hour in range(hours):
+        pressure += rng.uniform(-0.3, 0.3, members)
+        np.clip(pressure, pressure_range[0], pressure_range[1], out=pressure)
+        winds *= 1 + (1013 - pressure) / 1000
+        winds += rng.uniform(-0.5, 0.5, (n_fields, members))
+        np.maximum(winds, 0, out=winds)
+        pressure_path[hour] = pressure
+        wind_path[hour] = winds
+    return pressure_path, wind_path
+
+
+def percentile_bands(samples):
+    """
+    PERCENTILES of the last axis with the same linear interpolation as
+    np.percentile, but via a single sort, which is much faster for many
+    small rows.
+    Args:
+        samples (np.ndarray): Ensemble values with members on the last axis.
+    Returns:
+        np.ndarray: Shape samples.shape[:-1] + (len(PERCENTILES),).
+    """
+    members = samples.shape[-1]
+    ordered = np.sort(samples, axis=-1)
+    positions = np.array(PERCENTILES, dtype=np.float64) / 100 * (members - 1)
+    lower = np.floor(positions).astype(np.intp)
+    upper = np.minimum(lower + 1, members - 1)
+    weight = positions - lower
+    return ordered[..., lower] * (1 - weight) + ordered[..., upper] * weight
+
+
+def summarize_ensemble(fields, pressure_path, wind_path, start_time=None):
+    """
+    Reduces ensemble paths to per-hour percentile bands and threshold probabilities.
+    Args:
+        fields (list): Wind field names, in the column order of wind_path.
+        pressure_path (np.ndarray): Shape (hours, members).
+        wind_path (np.ndarray): Shape (hours, n_wind_fields, members).
+        start_time (datetime): Time the forecast starts from (default now).
+    Returns:
+        list: One dict per hour.
+    """
+    start_time = start_time or datetime.now()
+    labels = [f"p{p}" for p in PERCENTILES]
+    pressure_bands = percentile_bands(pressure_path).tolist()   # (hours, 3)
+    wind_bands = percentile_bands(wind_path).tolist()           # (hours, fields, 3)
+    cyclonic = pressure_path < CYCLONIC_PRESSURE
+    probability_cyclonic = cyclonic.mean(axis=1)
+    cumulative_probability_cyclonic = np.logical_or.accumulate(cyclonic, axis=0).mean(axis=1)
+
+    forecast = []
+    for hour in range(len(pressure_path)):
+        bands = {"Minimum Pressure": dict(zip(labels, pressure_bands[hour]))}
+        for field, values in zip(fields, wind_bands[hour]):
+            bands[field] = dict(zip(labels, values))
+        forecast.append({
+            "hour": hour + 1,
+            "timestamp": (start_time + timedelta(hours=hour + 1)).isoformat(),
+            "bands": bands,
+            "probability_cyclonic": float(probability_cyclonic[hour]),
+            "cumulative_probability_cyclonic": float(cumulative_probability_cyclonic[hour])
+        })
+    return forecast
+
+
+class _Trajectory:
+    """
+    Simulated paths of one (state version, members, seed) ensemble, plus the
+    member state and generator needed to extend them further.
+    """
+    __slots__ = ("pressure", "winds", "rng", "pressure_path", "wind_path", "summaries", "last_used", "lock")
+
+    def __init__(self, snapshot, members, seed):
+        self.pressure, self.winds = initial_members(snapshot, members)
+        self.rng = np.random.default_rng(seed)
+        self.pressure_path = np.empty((0, members))
+        self.wind_path = np.empty((0,) + self.winds.shape)
+        self.summaries = {}
+        self.last_used = time.monotonic()
+        # Serializes simulation of this trajectory; held while it is extended.
+        self.lock = threading.Lock()
+
+    @property
+    def hours(self):
+        return len(self.pressure_path)
+
+    @property
+    def nbytes(self):
+        return self.pressure_path.nbytes + self.wind_path.nbytes
+
+
+class ForecastCache:
+    """
+    Bounded LRU/TTL cache of forecast trajectories keyed by (state version,
+    members, seed). Hours are simulated strictly in order from one generator,
+    so a longer horizon extends the cached prefix and yields exactly what a
+    fresh run would: a 48 h request after a 6 h one only simulates hours 7-48.
+    Summaries are cached per horizon as well.
+    """
+    def __init__(self, pressure_range, max_entries=32, max_bytes=256 * 2**20, ttl=600.0):
+        """
+        Args:
+            pressure_range (tuple): (min, max) pressure.
+            max_entries (int): Most trajectories kept.
+            max_bytes (int): Most bytes of simulated paths kept.
+            ttl (float): Seconds an unused trajectory stays cached.
+        """
+        self.pressure_range = pressure_range
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.extensions = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _evict(self, now):
+        entries = self._entries
+        total = sum(entry.nbytes for entry in entries.values())
+        while entries:
+            key, oldest = next(iter(entries.items()))
+            if (len(entries) <= self.max_entries and total <= self.max_bytes
+                    and now - oldest.last_used <= self.ttl):
+                break
+            total -= oldest.nbytes
+            del entries[key]
+            self.evictions += 1
+
+    def _lookup(self, snapshot, members, seed):
+        # Called with self._lock held; only does bookkeeping, never simulates.
+        key = (snapshot.version, members, seed)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and now - entry.last_used > self.ttl:
+            del self._entries[key]
+            self.evictions += 1
+            entry = None
+        created = entry is None
+        if created:
+            entry = _Trajectory(snapshot, members, seed)
+            self._entries[key] = entry
+        entry.last_used = now
+        self._entries.move_to_end(key)
+        self._evict(now)
+        return entry, created
+
+    def _cached(self, snapshot, hours, members, seed, build):
+        """
+        Returns the cached result for a horizon, or simulates and builds it.
+        The cache lock only guards the bookkeeping: simulation runs under the
+        trajectory's own lock, so a slow miss never blocks hits or other keys,
+        and concurrent requests for one key compute it only once.
+        Args:
+            build (callable): Takes the trajectory and returns the result for hours.
+        """
+        with self._lock:
+            entry, created = self._lookup(snapshot, members, seed)
+            result = entry.summaries.get(hours)
+            if result is not None:
+                self.hits += 1
+                return result
+
+        # A request that waited here for the same key finds its result already built.
+        outcome = "hits"
+        with entry.lock:
+            result = entry.summaries.get(hours)
+            if result is None:
+                if entry.hours < hours:
+                    outcome = "misses" if created else "extensions"
+                    pressure_path, wind_path = simulate_ensemble(
+                        entry.pressure, entry.winds, hours - entry.hours, entry.rng, self.pressure_range
+                    )
+                    entry.pressure_path = np.concatenate([entry.pressure_path, pressure_path])
+                    entry.wind_path = np.concatenate([entry.wind_path, wind_path])
+                result = build(entry)
+                entry.summaries[hours] = result
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            # The paths may have grown past the byte budget.
+            self._evict(time.monotonic())
+        return result
+
+    def ensemble(self, snapshot, hours, members, seed):
+        """
+        Ensemble forecast of a snapshot, built from cached paths where possible.
+        Args:
+            snapshot (WeatherSnapshot): State to forecast from.
+            hours (int): Forecast horizon.
+            members (int): Ensemble size.
+            seed (int): Random seed; the same seed and state give the same forecast.
+        Returns:
+            list: Per-hour percentile bands and probabilities.
+        """
+        def build(entry):
+            return summarize_ensemble(
+                wind_fields(snapshot), entry.pressure_path[:hours], entry.wind_path[:hours],
+                start_time=snapshot.timestamp
+            )
+        return self._cached(snapshot, hours, members, seed, build)
+
+    def single(self, snapshot, hours, seed):
+        """
+        Single-path forecast of a snapshot: one ensemble member expanded into full states.
+        Args:
+            snapshot (WeatherSnapshot): State to forecast from.
+            hours (int): Forecast horizon.
+            seed (int): Random seed.
+        Returns:
+            list: One {"hour", "timestamp", "weather_data"} dict per hour.
+        """
+        def build(entry):
+            fields = wind_fields(snapshot)
+            pressures = entry.pressure_path[:hours, 0].tolist()
+            winds = entry.wind_path[:hours, :, 0].tolist()
+            forecast = []
+            for hour in range(hours):
+                weather_data = snapshot.as_dict()
+                weather_data["Minimum Pressure"] = pressures[hour]
+                weather_data.update(zip(fields, winds[hour]))
+                forecast.append({
+                    "hour": hour + 1,
+                    "timestamp": (snapshot.timestamp + timedelta(hours=hour + 1)).isoformat(),
+                    "weather_data": weather_data
+                })
+            return forecast
+        return self._cached(snapshot, hours, 1, seed, build)
+
+    def stats(self):
+        """
+        Returns cache counters.
+        Args: None
+        Returns: dict
+        """
+        with self._lock:
+            requests = self.hits + self.extensions + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(entry.nbytes for entry in self._entries.values()),
+                "hits": self.hits,
+                "prefix_extensions": self.extensions,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / requests if requests else 0.0
+            }
@@ -0,0 +1,104 @@
+import json
+import os
+import numpy as np
+
+FOREST_FORMAT_VERSION = 1
+FOREST_ARRAYS = ("nodes", "roots", "leaf_values")
+# Columns of the (n_nodes, 4) int32 node table; threshold holds float32 bits.
+LEFT, RIGHT, THRESHOLD, FEATURE = range(4)
+META_FILE = "meta.json"
+
+
+class CompiledForest:
+    """
+    Random forest exported by Src/model.py as flat node arrays, evaluated with
+    NumPy. The arrays are memory-mapped read-only, so every worker process
+    serving the same artifact shares one copy in the page cache.
+
+    Row i of the node table tests X[:, feature] <= threshold and moves to
+    node left or right. Leaves have left < 0, and -1 - left is their row in
+    leaf_values (class probabilities). Thresholds are stored as float32
+    rounded down from sklearn's float64 values, which gives identical
+    decisions for the float32 inputs sklearn itself compares against them.
+    Implements the parts of the sklearn classifier API the server uses.
+    """
+    def __init__(self, directory, mmap=True):
+        """
+        Args:
+            directory (str): Artifact directory written by export_forest.
+            mmap (bool): Memory-map the arrays instead of reading them into memory.
+        """
+        with open(os.path.join(directory, META_FILE)) as f:
+            meta = json.load(f)
+        if meta.get("version") != FOREST_FORMAT_VERSION:
+            raise ValueError(f"Unsupported forest format version: {meta.get('version')}")
+        mmap_mode = "r" if mmap else None
+        for name in FOREST_ARRAYS:
+            setattr(self, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode))
+        # Each row viewed as one 16-byte item: take() then copies a node with a
+        # single memcpy, far faster than gathering four columns separately.
+        self._node_rows = self.nodes.view(np.void(self.nodes.strides[0])).ravel()
+        self.meta = meta
+        self.classes_ = np.array(meta["classes"])
+        self.feature_names_in_ = np.array(meta["feature_names"], dtype=object)
+        self.n_features_in_ = len(meta["feature_names"])
+        self.n_estimators = len(self.roots)
+
+    def apply(self, X):
+        """
+        Args:
+            X (np.ndarray): Float32 feature matrix of shape (n, n_features).
+        Returns:
+            np.ndarray: Leaf row reached in each tree, shape (n, n_trees).
+        """
+        n = len(X)
+        n_trees = len(self.roots)
+        flat_X = X.ravel()
+        leaves = np.empty(n * n_trees, dtype=np.int32)
+        # Walk all (tree, row) pairs one level per step, dropping pairs that reached a leaf.
+        # Pairs are ordered tree by tree so that neighbouring lookups share cached nodes.
+        pairs = np.arange(n_trees * n)
+        row_offsets = np.tile(np.arange(n) * X.shape[1], n_trees)
+        nodes = np.repeat(self.roots, n)
+        while len(nodes):
+            rows = self._node_rows.take(nodes)
+            left = rows.view(np.int32)[LEFT::4]
+            done = left < 0
+            if done.any():
+                leaves[pairs[done]] = -1 - left[done]
+                keep = ~done
+                pairs, row_offsets, rows = pairs[keep], row_offsets[keep], rows[keep]
+            table = rows.view(np.int32).reshape(-1, 4)
+            go_left = flat_X[row_offsets + table[:, FEATURE]] <= table[:, THRESHOLD].view(np.float32)
+            nodes = np.where(go_left, table[:, LEFT], table[:, RIGHT])
+        return leaves.reshape(n_trees, n).T
+
+    def predict_proba(self, X, chunk_pairs=1 << 20):
+        """
+        Args:
+            X (array-like): Feature matrix of shape (n, n_features).
+            chunk_pairs (int): Upper bound on rows x trees evaluated at once, to cap memory.
+        Returns:
+            np.ndarray: Class probabilities averaged over the trees, shape (n, n_classes).
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected a matrix with {self.n_features_in_} features.")
+        if not np.isfinite(X).all():
+            raise ValueError("Input contains NaN or infinity.")
+        proba = np.empty((len(X), len(self.classes_)))
+        step = max(1, chunk_pairs // max(1, len(self.roots)))
+        for start in range(0, len(X), step):
+            leaves = self.apply(X[start:start + step])
+            proba[start:start + step] = self.leaf_values[leaves].sum(axis=1, dtype=np.float64)
+        proba /= len(self.roots)
+        return proba
+
+    def predict(self, X):
+        """
+        Args:
+            X (array-like): Feature matrix of shape (n, n_features).
+        Returns:
+            np.ndarray: Predicted classes.
+        """
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
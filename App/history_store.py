@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+import numpy as np
+
+META_FILE = "meta.json"
+
+
+class HistoryStore:
+    """
+    Fixed-capacity ring buffer of weather snapshots. Each field is a float32
+    column and timestamps (seconds since the epoch) a float64 column; once the
+    buffer is full the oldest snapshot is overwritten.
+
+    Timestamps must increase, so the ring holds at most two sorted runs and a
+    time range is found by binary search on each. Empty slots hold NaN.
+    With a directory the columns are memory-mapped .npy files, which survive
+    restarts: the write position is recovered from the timestamps themselves.
+    """
+    def __init__(self, fields, capacity, directory=None):
+        """
+        Args:
+            fields (list): Names of the numeric fields to record.
+            capacity (int): Number of snapshots kept.
+            directory (str): Spill the columns to memory-mapped files here; None keeps them in memory.
+        """
+        if capacity < 1:
+            raise ValueError("History capacity must be positive.")
+        self.fields = list(fields)
+        self.capacity = capacity
+        self.directory = directory
+        self._columns = {name: i for i, name in enumerate(self.fields)}
+        self._lock = threading.Lock()
+        if directory is None:
+            self._times = np.full(capacity, np.nan)
+            self._values = np.full((len(self.fields), capacity), np.nan, dtype=np.float32)
+        else:
+            self._times, self._values = self._open_files(directory)
+        filled = np.isfinite(self._times)
+        self._count = int(filled.sum())
+        # Until the buffer wraps, slots fill from 0; afterwards the oldest entry is the next to overwrite.
+        self._head = self._count % capacity if self._count < capacity else int(np.argmin(self._times))
+
+    def _open_files(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, META_FILE)
+        times_path = os.path.join(directory, "times.npy")
+        values_path = os.path.join(directory, "values.npy")
+        meta = {"fields": self.fields, "capacity": self.capacity}
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                if json.load(f) == meta:
+                    return (np.lib.format.open_memmap(times_path, mode="r+"),
+                            np.lib.format.open_memmap(values_path, mode="r+"))
+            print(f"History layout in {directory} changed; starting a new history.")
+
+        times = np.lib.format.open_memmap(times_path, mode="w+", dtype=np.float64, shape=(self.capacity,))
+        values = np.lib.format.open_memmap(
+            values_path, mode="w+", dtype=np.float32, shape=(len(self.fields), self.capacity)
+        )
+        times[:] = np.nan
+        values[:] = np.nan
+        with open(meta_path, "w") as f:
+            json.dump(meta, f, indent=2)
+        return times, values
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def nbytes(self):
+        return self._times.nbytes + self._values.nbytes
+
+    def append(self, timestamp, data):
+        """
+        Records one snapshot.
+        Args:
+            timestamp (float): Seconds since the epoch; must be later than the last one recorded.
+            data (Mapping): Field values; missing fields are stored as NaN.
+        Returns:
+            bool: False if the timestamp was not later than the newest entry and nothing was stored.
+        """
+        row = [float(data.get(name, np.nan)) for name in self.fields]
+        with self._lock:
+            if self._count and timestamp <= self._times[(self._head - 1) % self.capacity]:
+                return False
+            self._times[self._head] = timestamp
+            self._values[:, self._head] = row
+            self._head = (self._head + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+            return True
+
+    def _runs(self):
+        # The stored entries as at most two (start, stop) slot ranges in time order.
+        start = (self._head - self._count) % self.capacity
+        if start + self._count <= self.capacity:
+            return [(start, start + self._count)]
+        return [(start, self.capacity), (0, self._head)]
+
+    def query(self, since=None, until=None, fields=None, max_points=None):
+        """
+        Args:
+            since (float): Earliest timestamp to include; None starts at the oldest entry.
+            until (float): Latest timestamp to include; None ends at the newest entry.
+            fields (list): Fields to return; None returns all of them.
+            max_points (int): If more entries match, every k-th one is returned so at most this many remain.
+        Returns:
+            dict: "timestamps" array, "values" dict of arrays per field and the "stride" used.
+        """
+        fields = self.fields if fields is None else list(fields)
+        unknown = [name for name in fields if name not in self._columns]
+        if unknown:
+            raise KeyError(f"Unknown history fields: {unknown}")
+        rows = [self._columns[name] for name in fields]
+        with self._lock:
+            slots = []
+            for start, stop in self._runs():
+                times = self._times[start:stop]
+                lo = 0 if since is None else np.searchsorted(times, since, side="left")
+                hi = len(times) if until is None else np.searchsorted(times, until, side="right")
+                if lo < hi:
+                    slots.append((start + lo, start + hi))
+            total = sum(stop - start for start, stop in slots)
+            stride = 1 if not max_points or total <= max_points else -(-total // max_points)
+            if len(slots) <= 1:
+                start, stop = slots[0] if slots else (0, 0)
+                index = slice(start, stop, stride)
+                values = self._values[rows, index]
+            else:
+                index = np.concatenate([np.arange(start, stop) for start, stop in slots])[::stride]
+                values = self._values[np.ix_(rows, index)]
+            # Copies, as the slots are overwritten once the ring wraps.
+            timestamps = np.array(self._times[index])
+            values = np.array(values)
+        return {
+            "timestamps": timestamps,
+            "values": dict(zip(fields, values)),
+            "stride": int(stride),
+        }
+
+    def flush(self):
+        """
+        Writes memory-mapped columns back to disk; a no-op in memory.
+        Args: None
+        Returns: None
+        """
+        if self.directory is not None:
+            with self._lock:
+                self._times.flush()
+                self._values.flush()
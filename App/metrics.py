@@ -0,0 +1,357 @@
+import bisect
+import functools
+import inspect
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter as _StackCounter
+
+# Latency buckets in seconds, from 100 us to 30 s.
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class Counter:
+    """
+    Monotonically increasing value per label set.
+    """
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, _format_labels(self.labelnames, labels), value) for labels, value in items]
+
+
+class Gauge:
+    """
+    Value per label set that can go up and down. With a function, the gauge
+    has no labels and is read from the function at scrape time, so the hot
+    path never has to update it.
+    """
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labelnames=(), function=None):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.function = function
+        self._values = {}
+
+    def set(self, value, *labels):
+        self._values[labels] = float(value)
+
+    def samples(self):
+        if self.function is not None:
+            value = self.function()
+            return [] if value is None else [(self.name, "", value)]
+        return [(self.name, _format_labels(self.labelnames, labels), value) for labels, value in list(self._values.items())]
+
+
+class Histogram:
+    """
+    Distribution of observed values over fixed buckets per label set. Counts
+    are kept per bucket and only made cumulative when rendered.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        samples = []
+        for labels, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                samples.append((f"{self.name}_bucket", _format_labels(self.labelnames, labels, le), cumulative))
+            samples.append((f"{self.name}_sum", _format_labels(self.labelnames, labels), total))
+            samples.append((f"{self.name}_count", _format_labels(self.labelnames, labels), count))
+        return samples
+
+
+class _NullTimer:
+    # Shared no-op context manager returned by MetricsRegistry.timer while disabled.
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    __slots__ = ("histogram", "stage", "start")
+
+    def __init__(self, histogram, stage):
+        self.histogram = histogram
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, self.stage)
+        return False
+
+
+class MetricsRegistry:
+    """
+    Metrics of one process, rendered in the Prometheus text format. While
+    disabled, timer() returns a shared no-op context manager and the timed
+    decorator calls straight through, so instrumented code pays only an
+    attribute check.
+    """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self.stage_seconds = self.histogram(
+            "stage_duration_seconds", "Time spent in internal stages.", ("stage",)
+        )
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric {metric.name} already registered as a {existing.kind}.")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=(), function=None):
+        gauge = self._register(Gauge(name, help_text, labelnames))
+        if function is not None:
+            gauge.function = function
+        return gauge
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def timer(self, stage):
+        """
+        Args:
+            stage (str): Stage name, the label of stage_duration_seconds.
+        Returns:
+            Context manager that records the time spent in its block.
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self.stage_seconds, stage)
+
+    def timed(self, stage):
+        """
+        Decorator recording every call of a function, sync or async, as a stage.
+        Args:
+            stage (str): Stage name.
+        """
+        def decorate(function):
+            if inspect.iscoroutinefunction(function):
+                @functools.wraps(function)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await function(*args, **kwargs)
+                    with _StageTimer(self.stage_seconds, stage):
+                        return await function(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with _StageTimer(self.stage_seconds, stage):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def render(self):
+        """
+        Args: None
+        Returns:
+            str: Every metric in the Prometheus text exposition format.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.samples()
+            except Exception as e:  # A failing gauge function must not break the scrape.
+                print(f"Metric {metric.name} failed: {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the count and latency of every HTTP request by
+    method, route template and status. Route templates rather than raw paths
+    keep the number of series bounded. Only installed when metrics are enabled.
+    """
+    def __init__(self, app, registry):
+        self.app = app
+        self.registry = registry
+        self.requests = registry.counter(
+            "http_requests_total", "HTTP requests handled.", ("method", "route", "status")
+        )
+        self.latency = registry.histogram(
+            "http_request_duration_seconds", "HTTP request latency.", ("method", "route")
+        )
+        self.in_progress = registry.gauge("http_requests_in_progress", "HTTP requests being handled.")
+        self._in_progress = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.registry.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        self._in_progress += 1
+        self.in_progress.set(self._in_progress)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._in_progress -= 1
+            self.in_progress.set(self._in_progress)
+            route = scope.get("route")
+            route = getattr(route, "path", "unmatched")
+            self.requests.inc(scope["method"], route, status[0])
+            self.latency.observe(elapsed, scope["method"], route)
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every thread at a fixed interval and counts them in
+    the folded format read by flame graph tools. It runs only while started,
+    and then costs one stack walk per thread per interval.
+    """
+    def __init__(self, interval=0.005, max_depth=64):
+        """
+        Args:
+            interval (float): Seconds between samples.
+            max_depth (int): Innermost frames kept per stack.
+        """
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = _StackCounter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        own = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            names = []
+            while frame is not None and len(names) < self.max_depth:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def profile(self, seconds):
+        """
+        Samples for a number of seconds.
+        Args:
+            seconds (float): Sampling duration.
+        Returns:
+            str: Folded stacks, one "frame;frame;... count" line each, most frequent first.
+        """
+        self.start()
+        try:
+            time.sleep(seconds)
+        finally:
+            self.stop()
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+# Process-wide registry; the services turn it on with METRICS_ENABLED.
+REGISTRY = MetricsRegistry()
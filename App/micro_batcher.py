@@ -0,0 +1,127 @@
+import asyncio
+import time
+from collections import deque
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Collects concurrent prediction requests and runs them through the model as one
+    vectorized call. A batch is flushed when it reaches max_batch_size or when the
+    oldest request has waited max_wait_ms, whichever comes first.
+    """
+    def __init__(self, predict_fn, max_batch_size=256, max_wait_ms=2.0, metrics_window=4096):
+        """
+        Args:
+            predict_fn (callable): Takes an (n, n_features) matrix and returns n results.
+            max_batch_size (int): Largest number of rows sent to predict_fn at once.
+            max_wait_ms (float): How long the first request of a batch may wait for company.
+            metrics_window (int): Number of recent requests/batches kept for percentiles.
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.requests = 0
+        self.batches = 0
+        self._batch_sizes = deque(maxlen=metrics_window)
+        self._latencies = deque(maxlen=metrics_window)
+        self._loop = None
+        self._queue = None
+        self._worker = None
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, row):
+        """
+        Queues a single feature row and waits for its prediction.
+        Args:
+            row (np.ndarray): Feature matrix of shape (1, n_features).
+        Returns:
+            The predict_fn result for this row.
+        """
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self.requests += 1
+        self._queue.put_nowait((row, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            try:
+                matrix = np.vstack([item[0] for item in batch])
+                results = await self._loop.run_in_executor(None, self.predict_fn, matrix)
+            except Exception as e:
+                if len(batch) == 1:
+                    self._fail(batch, e)
+                    continue
+                # Retry row by row so that a bad row fails only its own request.
+                for item in batch:
+                    await self._run_single(item)
+                continue
+
+            self._finish(batch, results)
+
+    async def _run_single(self, item):
+        try:
+            results = await self._loop.run_in_executor(None, self.predict_fn, np.atleast_2d(item[0]))
+        except Exception as e:
+            self._fail([item], e)
+        else:
+            self._finish([item], results)
+
+    @staticmethod
+    def _fail(batch, error):
+        for _, future, _ in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    def _finish(self, batch, results):
+        finished = time.perf_counter()
+        self.batches += 1
+        self._batch_sizes.append(len(batch))
+        for (_, future, enqueued), result in zip(batch, results):
+            self._latencies.append(finished - enqueued)
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        """
+        Returns queue depth, batch size and latency metrics.
+        Args: None
+        Returns: dict
+        """
+        batch_sizes = np.array(self._batch_sizes, dtype=np.float64)
+        latencies = np.array(self._latencies, dtype=np.float64) * 1000.0
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "requests": self.requests,
+            "batches": self.batches,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batch_size_mean": float(batch_sizes.mean()) if batch_sizes.size else 0.0,
+            "batch_size_max": int(batch_sizes.max()) if batch_sizes.size else 0,
+            "latency_p50_ms": float(np.percentile(latencies, 50)) if latencies.size else 0.0,
+            "latency_p99_ms": float(np.percentile(latencies, 99)) if latencies.size else 0.0
+        }
@@ -0,0 +1,230 @@
+import math
+import threading
+import numpy as np
+from spatial_index import GeoGridIndex
+
+EARTH_RADIUS_KM = 6371.0
+
+# Order matters: a user belongs to the first zone whose radius covers them.
+ZONE_NAMES = ("red_zone", "orange_zone", "yellow_zone")
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance between two points.
+    Args:
+        lat1, lon1 (float): First point in degrees.
+        lat2, lon2 (float): Second point in degrees.
+    Returns:
+        float: Distance in km.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def haversine_many(lat_rad, lon_rad, cos_lat, center_lat, center_lon):
+    """
+    Great-circle distances from many points to one centre in a single vectorized pass.
+    Args:
+        lat_rad, lon_rad (np.ndarray): Point coordinates in radians.
+        cos_lat (np.ndarray): Precomputed cos(lat_rad).
+        center_lat, center_lon (float): Centre in degrees.
+    Returns:
+        np.ndarray: Distances in km.
+    """
+    phi0 = math.radians(center_lat)
+    lambda0 = math.radians(center_lon)
+    a = np.sin((lat_rad - phi0) * 0.5)
+    a *= a
+    b = np.sin((lon_rad - lambda0) * 0.5)
+    b *= b
+    b *= cos_lat
+    b *= math.cos(phi0)
+    a += b
+    np.sqrt(a, out=a)
+    np.minimum(a, 1.0, out=a)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(a, out=a)
+
+
+def calculate_danger_radius(severity, max_wind):
+    """
+    Radii of the concentric danger zones around a cyclone centre.
+    Args:
+        severity (float): Cyclonic severity on a 0-10 scale.
+        max_wind (float): Maximum sustained wind in km/h.
+    Returns:
+        dict: red_zone, orange_zone and yellow_zone radii in km.
+    """
+    red_zone = 10.0 + 5.0 * max(severity, 0) + 0.1 * max(max_wind, 0)
+    return {
+        "red_zone": round(red_zone, 2),
+        "orange_zone": round(red_zone * 2, 2),
+        "yellow_zone": round(red_zone * 3, 2)
+    }
+
+
+class ProximityEngine:
+    """
+    Registry of user coordinates held in contiguous NumPy arrays so that every
+    registered user can be classified into the danger zones in one pass. A
+    GeoGridIndex over the same slots narrows radius queries to nearby users.
+    """
+    def __init__(self, initial_capacity=1024, index_cell_deg=0.5):
+        self._lock = threading.Lock()
+        self._index = GeoGridIndex(index_cell_deg, initial_capacity)
+        self._lat = np.empty(initial_capacity, dtype=np.float64)
+        self._lon = np.empty(initial_capacity, dtype=np.float64)
+        self._cos_lat = np.empty(initial_capacity, dtype=np.float64)
+        self._ids = []
+        self._slots = {}
+        self.size = 0
+        self.version = 0
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self, needed):
+        capacity = len(self._lat)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ("_lat", "_lon", "_cos_lat"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=np.float64)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def upsert_many(self, user_ids, latitudes, longitudes):
+        """
+        Registers users or moves already registered ones.
+        Args:
+            user_ids (list): User identifiers.
+            latitudes, longitudes (array-like): Coordinates in degrees.
+        Returns:
+            np.ndarray: Slot index of each user.
+        """
+        lat_rad = np.radians(np.asarray(latitudes, dtype=np.float64))
+        lon_rad = np.radians(np.asarray(longitudes, dtype=np.float64))
+        if not (len(user_ids) == len(lat_rad) == len(lon_rad)):
+            raise ValueError("user_ids, latitudes and longitudes must have the same length.")
+
+        with self._lock:
+            self._grow(self.size + len(user_ids))
+            slots = np.empty(len(user_ids), dtype=np.int64)
+            for i, user_id in enumerate(user_ids):
+                slot = self._slots.get(user_id)
+                if slot is None:
+                    slot = self.size
+                    self._slots[user_id] = slot
+                    self._ids.append(user_id)
+                    self.size += 1
+                slots[i] = slot
+            self._lat[slots] = lat_rad
+            self._lon[slots] = lon_rad
+            self._cos_lat[slots] = np.cos(lat_rad)
+            self._index.update_many(slots, latitudes, longitudes)
+            self.version += 1
+            return slots
+
+    def upsert(self, user_id, latitude, longitude):
+        """
+        Registers or moves a single user.
+        Args:
+            user_id: User identifier.
+            latitude, longitude (float): Coordinates in degrees.
+        Returns:
+            int: Slot index of the user.
+        """
+        return int(self.upsert_many([user_id], [latitude], [longitude])[0])
+
+    def remove(self, user_id):
+        """
+        Unregisters a user by moving the last slot into its place.
+        Args:
+            user_id: User identifier.
+        Returns:
+            bool: True if the user was registered.
+        """
+        with self._lock:
+            slot = self._slots.pop(user_id, None)
+            if slot is None:
+                return False
+            last = self.size - 1
+            self._index.remove(slot)
+            if slot != last:
+                moved_id = self._ids[last]
+                self._ids[slot] = moved_id
+                self._slots[moved_id] = slot
+                self._lat[slot] = self._lat[last]
+                self._lon[slot] = self._lon[last]
+                self._cos_lat[slot] = self._cos_lat[last]
+                self._index.remove(last)
+                self._index.insert(slot, math.degrees(self._lat[slot]), math.degrees(self._lon[slot]))
+            self._ids.pop()
+            self.size = last
+            self.version += 1
+            return True
+
+    def user_ids(self, slots):
+        """
+        Maps slot indices back to user identifiers.
+        Args:
+            slots (np.ndarray): Slot indices.
+        Returns:
+            list: User identifiers.
+        """
+        ids = self._ids
+        return [ids[i] for i in slots]
+
+    def distances(self, center_lat, center_lon):
+        """
+        Distance of every registered user to a point.
+        Args:
+            center_lat, center_lon (float): Point in degrees.
+        Returns:
+            np.ndarray: Distances in km, indexed by slot.
+        """
+        n = self.size
+        return haversine_many(self._lat[:n], self._lon[:n], self._cos_lat[:n], center_lat, center_lon)
+
+    def query_radius(self, center_lat, center_lon, radius_km):
+        """
+        Users within a radius of a point, found through the grid index.
+        Args:
+            center_lat, center_lon (float): Point in degrees.
+            radius_km (float): Query radius in km.
+        Returns:
+            tuple: (slot indices, distances in km) of the users inside the radius.
+        """
+        with self._lock:
+            slots = self._index.candidates(center_lat, center_lon, radius_km)
+            distances = haversine_many(
+                self._lat[slots], self._lon[slots], self._cos_lat[slots], center_lat, center_lon
+            )
+        inside = distances <= radius_km
+        return slots[inside], distances[inside]
+
+    def classify(self, center_lat, center_lon, danger_zones, use_index=True):
+        """
+        Splits registered users into the danger zones around a cyclone centre.
+        Args:
+            center_lat, center_lon (float): Cyclone centre in degrees.
+            danger_zones (dict): Radii from calculate_danger_radius.
+            use_index (bool): Query the grid index instead of scanning every user.
+        Returns:
+            dict: Slot index array per zone name.
+        """
+        radii = np.array([danger_zones[name] for name in ZONE_NAMES], dtype=np.float64)
+        if use_index:
+            slots, distances = self.query_radius(center_lat, center_lon, radii[-1])
+        else:
+            with self._lock:
+                distances = self.distances(center_lat, center_lon)
+            slots = np.arange(len(distances))
+        # band 0 = red, 1 = orange, 2 = yellow, 3 = outside every zone
+        band = np.searchsorted(radii, distances, side="left")
+        return {name: slots[band == i] for i, name in enumerate(ZONE_NAMES)}
@@ -0,0 +1,320 @@
+import math
+import threading
+import numpy as np
+from sklearn.neighbors import KDTree
+from proximity import EARTH_RADIUS_KM
+
+# Shelters added or moved since the last rebuild are searched by brute force and
+# replaced tree entries are skipped; the tree is rebuilt once these pending
+# changes exceed this count, which keeps the per-query overhead bounded.
+MAX_PENDING_CHANGES = 256
+# Query points handled per pass, to bound the candidate matrices of bulk queries.
+QUERY_CHUNK = 16_384
+SHELTER_FIELDS = ("name", "address", "contact", "capacity", "currentOccupancy")
+
+
+def unit_vectors(lat_rad, lon_rad):
+    """
+    Args:
+        lat_rad, lon_rad (np.ndarray): Points in radians.
+    Returns:
+        np.ndarray: Points on the unit sphere, shape (n, 3).
+    """
+    cos_lat = np.cos(lat_rad)
+    return np.column_stack([cos_lat * np.cos(lon_rad), cos_lat * np.sin(lon_rad), np.sin(lat_rad)])
+
+
+def chord_to_km(chord):
+    """
+    Args:
+        chord (np.ndarray): Straight-line distances between unit vectors.
+    Returns:
+        np.ndarray: Great-circle distances in km.
+    """
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord * 0.5, 1.0))
+
+
+def km_to_chord(km):
+    return 2 * math.sin(min(km / (2 * EARTH_RADIUS_KM), math.pi / 2))
+
+
+class _TreeSnapshot:
+    """
+    Immutable state a query reads: the tree and its points, the tombstones of
+    tree entries replaced since, and the delta buffer. ids holds the tree's
+    shelter ids followed by the delta's, so candidates are plain integers.
+    """
+    __slots__ = ("tree", "points", "dead", "delta", "ids")
+
+    def __init__(self, tree, points, dead, delta, ids):
+        self.tree = tree
+        self.points = points
+        self.dead = dead
+        self.delta = delta
+        self.ids = ids
+
+
+class ShelterRegistry:
+    """
+    Shelters indexed by location for k-nearest queries. Most shelters sit in a
+    KDTree over unit vectors, whose chord distance orders points exactly like
+    the great-circle distance at a fraction of the cost of a haversine
+    BallTree. Shelters changed since it was built live in a small
+    delta buffer, and replaced or removed tree entries are tombstoned, so edits
+    never wait for a rebuild. Queries merge the tree and the delta and skip
+    tombstoned shelters, as well as shelters inside an excluded disc.
+    """
+    def __init__(self, shelters=(), max_pending=MAX_PENDING_CHANGES):
+        """
+        Args:
+            shelters (list): Initial shelters, as for upsert.
+            max_pending (int): Changes held in the delta buffer and tombstones before a rebuild.
+        """
+        self._lock = threading.Lock()
+        self.max_pending = max_pending
+        self._records = {}
+        self._tree = None
+        self._points = np.empty((0, 3))
+        self._tree_ids = np.empty(0, dtype=object)
+        self._tree_slots = {}
+        self._dead = np.zeros(0, dtype=bool)
+        self._delta = {}
+        self._snapshot = None
+        self._outside = None
+        # Separate from self._lock so building the outside tree never blocks edits.
+        self._outside_lock = threading.Lock()
+        self.rebuilds = 0
+        self.version = 0
+        if shelters:
+            self.upsert(shelters)
+
+    def __len__(self):
+        return len(self._records)
+
+    def get(self, shelter_id):
+        return self._records.get(shelter_id)
+
+    def upsert(self, shelters):
+        """
+        Adds shelters or replaces existing ones.
+        Args:
+            shelters (list): Dicts with id, latitude, longitude and optionally SHELTER_FIELDS.
+        Returns:
+            int: Number of shelters stored.
+        """
+        records = []
+        for shelter in shelters:
+            latitude, longitude = float(shelter["latitude"]), float(shelter["longitude"])
+            if not (-90.0 <= latitude <= 90.0 and -180.0 <= longitude <= 180.0):
+                raise ValueError(f"Invalid coordinates for shelter {shelter['id']}.")
+            record = {field: shelter[field] for field in SHELTER_FIELDS if field in shelter}
+            record.update({"id": str(shelter["id"]), "latitude": latitude, "longitude": longitude})
+            records.append(record)
+
+        with self._lock:
+            for record in records:
+                shelter_id = record["id"]
+                self._tombstone(shelter_id)
+                self._records[shelter_id] = record
+                self._delta[shelter_id] = (record["latitude"], record["longitude"])
+            self._changed()
+        return len(records)
+
+    def remove(self, shelter_id):
+        """
+        Args:
+            shelter_id (str): Shelter to remove.
+        Returns:
+            bool: False if the shelter was not registered.
+        """
+        with self._lock:
+            if self._records.pop(shelter_id, None) is None:
+                return False
+            self._tombstone(shelter_id)
+            self._delta.pop(shelter_id, None)
+            self._changed()
+            return True
+
+    def _tombstone(self, shelter_id):
+        slot = self._tree_slots.pop(shelter_id, None)
+        if slot is not None:
+            self._dead[slot] = True
+
+    def _changed(self):
+        if len(self._delta) + len(self._tree_ids) - len(self._tree_slots) > self.max_pending:
+            self._rebuild()
+        self._snapshot = None
+        self.version += 1
+
+    def _rebuild(self):
+        ids = list(self._records)
+        self._points = self._unit_vectors([self._records[i] for i in ids])
+        self._tree = KDTree(self._points) if ids else None
+        self._tree_ids = np.array(ids, dtype=object)
+        self._tree_slots = {shelter_id: slot for slot, shelter_id in enumerate(ids)}
+        self._dead = np.zeros(len(ids), dtype=bool)
+        self._delta = {}
+        self.rebuilds += 1
+
+    def rebuild(self):
+        """
+        Folds pending changes into a new tree.
+        Args: None
+        Returns: None
+        """
+        with self._lock:
+            self._rebuild()
+            self._snapshot = None
+
+    @staticmethod
+    def _unit_vectors(coordinates):
+        # coordinates: records or (latitude, longitude) pairs in degrees.
+        pairs = [(c["latitude"], c["longitude"]) if isinstance(c, dict) else c for c in coordinates]
+        radians = np.radians(np.array(pairs, dtype=np.float64).reshape(-1, 2))
+        return unit_vectors(radians[:, 0], radians[:, 1])
+
+    def _current(self):
+        # Published state for queries; rebuilt lazily after a change.
+        with self._lock:
+            if self._snapshot is None:
+                delta_ids = np.array(list(self._delta), dtype=object)
+                self._snapshot = _TreeSnapshot(
+                    self._tree, self._points, self._dead.copy(),
+                    self._unit_vectors(self._delta.values()),
+                    np.concatenate([self._tree_ids, delta_ids])
+                )
+            return self._snapshot
+
+    def _tree_outside(self, snapshot, exclude):
+        """
+        Tree restricted to the shelters outside an excluded disc, so a query
+        inside a zone full of shelters does not have to skip past all of them.
+        Cached until the tree or the disc changes; concurrent queries build it once.
+        Returns:
+            tuple: (tree or None, tree slot of each of its points)
+        """
+        with self._outside_lock:
+            cached = self._outside
+            if cached is not None and cached[0] is snapshot.tree and cached[1] == exclude:
+                return cached[2], cached[3]
+            center = self._unit_vectors([exclude[:2]])
+            outside = np.ones(len(snapshot.points), dtype=bool)
+            outside[snapshot.tree.query_radius(center, km_to_chord(exclude[2]))[0]] = False
+            slots = np.flatnonzero(outside)
+            tree = KDTree(snapshot.points[slots]) if len(slots) else None
+            self._outside = (snapshot.tree, exclude, tree, slots)
+            return tree, slots
+
+    def nearest_many(self, latitudes, longitudes, k=5, exclude=None):
+        """
+        k nearest shelters of many points at once.
+        Args:
+            latitudes, longitudes (array-like): Query points in degrees.
+            k (int): Shelters per point.
+            exclude (tuple): Optional (latitude, longitude, radius_km) disc whose shelters are skipped.
+        Returns:
+            tuple: (shelter ids, distances in km), both of shape (n, k); missing entries are None and inf.
+        """
+        lat_rad = np.radians(np.asarray(latitudes, dtype=np.float64))
+        points = unit_vectors(lat_rad, np.radians(np.asarray(longitudes, dtype=np.float64)))
+        snapshot = self._current()
+        n_tree = len(snapshot.points)
+
+        tree, slots = snapshot.tree, None
+        if tree is not None and exclude is not None:
+            tree, slots = self._tree_outside(snapshot, exclude)
+        dead = None
+        if tree is not None:
+            dead = snapshot.dead if slots is None else snapshot.dead[slots]
+        delta_excluded = None
+        if exclude is not None and len(snapshot.delta):
+            center = self._unit_vectors([exclude[:2]])
+            delta_excluded = np.linalg.norm(snapshot.delta - center, axis=1) <= km_to_chord(exclude[2])
+
+        best = np.full((len(points), k), -1, dtype=np.int64)
+        chord = np.full((len(points), k), np.inf)
+        for start in range(0, len(points), QUERY_CHUNK):
+            chunk = slice(start, start + QUERY_CHUNK)
+            candidates = []
+            distances = []
+            if tree is not None:
+                # Fetching k plus every tombstone guarantees k live shelters when there are that many.
+                fetch = min(len(dead), k + int(dead.sum()))
+                found, local = tree.query(points[chunk], k=fetch)
+                found[dead[local]] = np.inf
+                candidates.append(local if slots is None else slots[local])
+                distances.append(found)
+            if len(snapshot.delta):
+                found = np.linalg.norm(points[chunk, None, :] - snapshot.delta[None, :, :], axis=2)
+                if delta_excluded is not None:
+                    found[:, delta_excluded] = np.inf
+                candidates.append(np.broadcast_to(n_tree + np.arange(len(snapshot.delta)), found.shape))
+                distances.append(found)
+            if not candidates:
+                break
+
+            # Tree results are already sorted; merge only when tombstones or the delta are involved.
+            found = np.concatenate(distances, axis=1)
+            found_ids = np.concatenate(candidates, axis=1)
+            if len(candidates) > 1 or found.shape[1] > k:
+                order = np.argsort(found, axis=1, kind="stable")[:, :k]
+                found = np.take_along_axis(found, order, axis=1)
+                found_ids = np.take_along_axis(found_ids, order, axis=1)
+            width = found.shape[1]
+            chord[chunk, :width] = found
+            best[chunk, :width] = found_ids
+
+        missing = np.isinf(chord)
+        ids = snapshot.ids[np.where(missing, 0, best)] if len(snapshot.ids) else np.full(best.shape, None, dtype=object)
+        ids[missing] = None
+        # chord_to_km clamps inf to half the circumference; keep missing entries at inf.
+        return ids, np.where(missing, np.inf, chord_to_km(chord))
+
+    def nearest(self, latitude, longitude, k=5, exclude=None):
+        """
+        Args:
+            latitude, longitude (float): Query point in degrees.
+            k (int): Number of shelters.
+            exclude (tuple): Optional (latitude, longitude, radius_km) disc whose shelters are skipped.
+        Returns:
+            list: Up to k shelter records, nearest first, each with distance_km.
+        """
+        ids, km = self.nearest_many([latitude], [longitude], k, exclude)
+        return [
+            {**self._records[shelter_id], "distance_km": float(distance)}
+            for shelter_id, distance in zip(ids[0], km[0])
+            if shelter_id is not None and shelter_id in self._records
+        ]
+
+    def assign(self, latitudes, longitudes, k=5, exclude=None):
+        """
+        Assigns each point to the nearest of its k nearest shelters that still has
+        room. Points closest to their best shelter are served first. Shelters
+        without a capacity never fill up.
+        Args:
+            latitudes, longitudes (array-like): Query points in degrees.
+            k (int): Shelters considered per point.
+            exclude (tuple): Optional (latitude, longitude, radius_km) disc whose shelters are skipped.
+        Returns:
+            tuple: (shelter ids, distances in km) of shape (n, k), then per point the
+                   assigned shelter id (None if all k were full) and its distance.
+        """
+        ids, km = self.nearest_many(latitudes, longitudes, k, exclude)
+        room = {}
+        for shelter_id in set(ids[ids != None].tolist()):  # noqa: E711
+            record = self._records.get(shelter_id, {})
+            capacity = record.get("capacity")
+            room[shelter_id] = math.inf if capacity is None else capacity - record.get("currentOccupancy", 0)
+
+        assigned = np.full(len(ids), None, dtype=object)
+        assigned_km = np.full(len(ids), np.inf)
+        for point in np.argsort(km[:, 0], kind="stable").tolist():
+            for rank, shelter_id in enumerate(ids[point]):
+                if shelter_id is None:
+                    break
+                if room[shelter_id] > 0:
+                    room[shelter_id] -= 1
+                    assigned[point] = shelter_id
+                    assigned_km[point] = km[point, rank]
+                    break
+        return ids, km, assigned, assigned_km
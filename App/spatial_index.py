@@ -0,0 +1,148 @@
+import math
+import numpy as np
+
+KM_PER_DEGREE_LAT = 111.195
+
+
+class GeoGridIndex:
+    """
+    Buckets integer item ids (the slots of ProximityEngine) into a regular
+    latitude/longitude grid. A radius query only visits the cells overlapping the
+    query's bounding box, so its cost depends on local density rather than on the
+    total number of items.
+    """
+    def __init__(self, cell_deg=0.5, initial_capacity=1024):
+        """
+        Args:
+            cell_deg (float): Cell edge length in degrees.
+            initial_capacity (int): Initial size of the item -> cell table.
+        """
+        self.cell_deg = cell_deg
+        self.n_rows = int(math.ceil(180.0 / cell_deg))
+        self.n_cols = int(math.ceil(360.0 / cell_deg))
+        self._cells = {}
+        self._key_of = np.full(initial_capacity, -1, dtype=np.int64)
+
+    def _cell_keys(self, latitudes, longitudes):
+        rows = np.floor((np.asarray(latitudes, dtype=np.float64) + 90.0) / self.cell_deg).astype(np.int64)
+        cols = np.floor((np.asarray(longitudes, dtype=np.float64) + 180.0) / self.cell_deg).astype(np.int64)
+        np.clip(rows, 0, self.n_rows - 1, out=rows)
+        cols %= self.n_cols
+        return rows * self.n_cols + cols
+
+    def _grow(self, needed):
+        capacity = len(self._key_of)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        key_of = np.full(capacity, -1, dtype=np.int64)
+        key_of[:len(self._key_of)] = self._key_of
+        self._key_of = key_of
+
+    def update_many(self, items, latitudes, longitudes):
+        """
+        Inserts new items and moves existing ones to their new cells.
+        Args:
+            items (np.ndarray): Integer item ids.
+            latitudes, longitudes (array-like): Coordinates in degrees.
+        Returns: None
+        """
+        items = np.asarray(items, dtype=np.int64)
+        if items.size == 0:
+            return
+        new_keys = self._cell_keys(latitudes, longitudes)
+        # When an item appears more than once, its last position wins.
+        _, last = np.unique(items[::-1], return_index=True)
+        if len(last) != len(items):
+            keep = len(items) - 1 - last
+            items, new_keys = items[keep], new_keys[keep]
+
+        self._grow(int(items.max()) + 1)
+        old_keys = self._key_of[items]
+        changed = old_keys != new_keys
+        if not changed.any():
+            return
+
+        cells = self._cells
+        leaving = changed & (old_keys >= 0)
+        for item, key in zip(items[leaving].tolist(), old_keys[leaving].tolist()):
+            bucket = cells[key]
+            bucket.discard(item)
+            if not bucket:
+                del cells[key]
+
+        moved_items = items[changed]
+        moved_keys = new_keys[changed]
+        self._key_of[moved_items] = moved_keys
+        order = np.argsort(moved_keys, kind="stable")
+        unique_keys, starts = np.unique(moved_keys[order], return_index=True)
+        bounds = np.append(starts, len(order))
+        for i, key in enumerate(unique_keys.tolist()):
+            cells.setdefault(key, set()).update(moved_items[order[bounds[i]:bounds[i + 1]]].tolist())
+
+    def insert(self, item, latitude, longitude):
+        """
+        Inserts or moves a single item.
+        Args:
+            item (int): Item id.
+            latitude, longitude (float): Coordinates in degrees.
+        Returns: None
+        """
+        self.update_many([item], [latitude], [longitude])
+
+    def remove(self, item):
+        """
+        Args:
+            item (int): Item id.
+        Returns:
+            bool: True if the item was indexed.
+        """
+        if item >= len(self._key_of) or self._key_of[item] < 0:
+            return False
+        key = int(self._key_of[item])
+        bucket = self._cells[key]
+        bucket.discard(item)
+        if not bucket:
+            del self._cells[key]
+        self._key_of[item] = -1
+        return True
+
+    def candidates(self, latitude, longitude, radius_km):
+        """
+        Items in every cell overlapping the bounding box of a circle.
+        Args:
+            latitude, longitude (float): Circle centre in degrees.
+            radius_km (float): Circle radius in km.
+        Returns:
+            np.ndarray: Candidate item ids; a superset of the items inside the circle.
+        """
+        dlat = radius_km / KM_PER_DEGREE_LAT
+        lat_min = max(latitude - dlat, -90.0)
+        lat_max = min(latitude + dlat, 90.0)
+        row_min = max(int((lat_min + 90.0) // self.cell_deg), 0)
+        row_max = min(int((lat_max + 90.0) // self.cell_deg), self.n_rows - 1)
+
+        # Longitude half-width of a spherical cap; it covers every longitude
+        # once the cap reaches a pole.
+        sin_ratio = math.sin(math.radians(dlat)) / max(math.cos(math.radians(latitude)), 1e-12)
+        if lat_min <= -90.0 or lat_max >= 90.0 or sin_ratio >= 1.0:
+            col_start = 0
+            col_offsets = range(self.n_cols)
+        else:
+            dlon = math.degrees(math.asin(sin_ratio))
+            col_start = int((longitude - dlon + 180.0) // self.cell_deg)
+            col_end = int((longitude + dlon + 180.0) // self.cell_deg)
+            col_offsets = range(min(col_end - col_start, self.n_cols - 1) + 1)
+
+        cells = self._cells
+        buckets = []
+        for row in range(row_min, row_max + 1):
+            base = row * self.n_cols
+            for offset in col_offsets:
+                bucket = cells.get(base + (col_start + offset) % self.n_cols)
+                if bucket:
+                    buckets.append(bucket)
+        if not buckets:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.fromiter(bucket, dtype=np.int64, count=len(bucket)) for bucket in buckets])
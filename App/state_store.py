@@ -0,0 +1,148 @@
+import asyncio
+import threading
+from collections.abc import Mapping
+from datetime import datetime
+
+
+class WeatherSnapshot(Mapping):
+    """
+    Immutable view of the weather state at one version. Snapshots are never
+    modified after publication, so readers can use them without locking.
+    """
+    __slots__ = ("version", "timestamp", "_data")
+
+    def __init__(self, version, timestamp, data):
+        """
+        Args:
+            version (int): Monotonically increasing state version.
+            timestamp (datetime): When this version was published.
+            data (dict): Weather fields; owned by the snapshot from now on.
+        """
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "timestamp", timestamp)
+        object.__setattr__(self, "_data", data)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("WeatherSnapshot is immutable.")
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def as_dict(self):
+        """
+        Args: None
+        Returns:
+            dict: Mutable copy of the weather fields.
+        """
+        return dict(self._data)
+
+    def __repr__(self):
+        return f"WeatherSnapshot(version={self.version}, timestamp={self.timestamp!r}, data={self._data!r})"
+
+
+class StateStore:
+    """
+    Copy-on-write holder of the current WeatherSnapshot. Writers serialise on a
+    lock, build a new snapshot from a copy of the current fields and publish it
+    with a single reference assignment; readers just take the reference.
+    """
+    def __init__(self, initial):
+        """
+        Args:
+            initial (dict): Initial weather fields.
+        """
+        self._changed = threading.Condition()
+        # Futures of wait_async callers, each with the event loop it belongs to.
+        self._async_waiters = set()
+        self._snapshot = WeatherSnapshot(0, datetime.now(), dict(initial))
+
+    @property
+    def snapshot(self):
+        """
+        Current snapshot; safe to read from any thread without locking.
+        """
+        return self._snapshot
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    def modify(self, mutate):
+        """
+        Applies a function to a private copy of the fields and publishes the result.
+        Args:
+            mutate (callable): Receives the copied dict and changes it in place.
+        Returns:
+            WeatherSnapshot: Newly published snapshot.
+        """
+        with self._changed:
+            data = self._snapshot.as_dict()
+            mutate(data)
+            self._snapshot = WeatherSnapshot(self._snapshot.version + 1, datetime.now(), data)
+            self._changed.notify_all()
+            for loop, future in self._async_waiters:
+                loop.call_soon_threadsafe(_wake, future)
+            self._async_waiters.clear()
+            return self._snapshot
+
+    def update(self, changes):
+        """
+        Publishes a snapshot with some fields replaced.
+        Args:
+            changes (dict): Fields to set.
+        Returns:
+            WeatherSnapshot: Newly published snapshot.
+        """
+        return self.modify(lambda data: data.update(changes))
+
+    def wait(self, since, timeout=None):
+        """
+        Blocks until a snapshot newer than a version is published, or the timeout expires.
+        Args:
+            since (int): Last version seen by the caller; None returns at once.
+            timeout (float): Maximum seconds to wait.
+        Returns:
+            WeatherSnapshot: Current snapshot.
+        """
+        if since is not None and self._snapshot.version == since:
+            with self._changed:
+                self._changed.wait_for(lambda: self._snapshot.version != since, timeout)
+        return self._snapshot
+
+    async def wait_async(self, since, timeout=None):
+        """
+        Like wait, but suspends the calling coroutine instead of blocking a thread,
+        so any number of long-polling requests can wait at once.
+        Args:
+            since (int): Last version seen by the caller; None returns at once.
+            timeout (float): Maximum seconds to wait.
+        Returns:
+            WeatherSnapshot: Current snapshot.
+        """
+        if since is None or self._snapshot.version != since:
+            return self._snapshot
+        loop = asyncio.get_running_loop()
+        waiter = (loop, loop.create_future())
+        with self._changed:
+            if self._snapshot.version != since:
+                return self._snapshot
+            self._async_waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1], timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._changed:
+                self._async_waiters.discard(waiter)
+        return self._snapshot
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
@@ -0,0 +1,144 @@
+import threading
+import numpy as np
+
+# Columns of the storm table; names match the keys of the single-storm STATE.
+WIND_FIELDS = tuple(
+    f"{band} Wind {quadrant}"
+    for band in ("Low", "Moderate", "High")
+    for quadrant in ("NE", "SE", "NW", "SW")
+)
+STORM_DTYPE = np.dtype(
+    [("Latitude", "f8"), ("Longitude", "f8"), ("Maximum Wind", "f8"), ("Minimum Pressure", "f8")]
+    + [(name, "f8") for name in WIND_FIELDS]
+    + [("Cyclonic", "?"), ("Cyclonic Severity", "f8")]
+)
+# Every wind column scales with pressure, as in step_trends.
+SCALED_WIND_FIELDS = ("Maximum Wind",) + WIND_FIELDS
+
+
+class StormSimulator:
+    """
+    Simulates many synthetic storms at once. Every storm parameter is a column
+    of a NumPy structured array, and one step advances all storms with the same
+    rules step_trends applies to the single STATE. Steps build a new table and
+    publish it by reference swap, so readers always see a whole tick.
+    """
+    def __init__(self, ranges, seed=None):
+        """
+        Args:
+            ranges (dict): Parameter ranges, as RANGES in weather_api.
+            seed (int): Seed of the numpy.random.Generator; None draws fresh entropy.
+        """
+        self.ranges = ranges
+        self.rng = np.random.default_rng(seed)
+        self.storms = np.empty(0, dtype=STORM_DTYPE)
+        self.version = 0
+        self.steps = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.storms)
+
+    def spawn(self, count):
+        """
+        Adds storms with random parameters inside the configured ranges.
+        Args:
+            count (int): Number of storms to add.
+        Returns:
+            range: Ids of the new storms.
+        """
+        rng = self.rng
+        ranges = self.ranges
+        new = np.empty(count, dtype=STORM_DTYPE)
+        with self._lock:
+            for name in ("Latitude", "Longitude", "Maximum Wind", "Minimum Pressure"):
+                new[name] = rng.uniform(*ranges[name], count)
+            for name in WIND_FIELDS:
+                new[name] = rng.uniform(*ranges[name.rsplit(" ", 1)[0]], count)
+            new["Cyclonic"] = new["Minimum Pressure"] < 980.0
+            new["Cyclonic Severity"] = np.where(new["Cyclonic"], rng.uniform(0, 10, count), 0.0)
+            first = len(self.storms)
+            self.storms = np.concatenate([self.storms, new])
+            self.version += 1
+        return range(first, first + count)
+
+    def clear(self):
+        """
+        Removes every storm.
+        Args: None
+        Returns: None
+        """
+        with self._lock:
+            self.storms = np.empty(0, dtype=STORM_DTYPE)
+            self.version += 1
+
+    def step(self, trend_factor=0.1):
+        """
+        Advances every storm by one tick in a single vectorized pass.
+        Args:
+            trend_factor (float): Scale of the random wind fluctuation.
+        Returns: None
+        """
+        rng = self.rng
+        low_pressure, high_pressure = self.ranges["Minimum Pressure"]
+        with self._lock:
+            storms = self.storms.copy()
+            n = len(storms)
+            cyclonic = storms["Cyclonic"]
+            pressure = storms["Minimum Pressure"]
+            severity = storms["Cyclonic Severity"]
+
+            pressure_delta = np.where(cyclonic, -rng.uniform(0.5, 1.0, n), rng.uniform(-0.2, 0.5, n))
+            pressure += pressure_delta
+            np.clip(pressure, low_pressure, high_pressure, out=pressure)
+            severity[cyclonic] = np.minimum(severity[cyclonic] + 0.1, 10.0)
+
+            wind_multiplier = 1 + (1013 - pressure) / 1000
+            fluctuation = rng.uniform(-1, 1, (len(SCALED_WIND_FIELDS), n)) * trend_factor
+            for i, name in enumerate(SCALED_WIND_FIELDS):
+                wind = storms[name]
+                wind *= wind_multiplier
+                wind += fluctuation[i]
+                np.maximum(wind, 0, out=wind)
+
+            forming = pressure < 980.0
+            dissipating = pressure > 995.0
+            cyclonic[forming] = True
+            cyclonic[dissipating] = False
+            severity[dissipating] = np.maximum(severity[dissipating] - 0.1, 0)
+
+            self.storms = storms
+            self.version += 1
+            self.steps += 1
+
+    def get(self, storm_id):
+        """
+        Args:
+            storm_id (int): Storm id.
+        Returns:
+            dict: Parameters of one storm, keyed like STATE.
+        """
+        storms = self.storms
+        if not 0 <= storm_id < len(storms):
+            raise IndexError(f"Unknown storm id: {storm_id}")
+        row = storms[storm_id]
+        return {name: row[name].item() for name in STORM_DTYPE.names}
+
+    def columns(self, offset=0, limit=None, fields=None):
+        """
+        Returns a slice of the storm table as plain lists, one per column.
+        Args:
+            offset (int): First storm id.
+            limit (int): Maximum number of storms; None returns all.
+            fields (list): Columns to include; None returns all.
+        Returns:
+            dict: Column name -> list of values.
+        """
+        storms = self.storms
+        end = len(storms) if limit is None else min(offset + limit, len(storms))
+        block = storms[offset:end]
+        names = fields or STORM_DTYPE.names
+        unknown = set(names) - set(STORM_DTYPE.names)
+        if unknown:
+            raise KeyError(f"Unknown fields: {unknown}")
+        return {name: block[name].tolist() for name in names}
@@ -1,13 +1,25 @@
-from fastapi import FastAPI, HTTPException
-from datetime import datetime, timedelta
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from typing import Optional
 import random
 import math
 import threading
 import time
+from datetime import datetime
+from state_store import StateStore
+from storm_simulator import StormSimulator
+from forecast import ForecastCache, MAX_MEMBERS, MAX_HOURS
+from metrics import REGISTRY as metrics, MetricsMiddleware, CONTENT_TYPE as METRICS_CONTENT_TYPE
 
 app = FastAPI()
 
-STATE = {
+# Request and stage timings served on /metrics; see App/app.py.
+METRICS_ENABLED = True
+metrics.enabled = METRICS_ENABLED
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, registry=metrics)
+
+STATE = StateStore({
     "Latitude": 20.0,
     "Longitude": 80.0,
     "Maximum Wind": 100.0,  # Wind speed in km/h
@@ -26,7 +38,10 @@ STATE = {
     "High Wind SW": 70.0,
     "Cyclonic": False,
     "Cyclonic Severity": 0.0  # Severity scale: 0 to 10
-}
+})
+
+# Upper bound for ?wait= on /current.
+MAX_LONG_POLL = 30.0
 
 # Define realistic ranges for each parameter
 RANGES = {
@@ -39,40 +54,61 @@ RANGES = {
     "High Wind": (40, 120)
 }
 
-def apply_trends():
+# Forecast trajectories for recent state versions; unused entries expire after FORECAST_CACHE_TTL seconds.
+FORECAST_CACHE_SIZE = 32
+FORECAST_CACHE_TTL = 600.0
+forecast_cache = ForecastCache(
+    RANGES["Minimum Pressure"], max_entries=FORECAST_CACHE_SIZE, ttl=FORECAST_CACHE_TTL
+)
+
+def step_trends(state):
     """
-    Updates the global STATE with new weather trends.
-    Args: None
+    Advances a weather state dict by one step of the weather trends.
+    Args:
+        state (dict): Weather fields, modified in place.
     Returns: None
     """
-    global STATE
     trend_factor = 0.1  # Base fluctuation factor
 
     # Adjust pressure based on cyclonic conditions
-    if STATE["Cyclonic"]:
-        STATE["Minimum Pressure"] -= random.uniform(0.5, 1.0)
-        STATE["Minimum Pressure"] = max(STATE["Minimum Pressure"], RANGES["Minimum Pressure"][0])
-        STATE["Cyclonic Severity"] = min(STATE["Cyclonic Severity"] + 0.1, 10.0)
+    if state["Cyclonic"]:
+        state["Minimum Pressure"] -= random.uniform(0.5, 1.0)
+        state["Minimum Pressure"] = max(state["Minimum Pressure"], RANGES["Minimum Pressure"][0])
+        state["Cyclonic Severity"] = min(state["Cyclonic Severity"] + 0.1, 10.0)
     else:
-        STATE["Minimum Pressure"] += random.uniform(-0.2, 0.5)
-        STATE["Minimum Pressure"] = min(STATE["Minimum Pressure"], RANGES["Minimum Pressure"][1])
+        state["Minimum Pressure"] += random.uniform(-0.2, 0.5)
+        state["Minimum Pressure"] = min(state["Minimum Pressure"], RANGES["Minimum Pressure"][1])
 
     # Adjust wind speeds based on pressure
-    pressure_diff = 1013 - STATE["Minimum Pressure"]
+    pressure_diff = 1013 - state["Minimum Pressure"]
     wind_multiplier = 1 + (pressure_diff / 1000)
 
-    for key in STATE:
+    for key in state:
         if "Wind" in key:
-            base_wind = STATE[key]
+            base_wind = state[key]
             fluctuation = random.uniform(-1, 1) * trend_factor
-            STATE[key] = max(base_wind * wind_multiplier + fluctuation, 0)
+            state[key] = max(base_wind * wind_multiplier + fluctuation, 0)
 
     # Update cyclonic state based on pressure
-    if STATE["Minimum Pressure"] < 980.0:
-        STATE["Cyclonic"] = True
-    elif STATE["Minimum Pressure"] > 995.0:
-        STATE["Cyclonic"] = False
-        STATE["Cyclonic Severity"] = max(STATE["Cyclonic Severity"] - 0.1, 0)
+    if state["Minimum Pressure"] < 980.0:
+        state["Cyclonic"] = True
+    elif state["Minimum Pressure"] > 995.0:
+        state["Cyclonic"] = False
+        state["Cyclonic Severity"] = max(state["Cyclonic Severity"] - 0.1, 0)
+
+@metrics.timed("apply_trends")
+def apply_trends():
+    """
+    Publishes a new STATE snapshot with updated weather trends.
+    Args: None
+    Returns: None
+    """
+    STATE.modify(step_trends)
+
+# Synthetic storms for load and drill testing, advanced alongside STATE.
+STORM_SIMULATOR_SEED = 42
+MAX_STORMS = 1_000_000
+storm_simulator = StormSimulator(RANGES, seed=STORM_SIMULATOR_SEED)
 
 # Background thread to update weather state
 def background_updater():
@@ -83,6 +119,9 @@ def background_updater():
     """
     while True:
         apply_trends()
+        if len(storm_simulator):
+            with metrics.timer("storm_step"):
+                storm_simulator.step()
         time.sleep(60)  # Update every minute
 
 # Start the background thread
@@ -90,15 +129,28 @@ thread = threading.Thread(target=background_updater, daemon=True)
 thread.start()
 
 @app.get("/current")
-def get_current_weather():
+async def get_current_weather(request: Request, response: Response, since: Optional[int] = None, wait: float = 0):
     """
-    Returns the current weather data.
-    Args: None
+    Returns the current weather data. Long-polls wait on the event loop, so
+    they do not tie up threadpool workers.
+    Args:
+        since (int): Version the caller already has; with wait, the request is held until it changes.
+        wait (float): Seconds to hold the request open waiting for a newer version.
     Returns: dict
     """
+    if since is not None and wait > 0:
+        snapshot = await STATE.wait_async(since, min(wait, MAX_LONG_POLL))
+    else:
+        snapshot = STATE.snapshot
+
+    etag = f'"{snapshot.version}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return {
-        "timestamp": datetime.now(),
-        "weather_data": STATE
+        "timestamp": snapshot.timestamp,
+        "version": snapshot.version,
+        "weather_data": snapshot.as_dict()
     }
 
 @app.post("/simulate_cyclone")
@@ -108,12 +160,14 @@ def simulate_cyclonic_condition():
     Args: None
     Returns: dict
     """
-    global STATE
-    STATE["Cyclonic"] = True
-    STATE["Minimum Pressure"] = min(STATE["Minimum Pressure"], 970.0)
+    def force_cyclone(state):
+        state["Cyclonic"] = True
+        state["Minimum Pressure"] = min(state["Minimum Pressure"], 970.0)
+
+    snapshot = STATE.modify(force_cyclone)
     return {
         "message": "Cyclonic condition simulated.",
-        "weather_data": STATE
+        "weather_data": snapshot.as_dict()
     }
 
 @app.post("/reset")
@@ -123,7 +177,6 @@ def reset_weather():
     Args: None
     Returns: dict
     """
-    global STATE
     STATE.update({
         "Latitude": random.uniform(*RANGES["Latitude"]),
         "Longitude": random.uniform(*RANGES["Longitude"]),
@@ -147,37 +200,136 @@ def reset_weather():
     return {"message": "Weather state reset to baseline."}
 
 @app.get("/forecast")
-def get_weather_forecast(hours: int = 6):
+def get_weather_forecast(hours: int = 6, mode: str = "single", members: int = 1000, seed: Optional[int] = None):
     """
+    Forecasts are cached per state version, so repeated requests between
+    weather updates are served without re-simulating.
     Args:
         hours (int): Number of hours to forecast (default 6).
+        mode (str): "single" for one random path, "ensemble" for percentile bands over many paths.
+        members (int): Ensemble size when mode is "ensemble".
+        seed (int): Random seed; defaults to the state version, so the forecast is stable until the state changes.
     Returns:
         dict: Forecast data for the specified hours.
     """
-    if hours < 1 or hours > 48:
-        raise HTTPException(status_code=400, detail="Forecast range must be between 1 and 48 hours.")
+    if hours < 1 or hours > MAX_HOURS:
+        raise HTTPException(status_code=400, detail=f"Forecast range must be between 1 and {MAX_HOURS} hours.")
+    snapshot = STATE.snapshot
+    if seed is None:
+        seed = snapshot.version
+    if mode == "ensemble":
+        if members < 1 or members > MAX_MEMBERS:
+            raise HTTPException(status_code=400, detail=f"Ensemble size must be between 1 and {MAX_MEMBERS}.")
+        forecast = forecast_cache.ensemble(snapshot, hours, members, seed)
+        return JSONResponse({
+            "mode": "ensemble", "version": snapshot.version, "members": members, "seed": seed, "forecast": forecast
+        })
+    if mode != "single":
+        raise HTTPException(status_code=400, detail="Forecast mode must be 'single' or 'ensemble'.")
+
+    forecast = forecast_cache.single(snapshot, hours, seed)
+    return JSONResponse({"version": snapshot.version, "seed": seed, "forecast": forecast})
+
+@app.get("/forecast/stats")
+def get_forecast_stats():
+    """
+    Returns forecast cache hit rate and size.
+    Args: None
+    Returns: dict
+    """
+    return forecast_cache.stats()
 
-    forecast = []
-    simulated_state = STATE.copy()
+#############################################
+# Multi-Storm Simulation Endpoints
+#############################################
+@app.post("/storms")
+def spawn_storms(count: int = 1):
+    """
+    Args:
+        count (int): Number of synthetic storms to add.
+    Returns:
+        dict: Ids of the new storms and the total count.
+    """
+    if count < 1 or len(storm_simulator) + count > MAX_STORMS:
+        raise HTTPException(status_code=400, detail=f"Storm count must stay between 1 and {MAX_STORMS}.")
+    ids = storm_simulator.spawn(count)
+    return {"first_id": ids.start, "count": count, "total": len(storm_simulator)}
 
-    for hour in range(1, hours + 1):
-        # Simulate future trends
-        simulated_state["Minimum Pressure"] += random.uniform(-0.3, 0.3)
-        simulated_state["Minimum Pressure"] = max(min(simulated_state["Minimum Pressure"], RANGES["Minimum Pressure"][1]), RANGES["Minimum Pressure"][0])
+@app.delete("/storms")
+def clear_storms():
+    """
+    Removes every synthetic storm.
+    Args: None
+    Returns: dict
+    """
+    storm_simulator.clear()
+    return {"message": "All synthetic storms removed."}
+
+@app.post("/storms/step")
+def step_storms(steps: int = 1):
+    """
+    Args:
+        steps (int): Number of ticks to advance every storm.
+    Returns:
+        dict: Step count and version of the storm table.
+    """
+    if steps < 1 or steps > 1000:
+        raise HTTPException(status_code=400, detail="Steps must be between 1 and 1000.")
+    for _ in range(steps):
+        storm_simulator.step()
+    return {"steps": storm_simulator.steps, "version": storm_simulator.version}
 
-        pressure_diff = 1013 - simulated_state["Minimum Pressure"]
-        wind_multiplier = 1 + (pressure_diff / 1000)
+@app.get("/storms")
+def list_storms(offset: int = 0, limit: int = 1000, fields: Optional[str] = None):
+    """
+    Args:
+        offset (int): First storm id.
+        limit (int): Maximum number of storms returned.
+        fields (str): Comma-separated columns to include (default: all).
+    Returns:
+        dict: Columnar storm parameters.
+    """
+    if offset < 0 or limit < 1:
+        raise HTTPException(status_code=400, detail="offset must be >= 0 and limit >= 1.")
+    names = [name.strip() for name in fields.split(",") if name.strip()] if fields else None
+    try:
+        columns = storm_simulator.columns(offset, limit, names)
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse({
+        "version": storm_simulator.version,
+        "total": len(storm_simulator),
+        "offset": offset,
+        "storms": columns
+    })
 
-        for key in simulated_state:
-            if "Wind" in key:
-                fluctuation = random.uniform(-0.5, 0.5)
-                simulated_state[key] = max(simulated_state[key] * wind_multiplier + fluctuation, 0)
+@app.get("/storms/{storm_id}")
+def get_storm(storm_id: int):
+    """
+    Args:
+        storm_id (int): Storm id.
+    Returns:
+        dict: Parameters of the storm.
+    """
+    try:
+        return {"storm_id": storm_id, "weather_data": storm_simulator.get(storm_id)}
+    except IndexError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
-        # Append forecasted state
-        forecast.append({
-            "hour": hour,
-            "timestamp": (datetime.now() + timedelta(hours=hour)).isoformat(),
-            "weather_data": simulated_state.copy()
-        })
+metrics.gauge("state_version", "Version of the published weather state.", function=lambda: STATE.version)
+metrics.gauge(
+    "state_age_seconds", "Seconds since the weather state was last published.",
+    function=lambda: (datetime.now() - STATE.snapshot.timestamp).total_seconds()
+)
+metrics.gauge("simulated_storms", "Storms in the simulator.", function=lambda: len(storm_simulator))
 
-    return {"forecast": forecast}
+@app.get("/metrics")
+def get_metrics():
+    """
+    Returns request, stage and gauge metrics in the Prometheus text format.
+    Args: None
+    Returns: Response
+    """
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled.")
+    return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
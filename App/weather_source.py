@@ -0,0 +1,130 @@
+import random
+from abc import ABC, abstractmethod
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from metrics import REGISTRY as metrics
+
+
+class WeatherSource(ABC):
+    """
+    Interface of the feeds that fetch_weather_data reads from.
+    """
+    @abstractmethod
+    def next_update(self, since, timeout):
+        """
+        Waits for weather data newer than a version.
+        Args:
+            since (int): Last version seen; None asks for the current data.
+            timeout (float): Maximum seconds to wait.
+        Returns:
+            tuple: (version, weather_data), or None if nothing changed in time.
+        """
+
+    def close(self):
+        """
+        Releases any resources held by the source.
+        Args: None
+        Returns: None
+        """
+
+
+class InProcessWeatherSource(WeatherSource):
+    """
+    Reads the simulator state of this process directly, waking up as soon as
+    a new snapshot is published.
+    """
+    def __init__(self, store):
+        """
+        Args:
+            store (StateStore): Simulator state of this process.
+        """
+        self.store = store
+
+    def next_update(self, since, timeout):
+        snapshot = self.store.wait(since, timeout)
+        if snapshot.version == since:
+            return None
+        return snapshot.version, snapshot.as_dict()
+
+
+class HttpWeatherSource(WeatherSource):
+    """
+    Long-polls a weather service's /current endpoint over a pooled session.
+    The service holds the request until its state version moves past ?since=
+    and answers 304 when the ETag the client already holds is still current.
+    Failures are retried with jittered exponential backoff.
+    """
+    def __init__(self, url, connect_timeout=3.0, read_timeout=10.0, long_poll=25.0,
+                 min_backoff=0.5, max_backoff=30.0, pool_size=4, fallback_interval=10.0):
+        """
+        Args:
+            url (str): URL of the /current endpoint.
+            connect_timeout (float): Seconds to establish a connection.
+            read_timeout (float): Seconds to wait for a response beyond the long-poll window.
+            long_poll (float): Seconds the server may hold a request open.
+            min_backoff, max_backoff (float): Retry delay bounds in seconds.
+            pool_size (int): Connections kept alive in the pool.
+            fallback_interval (float): Polling interval for services that report no version.
+        """
+        self.url = url
+        self.fallback_interval = fallback_interval
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.long_poll = long_poll
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.etag = None
+        self._failures = 0
+        self._unversioned = False
+
+    def _backoff(self):
+        delay = min(self.max_backoff, self.min_backoff * 2 ** self._failures)
+        self._failures += 1
+        # Full jitter keeps restarted clients from retrying in lockstep.
+        time.sleep(random.uniform(0, delay))
+
+    def next_update(self, since, timeout):
+        if self._unversioned:
+            # The service cannot long-poll: fall back to fixed-interval sampling.
+            time.sleep(self.fallback_interval)
+        wait = min(self.long_poll, timeout) if since is not None else 0
+        params = {"wait": wait}
+        if since is not None:
+            params["since"] = since
+        headers = {"If-None-Match": self.etag} if self.etag and since is not None else {}
+        try:
+            # Includes the time the service holds a long-poll open.
+            with metrics.timer("weather_http_request"):
+                response = self.session.get(
+                    self.url, params=params, headers=headers,
+                    timeout=(self.connect_timeout, wait + self.read_timeout)
+                )
+        except requests.RequestException as e:
+            print(f"Error fetching weather data: {e}")
+            self._backoff()
+            return None
+
+        if response.status_code == 304:
+            self._failures = 0
+            return None
+        if response.status_code != 200:
+            print(f"Weather API error: {response.status_code} - {response.text}")
+            self._backoff()
+            return None
+
+        self._failures = 0
+        self.etag = response.headers.get("ETag")
+        body = response.json()
+        version = body.get("version")
+        self._unversioned = version is None
+        if version is not None and version == since:
+            return None
+        return version, body.get("weather_data", {})
+
+    def close(self):
+        self.session.close()
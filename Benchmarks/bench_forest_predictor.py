@@ -0,0 +1,121 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "Src"))
+sys.path.insert(0, os.path.join(ROOT, "App"))
+
+from model import export_forest  # noqa: E402
+from forest_predictor import CompiledForest  # noqa: E402
+
+# The server also predicts from plain arrays on a model fitted with feature names.
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+FEATURES = [
+    "Latitude", "Longitude", "Maximum Wind", "Minimum Pressure",
+    *(f"{band} Wind {quadrant}" for band in ("Low", "Moderate", "High") for quadrant in ("NE", "SE", "SW", "NW")),
+]
+
+
+def latency_ms(fn, X, repeat):
+    """
+    Args:
+        fn (callable): Prediction function.
+        X (np.ndarray): Input passed on every call.
+        repeat (int): Number of calls.
+    Returns:
+        tuple: (p50, p99) latency in milliseconds.
+    """
+    fn(X)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(X)
+        samples.append((time.perf_counter() - start) * 1000)
+    return np.percentile(samples, 50), np.percentile(samples, 99)
+
+
+def directory_mb(directory):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)) / 2**20
+
+
+def run(model_path=None, n_trees=300, rows=50_000, repeat=200, seed=42):
+    """
+    Compares a pickled sklearn forest with its exported node arrays.
+    Args:
+        model_path (str): Pickled model to export; None trains one on synthetic data.
+        n_trees (int): Trees of the synthetic model.
+        rows (int): Rows of the synthetic training data.
+        repeat (int): Calls per latency measurement.
+        seed (int): Random seed.
+    Returns:
+        dict: Sizes, load times, parity and latencies.
+    """
+    X, y = make_classification(rows + 10_000, len(FEATURES), n_informative=10, n_classes=9,
+                               n_clusters_per_class=2, random_state=seed)
+    X = X.astype(np.float32)
+    x_train, y_train = pd.DataFrame(X[:rows], columns=FEATURES), y[:rows]
+    x_test = X[rows:]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if model_path is None:
+            model = RandomForestClassifier(n_trees, n_jobs=-1, random_state=seed).fit(x_train, y_train)
+            model_path = os.path.join(tmp, "cyclone_model.pkl")
+            joblib.dump(model, model_path)
+        start = time.perf_counter()
+        model = joblib.load(model_path)
+        pickle_load_s = time.perf_counter() - start
+        x_test = x_test[:, :model.n_features_in_]
+
+        forest_dir = os.path.join(tmp, "cyclone_forest")
+        export_forest(model, forest_dir)
+        start = time.perf_counter()
+        forest = CompiledForest(forest_dir)
+        mmap_load_s = time.perf_counter() - start
+
+        expected = model.predict_proba(x_test)
+        got = forest.predict_proba(x_test)
+        single = x_test[:1]
+        batch = x_test[:1000]
+        result = {
+            "trees": len(model.estimators_),
+            "nodes": forest.meta["n_nodes"],
+            "pickle_mb": os.path.getsize(model_path) / 2**20,
+            "arrays_mb": directory_mb(forest_dir),
+            "pickle_load_ms": pickle_load_s * 1000,
+            "mmap_load_ms": mmap_load_s * 1000,
+            "class_agreement": float((expected.argmax(axis=1) == got.argmax(axis=1)).mean()),
+            "max_proba_diff": float(np.abs(expected - got).max()),
+            "sklearn_single_ms": latency_ms(model.predict_proba, single, repeat),
+            "compiled_single_ms": latency_ms(forest.predict_proba, single, repeat),
+            "sklearn_batch_ms": latency_ms(model.predict_proba, batch, max(5, repeat // 20)),
+            "compiled_batch_ms": latency_ms(forest.predict_proba, batch, max(5, repeat // 20)),
+        }
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the exported forest against sklearn.")
+    parser.add_argument("--model", help="Pickled model to export (default: train a synthetic one).")
+    parser.add_argument("--trees", type=int, default=300)
+    parser.add_argument("--rows", type=int, default=50_000)
+    args = parser.parse_args()
+
+    r = run(args.model, args.trees, args.rows)
+    print(f"trees {r['trees']}, nodes {r['nodes']}")
+    print(f"size: pickle {r['pickle_mb']:.1f} MB, arrays {r['arrays_mb']:.1f} MB")
+    print(f"load: joblib {r['pickle_load_ms']:.1f} ms, mmap {r['mmap_load_ms']:.2f} ms")
+    print(f"parity: class agreement {r['class_agreement']:.6f}, max |proba diff| {r['max_proba_diff']:.2e}")
+    for name in ("single", "batch"):
+        sk, cf = r[f"sklearn_{name}_ms"], r[f"compiled_{name}_ms"]
+        print(f"{name:>6}: sklearn p50 {sk[0]:.2f} ms p99 {sk[1]:.2f} ms | "
+              f"compiled p50 {cf[0]:.2f} ms p99 {cf[1]:.2f} ms")
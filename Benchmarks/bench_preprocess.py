@@ -0,0 +1,143 @@
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Src"))
+
+from preprocess import load_data, clean_data, parse_coordinates, COORDINATE_FORMATS  # noqa: E402
+
+# Status codes and their rough share of rows in atlantic.csv.
+STATUSES = [" TS", " HU", " TD", " EX", " LO", " SS", " SD", " WV", " DB"]
+STATUS_WEIGHTS = [0.36, 0.34, 0.16, 0.09, 0.02, 0.01, 0.01, 0.005, 0.005]
+WIND_COLUMNS = [
+    f"{band} Wind {quadrant}"
+    for band in ("Low", "Moderate", "High")
+    for quadrant in ("NE", "SE", "SW", "NW")
+]
+
+
+def write_synthetic_atlantic(path, rows, seed=42):
+    """
+    Writes a CSV with the columns and value formats of the HURDAT atlantic.csv.
+    Args:
+        path (str): Output file.
+        rows (int): Number of rows.
+        seed (int): Random seed.
+    Returns: None
+    """
+    rng = np.random.default_rng(seed)
+    latitude = np.round(rng.uniform(-40, 60, rows), 1)
+    longitude = np.round(rng.uniform(-180, 180, rows), 1)
+    df = pd.DataFrame({
+        "ID": np.char.add("AL", (rng.integers(0, 99, rows) * 10000 + 1851).astype(str)),
+        "Name": "            UNNAMED",
+        "Date": rng.integers(18510625, 20151231, rows),
+        "Time": rng.choice([0, 600, 1200, 1800], rows),
+        "Event": " ",
+        "Status": rng.choice(STATUSES, rows, p=STATUS_WEIGHTS),
+        "Latitude": np.char.add(np.abs(latitude).astype(str), np.where(latitude >= 0, "N", "S")),
+        "Longitude": np.char.add(np.abs(longitude).astype(str), np.where(longitude >= 0, "E", "W")),
+        "Maximum Wind": rng.integers(10, 165, rows),
+        "Minimum Pressure": np.where(rng.random(rows) < 0.3, -999, rng.integers(880, 1020, rows)),
+    })
+    # As in the real archive, wind radii are either all recorded or all missing (-999) for a row.
+    has_radii = rng.random(rows) < 0.25
+    for column in WIND_COLUMNS:
+        df[column] = np.where(has_radii, rng.integers(0, 400, rows), -999)
+    df.to_csv(path, index=False)
+
+
+def to_numerical(coord):
+    """
+    The per-cell regex parser clean_data used before parse_coordinates.
+    Args:
+        coord (str): Coordinate such as '28.0N'.
+    Returns:
+        float: Signed coordinate.
+    """
+    direction = re.findall(r'[NSWE]', coord)[0]
+    num = re.match(r'[\d.]+', coord)[0]
+    return float(num) if direction in ['N', 'E'] else -float(num)
+
+
+def legacy_clean_data(df):
+    """
+    clean_data as it was before the vectorized coordinate parser, kept as the reference.
+    Args:
+        df (pd.DataFrame): Raw data.
+    Returns:
+        pd.DataFrame: Cleaned data.
+    """
+    df = df.replace(-999, np.nan)
+    df['Latitude'] = df['Latitude'].apply(to_numerical)
+    df['Longitude'] = df['Longitude'].apply(to_numerical)
+    df = df.drop(columns=['ID', 'Name', 'Date', 'Time', 'Event'], errors='ignore')
+    df = df.dropna()
+    df['Status'] = df['Status'].astype('category').cat.codes
+    return df
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def run(rows, seed=42):
+    """
+    Times legacy and vectorized cleaning on one synthetic file and checks they agree.
+    Args:
+        rows (int): Number of synthetic rows.
+        seed (int): Random seed.
+    Returns:
+        dict: Timings in seconds.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "atlantic.csv")
+        write_synthetic_atlantic(path, rows, seed)
+        df = load_data(path)
+
+    def legacy_coordinates():
+        return [df[column].apply(to_numerical).to_numpy() for column in COORDINATE_FORMATS]
+
+    def vectorized_coordinates():
+        return [parse_coordinates(df[column], *COORDINATE_FORMATS[column]) for column in COORDINATE_FORMATS]
+
+    legacy_parse_s, expected = timed(legacy_coordinates)
+    parse_s, got = timed(vectorized_coordinates)
+    for expected_column, got_column in zip(expected, got):
+        assert np.array_equal(expected_column, got_column)
+
+    legacy_s, expected = timed(legacy_clean_data, df)
+    vectorized_s, got = timed(clean_data, df)
+    pd.testing.assert_frame_equal(expected, got)
+
+    return {
+        "rows": rows,
+        "clean_rows": len(got),
+        "legacy_parse_s": legacy_parse_s,
+        "parse_s": parse_s,
+        "parse_speedup": legacy_parse_s / parse_s,
+        "legacy_s": legacy_s,
+        "vectorized_s": vectorized_s,
+        "speedup": legacy_s / vectorized_s
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark clean_data coordinate parsing.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000, 3_000_000])
+    args = parser.parse_args()
+
+    print(f"{'':>10} {'coordinates':^30} {'clean_data':^30}")
+    print(f"{'rows':>10} {'legacy s':>10} {'vector s':>10} {'speedup':>8} "
+          f"{'legacy s':>10} {'vector s':>10} {'speedup':>8}")
+    for n in args.rows:
+        r = run(n)
+        print(f"{r['rows']:>10} {r['legacy_parse_s']:>10.2f} {r['parse_s']:>10.2f} {r['parse_speedup']:>7.1f}x "
+              f"{r['legacy_s']:>10.2f} {r['vectorized_s']:>10.2f} {r['speedup']:>7.1f}x")
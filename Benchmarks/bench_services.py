@@ -0,0 +1,596 @@
+import argparse
+import asyncio
+import datetime
+import importlib
+import json
+import os
+import platform
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import joblib
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(ROOT, "Src"))
+sys.path.insert(0, os.path.join(ROOT, "App"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_preprocess import write_synthetic_atlantic  # noqa: E402
+
+PERCENTILES = (50, 95, 99)
+# Model the app loads, relative to the directory it runs from.
+MODEL_FILE = os.path.join("models", "cyclone_model.pkl")
+HTTP_SCENARIOS = ("predict", "real_time_prediction", "check_proximity", "forecast", "forecast_ensemble")
+WEATHER_SCENARIOS = ("current", "current_long_poll", "storms", "forecast", "forecast_ensemble")
+# Seconds long-polls get to reach the weather service and park before a state is
+# published; raise it for remote servers or many waiters.
+LONG_POLL_SETTLE = 0.5
+
+
+def summarize(latencies, wall_s, errors=0):
+    """
+    Args:
+        latencies (list): Per-operation latencies in seconds.
+        wall_s (float): Wall time of the whole run.
+        errors (int): Failed operations, not included in latencies.
+    Returns:
+        dict: Count, throughput and latency percentiles in milliseconds.
+    """
+    result = {"count": len(latencies), "errors": errors, "wall_s": wall_s,
+              "throughput_per_s": len(latencies) / wall_s if wall_s > 0 else 0.0}
+    if latencies:
+        ms = np.asarray(latencies) * 1000
+        result["mean_ms"] = float(ms.mean())
+        result.update({f"p{p}_ms": float(np.percentile(ms, p)) for p in PERCENTILES})
+    return result
+
+
+#############################################
+# Environment
+#############################################
+def train_stub_model(models_dir, rows=20_000, seed=42):
+    """
+    Trains a small forest on a synthetic atlantic.csv, with the features the app expects.
+    Args:
+        models_dir (str): Directory to save cyclone_model.pkl to.
+        rows (int): Synthetic rows.
+        seed (int): Random seed.
+    Returns:
+        str: Path of the saved model.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from preprocess import load_data, clean_data
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "atlantic.csv")
+        write_synthetic_atlantic(csv_path, rows, seed)
+        df = clean_data(load_data(csv_path))
+    model = RandomForestClassifier(n_estimators=50, max_depth=12, random_state=seed, n_jobs=1)
+    model.fit(df.drop(columns=["Status"]), df["Status"])
+    os.makedirs(models_dir, exist_ok=True)
+    path = os.path.join(models_dir, "cyclone_model.pkl")
+    joblib.dump(model, path)
+    return path
+
+
+def prepare_workdir(workdir, stub=False):
+    """
+    Picks the directory the app runs from: the repository when a trained model
+    exists there, otherwise a scratch directory with a stub model.
+    Args:
+        workdir (str): Scratch directory.
+        stub (bool): Use the stub model even if a trained one exists.
+    Returns:
+        tuple: (directory, whether the stub model is used)
+    """
+    if not stub and os.path.exists(os.path.join(ROOT, MODEL_FILE)):
+        return ROOT, False
+    train_stub_model(os.path.join(workdir, "models"))
+    return workdir, True
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+#############################################
+# Local SMTP sink
+#############################################
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        self.reply("220 bench-sink ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.strip().split(b" ", 1)[0].upper()
+            if command == b"EHLO":
+                self.wfile.write(b"250-bench-sink\r\n250 8BITMIME\r\n")
+            elif command == b"DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                self.server.count()
+                self.reply("250 OK")
+            elif command == b"QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    """
+    Minimal SMTP server on localhost that accepts and discards every message.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0):
+        super().__init__(("127.0.0.1", port), _SmtpHandler)
+        self.port = self.server_address[1]
+        self.received = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def count(self):
+        with self._lock:
+            self.received += 1
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+        return False
+
+
+def bench_alert_delivery(messages, workers):
+    """
+    Sends alerts through AlertDeliveryService to a local SmtpSink.
+    Args:
+        messages (int): Messages to send.
+        workers (int): Delivery workers (SMTP connections).
+    Returns:
+        dict: Throughput and queue-to-sent latencies.
+    """
+    from alert_delivery import AlertDeliveryService, SENT
+
+    with SmtpSink() as sink:
+        service = AlertDeliveryService("127.0.0.1", sink.port, "bench@example.com", use_tls=False, pool_size=workers)
+        start_wall = time.time()
+        start = time.perf_counter()
+        receipts = service.submit([f"user{i}@example.com" for i in range(messages)], "Bench", "Benchmark alert.")
+        for receipt in receipts:
+            receipt.wait(60)
+        wall = time.perf_counter() - start
+        service.close()
+    latencies = [r.sent_at - start_wall for r in receipts if r.status == SENT]
+    result = summarize(latencies, wall, messages - len(latencies))
+    result["workers"] = workers
+    return result
+
+
+#############################################
+# HTTP scenarios
+#############################################
+def jittered(weather, rng, scale=0.1):
+    """
+    Args:
+        weather (dict): Weather fields as served by the target.
+        rng (np.random.Generator): Random source.
+        scale (float): Largest relative change of each numeric field.
+    Returns:
+        dict: Numeric fields, each scaled by a random factor in [1 - scale, 1 + scale].
+    """
+    return {
+        name: float(value) * float(rng.uniform(1 - scale, 1 + scale))
+        for name, value in weather.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    }
+
+
+def make_requests(weather, rng):
+    """
+    Requests against App/app.py. Payloads are derived from the weather the
+    target itself serves, so the same requests work in-process and against a server.
+    Args:
+        weather (dict): Weather fields from the target's /real_time_prediction.
+        rng (np.random.Generator): Random source for request payloads.
+    Returns:
+        dict: Scenario name -> function of the request number returning (method, path, kwargs).
+    """
+    def check_proximity(i):
+        return "POST", "/check_proximity", {"json": {
+            "latitude": float(weather["Latitude"] + rng.normal(0, 1)),
+            "longitude": float(weather["Longitude"] + rng.normal(0, 1)),
+            "user_id": f"bench-{i % 1000}"
+        }}
+
+    return {
+        # Weather fields beyond the model's features are ignored by /predict.
+        "predict": lambda i: ("POST", "/predict", {"json": jittered(weather, rng)}),
+        "real_time_prediction": lambda i: ("GET", "/real_time_prediction", {}),
+        "check_proximity": check_proximity,
+        # Served from the forecast cache while the weather state is unchanged.
+        "forecast": lambda i: ("GET", "/forecast", {"params": {"hours": 24}}),
+        # A new seed per request forces a full ensemble simulation.
+        "forecast_ensemble": lambda i: ("GET", "/forecast", {"params": {
+            "mode": "ensemble", "hours": 24, "members": 1000, "seed": i
+        }}),
+    }
+
+
+def make_weather_requests(storms):
+    """
+    Requests against App/weather_api.py.
+    Args:
+        storms (int): Synthetic storms listed by the storms scenario.
+    Returns:
+        dict: Scenario name -> function of the request number returning (method, path, kwargs).
+    """
+    return {
+        "current": lambda i: ("GET", "/current", {}),
+        "storms": lambda i: ("GET", "/storms", {"params": {"limit": storms}}),
+        "forecast": lambda i: ("GET", "/forecast", {"params": {"hours": 24}}),
+        "forecast_ensemble": lambda i: ("GET", "/forecast", {"params": {
+            "mode": "ensemble", "hours": 24, "members": 1000, "seed": i
+        }}),
+    }
+
+
+async def drive(client, make_request, count, concurrency):
+    """
+    Sends count requests from concurrency workers as fast as they complete.
+    Args:
+        client (httpx.AsyncClient): Client bound to the app or a server.
+        make_request (callable): Request number -> (method, path, kwargs).
+        count (int): Requests to send.
+        concurrency (int): Requests in flight at once.
+    Returns:
+        dict: Throughput and latency percentiles.
+    """
+    latencies = []
+    errors = [0]
+    next_request = iter(range(count))
+
+    async def worker():
+        for i in next_request:
+            method, path, kwargs = make_request(i)
+            start = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            elapsed = time.perf_counter() - start
+            if response.status_code < 400:
+                latencies.append(elapsed)
+            else:
+                errors[0] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result = summarize(latencies, time.perf_counter() - start, errors[0])
+    result["concurrency"] = concurrency
+    return result
+
+
+async def drive_scenarios(client, requests, scenarios, count, concurrency, prefix=""):
+    results = {}
+    for name in scenarios:
+        # Warm-up requests fill caches and lazily built state before timing.
+        await drive(client, requests[name], min(20, count), 1)
+        results[prefix + name] = await drive(client, requests[name], count, concurrency)
+        print(f"{prefix + name:>26}: {format_result(results[prefix + name])}")
+    return results
+
+
+async def served_weather(client, timeout=30.0):
+    """
+    Args:
+        client (httpx.AsyncClient): Client bound to App/app.py.
+        timeout (float): Seconds to wait for the app's first weather update.
+    Returns:
+        dict: Weather fields the app currently serves.
+    """
+    deadline = time.perf_counter() + timeout
+    while True:
+        response = await client.get("/real_time_prediction")
+        if response.status_code == 200:
+            return response.json()["weather_data"]
+        if time.perf_counter() > deadline:
+            raise RuntimeError(f"No weather data from the app: HTTP {response.status_code}.")
+        await asyncio.sleep(0.1)
+
+
+async def bench_long_poll(client, waiters, rounds, wait=30.0, settle=LONG_POLL_SETTLE):
+    """
+    Parks waiters long-polls on /current, publishes a new state with
+    /simulate_cyclone and times how long each poll takes to be released.
+    Args:
+        client (httpx.AsyncClient): Client bound to App/weather_api.py.
+        waiters (int): Concurrent long-polls per round.
+        rounds (int): Publications.
+        wait (float): Long-poll timeout passed to /current.
+        settle (float): Seconds between starting the polls and publishing.
+    Returns:
+        dict: Releases per second and publish-to-release latencies.
+    """
+    latencies = []
+    errors = 0
+    busy = 0.0
+    # The first round is not timed: it opens the connections the others reuse.
+    for round_number in range(rounds + 1):
+        version = (await client.get("/current")).json()["version"]
+
+        async def poll():
+            response = await client.get("/current", params={"since": version, "wait": wait})
+            return time.perf_counter(), response.status_code
+
+        polls = [asyncio.create_task(poll()) for _ in range(waiters)]
+        # Give every poll time to reach the server and park.
+        await asyncio.sleep(settle)
+        published = time.perf_counter()
+        await client.post("/simulate_cyclone")
+        released = await asyncio.gather(*polls)
+        if round_number == 0:
+            continue
+        busy += max(arrived for arrived, _ in released) - published
+        for arrived, status in released:
+            if status != 200:
+                errors += 1
+            elif arrived >= published:  # Earlier ones were woken by the service's own updater.
+                latencies.append(arrived - published)
+    result = summarize(latencies, busy, errors)
+    result.update({"waiters": waiters, "rounds": rounds, "settle_s": settle})
+    return result
+
+
+#############################################
+# WebSocket fan-out
+#############################################
+class AsgiWebSocket:
+    """
+    In-memory WebSocket client talking to an ASGI app directly, recording
+    when each message the app sends arrives.
+    """
+    def __init__(self, app, path="/ws"):
+        self.app = app
+        self.path = path
+        self.received = asyncio.Queue()
+        self._incoming = asyncio.Queue()
+        self._accepted = asyncio.Event()
+        self._task = None
+
+    async def connect(self):
+        scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "path": self.path,
+            "raw_path": self.path.encode(), "root_path": "", "query_string": b"", "headers": [],
+            "client": ("127.0.0.1", 0), "server": ("bench", 80), "subprotocols": [],
+        }
+        self._task = asyncio.create_task(self.app(scope, self._incoming.get, self._send))
+        await self._incoming.put({"type": "websocket.connect"})
+        await self._accepted.wait()
+
+    async def _send(self, message):
+        if message["type"] == "websocket.accept":
+            self._accepted.set()
+        elif message["type"] == "websocket.send":
+            await self.received.put((time.perf_counter(), message.get("text")))
+
+    async def close(self):
+        await self._incoming.put({"type": "websocket.disconnect", "code": 1000})
+        await self._task
+
+
+async def bench_ws_broadcast(app_module, clients, messages):
+    """
+    Connects clients to /ws and publishes messages through broadcast_notification,
+    timing each delivery from publish to arrival.
+    Args:
+        app_module (module): Imported App/app.py.
+        clients (int): Connected clients.
+        messages (int): Messages broadcast, one after the other.
+    Returns:
+        dict: Delivery throughput and latency percentiles.
+    """
+    sockets = [AsgiWebSocket(app_module.app) for _ in range(clients)]
+    for socket in sockets:
+        await socket.connect()
+
+    async def publish(text):
+        sent = time.perf_counter()
+        await app_module.broadcast_notification(text)
+        delays = []
+        for socket in sockets:
+            # Skip weather updates the app pushes to every client in the meantime.
+            while True:
+                arrived, received = await asyncio.wait_for(socket.received.get(), 30)
+                if received == text:
+                    delays.append(arrived - sent)
+                    break
+        return delays
+
+    # The first message starts the per-connection writer tasks.
+    await publish("bench warm-up")
+    latencies = []
+    start = time.perf_counter()
+    for i in range(messages):
+        latencies.extend(await publish(f"bench {i}"))
+    wall = time.perf_counter() - start
+    for socket in sockets:
+        await socket.close()
+    result = summarize(latencies, wall)
+    result.update({"clients": clients, "messages": messages})
+    return result
+
+
+def format_result(result):
+    text = f"{result['throughput_per_s']:9.1f}/s"
+    if "p50_ms" in result:
+        text += "  " + "  ".join(f"p{p} {result[f'p{p}_ms']:8.2f} ms" for p in PERCENTILES)
+    if result["errors"]:
+        text += f"  errors {result['errors']}"
+    return text
+
+
+def client_for(target, base_url):
+    """
+    Args:
+        target: ASGI app to drive in-process, or None for a server.
+        base_url (str): Server URL when target is None.
+    Returns:
+        httpx.AsyncClient: Client without a connection limit, so long-polls do not queue behind each other.
+    """
+    import httpx
+
+    transport = httpx.ASGITransport(app=target) if target is not None else None
+    # Idle connections are dropped before uvicorn's 5 s keep-alive timeout closes them under us.
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None, keepalive_expiry=2.0)
+    return httpx.AsyncClient(transport=transport, base_url=base_url or "http://bench", timeout=60, limits=limits)
+
+
+async def bench_app(app_module, url, config):
+    async with client_for(app_module and app_module.app, url) as client:
+        weather = await served_weather(client)
+        requests = make_requests(weather, np.random.default_rng(config["seed"]))
+        results = await drive_scenarios(client, requests, config["scenarios"], config["count"], config["concurrency"])
+    if config["ws_clients"] and app_module is not None:
+        # Needs the in-process app: the broadcast is triggered from this process.
+        results["ws_broadcast"] = await bench_ws_broadcast(app_module, config["ws_clients"], config["ws_messages"])
+        print(f"{'ws_broadcast':>26}: {format_result(results['ws_broadcast'])}")
+    return results
+
+
+async def bench_weather_api(weather_module, weather_url, config):
+    async with client_for(weather_module and weather_module.app, weather_url) as client:
+        scenarios = config["weather_scenarios"]
+        if "storms" in scenarios:
+            total = (await client.get("/storms", params={"limit": 1})).json()["total"]
+            if total < config["storms"]:
+                await client.post("/storms", params={"count": config["storms"] - total})
+        requests = make_weather_requests(config["storms"])
+        results = await drive_scenarios(
+            client, requests, [name for name in scenarios if name in requests],
+            config["count"], config["concurrency"], prefix="weather_"
+        )
+        if "current_long_poll" in scenarios:
+            result = await bench_long_poll(
+                client, config["long_poll_waiters"], config["long_poll_rounds"], settle=config["long_poll_settle"]
+            )
+            results["weather_current_long_poll"] = result
+            print(f"{'weather_current_long_poll':>26}: {format_result(result)}")
+    return results
+
+
+def run(url=None, weather_url=None, scenarios=HTTP_SCENARIOS, weather_scenarios=WEATHER_SCENARIOS, count=500,
+        concurrency=16, ws_clients=200, ws_messages=20, storms=1000, long_poll_waiters=200, long_poll_rounds=5,
+        long_poll_settle=LONG_POLL_SETTLE, emails=2000, email_workers=8, stub=False, seed=42):
+    """
+    Runs the HTTP, WebSocket, long-poll and alert delivery benchmarks. Without
+    a URL a service is imported and driven in-process; with one, nothing of it
+    is imported and every payload comes from the server.
+    Args:
+        url (str): Base URL of a running App/app.py; None drives it in-process.
+        weather_url (str): Base URL of a running App/weather_api.py; None drives it in-process.
+        scenarios (list): App scenarios from HTTP_SCENARIOS.
+        weather_scenarios (list): Weather service scenarios from WEATHER_SCENARIOS.
+        count (int): Requests per HTTP scenario.
+        concurrency (int): Requests in flight at once.
+        ws_clients (int): WebSocket clients for the broadcast benchmark; 0 skips it.
+        ws_messages (int): Messages broadcast.
+        storms (int): Synthetic storms the weather service holds for the storms scenario.
+        long_poll_waiters (int): Concurrent /current long-polls per publication.
+        long_poll_rounds (int): Publications in the long-poll benchmark.
+        long_poll_settle (float): Seconds the long-polls get to park before each publication.
+        emails (int): Alert emails sent to the local sink; 0 skips it.
+        email_workers (int): Delivery workers.
+        stub (bool): Use a stub model even if a trained one exists.
+        seed (int): Random seed.
+    Returns:
+        dict: Environment description and results per benchmark.
+    """
+    config = {
+        "url": url, "weather_url": weather_url, "scenarios": list(scenarios),
+        "weather_scenarios": list(weather_scenarios), "count": count, "concurrency": concurrency,
+        "ws_clients": ws_clients, "ws_messages": ws_messages, "storms": storms,
+        "long_poll_waiters": long_poll_waiters, "long_poll_rounds": long_poll_rounds,
+        "long_poll_settle": long_poll_settle,
+        "emails": emails, "email_workers": email_workers, "seed": seed,
+    }
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": config,
+        "stub_model": None,
+        "results": {},
+    }
+    if scenarios or (ws_clients and url is None):
+        if url is None:
+            with tempfile.TemporaryDirectory() as tmp:
+                workdir, report["stub_model"] = prepare_workdir(tmp, stub)
+                previous = os.getcwd()
+                os.chdir(workdir)
+                try:
+                    # The app loads its model and starts its background threads on import.
+                    app_module = importlib.import_module("app")
+                    report["results"].update(asyncio.run(bench_app(app_module, None, config)))
+                finally:
+                    os.chdir(previous)
+        else:
+            report["results"].update(asyncio.run(bench_app(None, url, config)))
+    if weather_scenarios:
+        weather_module = importlib.import_module("weather_api") if weather_url is None else None
+        report["results"].update(asyncio.run(bench_weather_api(weather_module, weather_url, config)))
+    if emails:
+        result = bench_alert_delivery(emails, email_workers)
+        report["results"]["alert_delivery"] = result
+        print(f"{'alert_delivery':>26}: {format_result(result)}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the cyclone services and write the results as JSON.")
+    parser.add_argument("--url", help="Base URL of a running app (e.g. http://127.0.0.1:8001); default in-process.")
+    parser.add_argument("--weather-url", help="Base URL of a running weather service (e.g. http://127.0.0.1:8000); "
+                                              "default in-process. Its storms and state are modified.")
+    parser.add_argument("--scenarios", nargs="*", choices=HTTP_SCENARIOS, default=list(HTTP_SCENARIOS))
+    parser.add_argument("--weather-scenarios", nargs="*", choices=WEATHER_SCENARIOS, default=list(WEATHER_SCENARIOS))
+    parser.add_argument("--requests", type=int, default=500, help="Requests per HTTP scenario.")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--ws-clients", type=int, default=200)
+    parser.add_argument("--ws-messages", type=int, default=20)
+    parser.add_argument("--storms", type=int, default=1000)
+    parser.add_argument("--long-poll-waiters", type=int, default=200)
+    parser.add_argument("--long-poll-rounds", type=int, default=5)
+    parser.add_argument("--long-poll-settle", type=float, default=LONG_POLL_SETTLE)
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--email-workers", type=int, default=8)
+    parser.add_argument("--stub-model", action="store_true", help="Use a stub model even if a trained one exists.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON file (default Benchmarks/results/services-<commit>.json).")
+    args = parser.parse_args()
+
+    report = run(args.url, args.weather_url, args.scenarios, args.weather_scenarios, args.requests, args.concurrency,
+                 args.ws_clients, args.ws_messages, args.storms, args.long_poll_waiters, args.long_poll_rounds,
+                 args.long_poll_settle, args.emails, args.email_workers, args.stub_model, args.seed)
+    output = args.output or os.path.join(ROOT, "Benchmarks", "results", f"services-{report['commit'] or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
@@ -0,0 +1,85 @@
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "App"))
+
+from proximity import ProximityEngine, calculate_danger_radius  # noqa: E402
+
+# Same lat/lon box as RANGES in the weather services.
+LAT_RANGE = (8.0, 37.0)
+LON_RANGE = (68.0, 97.0)
+
+
+def best_of(fn, repeat):
+    """
+    Args:
+        fn (callable): Function to time.
+        repeat (int): Number of runs.
+    Returns:
+        tuple: (best wall time in seconds, last result)
+    """
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(n_users, n_storms=5, repeat=5, seed=42):
+    """
+    Times brute-force and grid-indexed zone classification for one population size.
+    Args:
+        n_users (int): Number of registered users.
+        n_storms (int): Number of storm centres queried.
+        repeat (int): Runs per measurement.
+        seed (int): Random seed.
+    Returns:
+        dict: Timings in milliseconds.
+    """
+    rng = np.random.default_rng(seed)
+    engine = ProximityEngine()
+    start = time.perf_counter()
+    engine.upsert_many(
+        [f"user-{i}" for i in range(n_users)],
+        rng.uniform(*LAT_RANGE, n_users),
+        rng.uniform(*LON_RANGE, n_users)
+    )
+    build_s = time.perf_counter() - start
+
+    storms = [
+        (rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE), rng.uniform(0, 10), rng.uniform(50, 300))
+        for _ in range(n_storms)
+    ]
+
+    def classify_all(use_index):
+        return [
+            engine.classify(lat, lon, calculate_danger_radius(severity, wind), use_index=use_index)
+            for lat, lon, severity, wind in storms
+        ]
+
+    brute_s, brute = best_of(lambda: classify_all(False), repeat)
+    index_s, indexed = best_of(lambda: classify_all(True), repeat)
+    for expected, got in zip(brute, indexed):
+        for zone in expected:
+            assert np.array_equal(np.sort(expected[zone]), np.sort(got[zone])), zone
+
+    return {
+        "users": n_users,
+        "storms": n_storms,
+        "build_ms": build_s * 1000,
+        "brute_force_ms": brute_s * 1000,
+        "indexed_ms": index_s * 1000,
+        "speedup": brute_s / index_s
+    }
+
+
+if __name__ == "__main__":
+    print(f"{'users':>10} {'build ms':>10} {'brute ms':>10} {'index ms':>10} {'speedup':>8}")
+    for n in (10_000, 100_000, 1_000_000):
+        r = run(n)
+        print(f"{r['users']:>10} {r['build_ms']:>10.1f} {r['brute_force_ms']:>10.2f} "
+              f"{r['indexed_ms']:>10.2f} {r['speedup']:>7.1f}x")
@@ -0,0 +1,112 @@
+import argparse
+import os
+import joblib
+import numpy as np
+from sklearn.neighbors import KDTree
+from preprocess import load_data, parse_coordinates, COORDINATE_FORMATS, NAN_VALUE
+
+ANALOG_INDEX_PATH = "../models/analog_index.pkl"
+# Wind radii are only recorded from 2004 on, so requiring them would drop most of the archive.
+ANALOG_FEATURES = ['Latitude', 'Longitude', 'Maximum Wind', 'Minimum Pressure']
+# Best-track fixes are six-hourly; a window of 4 covers the last 18 hours of a track.
+WINDOW = 4
+HORIZON = 8
+SYNOPTIC_TIMES = [0, 600, 1200, 1800]
+LEAF_SIZE = 40
+
+
+def load_tracks(df, features=ANALOG_FEATURES):
+    """
+    Parses the raw archive into time-ordered tracks of synoptic fixes.
+    :param df: Raw DataFrame as returned by load_data.
+    :param features: Columns to keep as track values.
+    :return: DataFrame with ID, Name, Date, Time and features, sorted by storm and time;
+             'Segment' numbers runs of consecutive fixes without missing values.
+    """
+    df = df[df['Time'].isin(SYNOPTIC_TIMES)].copy()
+    for column, (positive, negative, limit) in COORDINATE_FORMATS.items():
+        df[column] = parse_coordinates(df[column], positive, negative, limit)
+    df[features] = df[features].replace(NAN_VALUE, np.nan)
+    df['Name'] = df['Name'].str.strip()
+    df = df.sort_values(['ID', 'Date', 'Time'], kind='stable').reset_index(drop=True)
+
+    # A fix with a missing value splits its track, so windows never bridge a gap.
+    missing = df[features].isna().any(axis=1).to_numpy()
+    new_storm = np.r_[True, df['ID'].to_numpy()[1:] != df['ID'].to_numpy()[:-1]]
+    df['Segment'] = np.cumsum(new_storm | missing | np.r_[False, missing[:-1]])
+    return df[~missing].reset_index(drop=True)
+
+
+def window_starts(segments, window):
+    """
+    :param segments: Segment number of each fix, in track order.
+    :param window: Fixes per window.
+    :return: Row of the first fix of every window that lies within one segment.
+    """
+    segments = np.asarray(segments)
+    if len(segments) < window:
+        return np.empty(0, dtype=np.int64)
+    return np.flatnonzero(segments[:len(segments) - window + 1] == segments[window - 1:])
+
+
+def build_analog_index(df, features=ANALOG_FEATURES, window=WINDOW, horizon=HORIZON, leaf_size=LEAF_SIZE):
+    """
+    Indexes every sliding window of every track. Each window is the flattened
+    window x features block, with features standardised over the archive so
+    that no single unit dominates the distance.
+    :param df: Raw DataFrame as returned by load_data.
+    :param features: Track values compared between storms.
+    :param window: Fixes per window.
+    :param horizon: Fixes after a window returned as the storm's evolution.
+    :param leaf_size: KDTree leaf size.
+    :return: Dict of the tree and the track arrays, as read by App/analog_search.py.
+    """
+    tracks = load_tracks(df, features)
+    values = tracks[features].to_numpy(dtype=np.float64)
+    mean = values.mean(axis=0)
+    scale = values.std(axis=0)
+    scale[scale == 0] = 1.0
+
+    segments = tracks['Segment'].to_numpy()
+    starts = window_starts(segments, window)
+    normalized = (values - mean) / scale
+    windows = np.lib.stride_tricks.sliding_window_view(normalized, window, axis=0)[starts]
+    # sliding_window_view puts the window last; flatten fix by fix to match the query layout.
+    windows = np.ascontiguousarray(windows.transpose(0, 2, 1).reshape(len(starts), -1))
+
+    # End of each fix's segment bounds the evolution shown after a match.
+    segment_ends = np.searchsorted(segments, segments, side='right')
+    return {
+        'tree': KDTree(windows, leaf_size=leaf_size),
+        'features': list(features),
+        'window': window,
+        'horizon': horizon,
+        'mean': mean,
+        'scale': scale,
+        'starts': starts,
+        'segment_ends': segment_ends[starts],
+        'values': values.astype(np.float32),
+        'storm_ids': tracks['ID'].to_numpy(dtype=str),
+        'names': tracks['Name'].to_numpy(dtype=str),
+        'times': (tracks['Date'].to_numpy(np.int64) * 10000 + tracks['Time'].to_numpy(np.int64)),
+    }
+
+
+def save_analog_index(index, file_path):
+    """
+    :param index: Dict returned by build_analog_index.
+    :param file_path: Output file.
+    """
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    joblib.dump(index, file_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the historical analog index.")
+    parser.add_argument("--data", default="/mnt/c/Users/athul/Desktop/Disaster-Alert-and-Location-Monitoring-system/Data/atlantic.csv")
+    parser.add_argument("--output", default=ANALOG_INDEX_PATH)
+    args = parser.parse_args()
+
+    index = build_analog_index(load_data(args.data))
+    save_analog_index(index, args.output)
+    print(f"Indexed {len(index['starts'])} windows of {len(set(index['storm_ids']))} storms.")
@@ -1,6 +1,7 @@
 import joblib
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
-from preprocess import load_data, clean_data, split_data
+from feature_store import load_features
+from preprocess import load_status_encoding
 
 # Evaluate the model
 def evaluate_model(model, x_test, y_test):
@@ -13,10 +14,10 @@ def evaluate_model(model, x_test, y_test):
 
 if __name__ == "__main__":
     model_path = "../models/cyclone_model.pkl"  # Trained model file
+    status_encoding_path = "../models/status_encoding.json"  # Status codes the model was trained with
     data_path = "/mnt/c/Users/athul/Desktop/Disaster-Alert-and-Location-Monitoring-system/Data/atlantic.csv"  # Data file path for wsl
     #data_path = "C:/Users/athul/Desktop/Disaster-Alert-and-Location-Monitoring-system/Data/atlantic.csv"  # Data file path for windows
     model = joblib.load(model_path)  # Load trained model
-    df = load_data(data_path)  # Load raw data
-    clean_df = clean_data(df)  # Clean data
-    _, x_test, _, y_test = split_data(clean_df)  # Split data
+    status_labels = load_status_encoding(status_encoding_path)
+    _, x_test, _, y_test = load_features(data_path, status_labels=status_labels).split()  # Cleaned, split data from the feature store
     evaluate_model(model, x_test, y_test)  # Evaluate the model
@@ -0,0 +1,256 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from preprocess import (
+    load_data, clean_data, stream_clean_to_cache, load_cache, extend_status_labels,
+    NAN_VALUE, DROPPED_FEATURES
+)
+
+DEFAULT_STORE_DIR = "../feature_store"
+# Bump when clean_data changes in a way that alters its output.
+CLEANING_VERSION = 2
+TARGET_COLUMN = 'Status'
+SPLIT_RANDOM_STATE = 42
+FINGERPRINTS_FILE = 'fingerprints.json'
+SEEN_LABELS_FILE = 'seen_labels.json'
+META_FILE = 'meta.json'
+
+
+def file_sha256(file_path, block_size=1 << 20):
+    """
+    :param file_path: File to hash.
+    :param block_size: Bytes read at a time.
+    :return: Hex SHA-256 of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_fingerprint(file_path, store_dir):
+    """
+    Content hash of a source file. Hashes are remembered by path, size and
+    modification time, so an unchanged file is only read once.
+    :param file_path: Source CSV.
+    :param store_dir: Feature store directory holding the remembered hashes.
+    :return: Hex SHA-256 of the file contents.
+    """
+    path = os.path.abspath(file_path)
+    stat = os.stat(path)
+    index_path = os.path.join(store_dir, FINGERPRINTS_FILE)
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    entry = index.get(path)
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        return entry['sha256']
+
+    sha256 = file_sha256(path)
+    index[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256}
+    os.makedirs(store_dir, exist_ok=True)
+    with open(index_path + '.tmp', 'w') as f:
+        json.dump(index, f, indent=2)
+    os.replace(index_path + '.tmp', index_path)
+    return sha256
+
+
+def cleaning_config(test_size=0.2, chunksize=None, status_labels=None):
+    """
+    :param test_size: Fraction of data in the test split.
+    :param chunksize: Rows per chunk when cleaning is streamed; None cleans in memory.
+    :param status_labels: Status labels in code order the features are encoded with,
+        i.e. after extending any existing encoding with the labels in the data.
+    :return: Dict of every setting that affects the stored features.
+    """
+    return {
+        'cleaning_version': CLEANING_VERSION,
+        'nan_value': NAN_VALUE,
+        'dropped_features': DROPPED_FEATURES,
+        'target': TARGET_COLUMN,
+        'test_size': test_size,
+        'random_state': SPLIT_RANDOM_STATE,
+        # Streamed cleaning stores float32 features; in-memory cleaning keeps float64.
+        'streamed': chunksize is not None,
+        'status_labels': list(status_labels) if status_labels else None,
+    }
+
+
+def feature_key(fingerprint, config):
+    """
+    :param fingerprint: Hash of the source file.
+    :param config: Cleaning config.
+    :return: Key of the stored feature set.
+    """
+    payload = json.dumps({'source': fingerprint, 'config': config}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def _read_seen_labels(store_dir):
+    try:
+        with open(os.path.join(store_dir, SEEN_LABELS_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def remember_seen_labels(store_dir, base_key, seen):
+    """
+    Records the Status labels present in a cleaned source, so later calls can
+    work out the final encoding without cleaning the file again.
+    :param store_dir: Feature store directory.
+    :param base_key: Key of the source and cleaning config, without labels.
+    :param seen: Labels present in the cleaned data.
+    """
+    index = _read_seen_labels(store_dir)
+    index[base_key] = sorted(seen)
+    index_path = os.path.join(store_dir, SEEN_LABELS_FILE)
+    os.makedirs(store_dir, exist_ok=True)
+    with open(index_path + '.tmp', 'w') as f:
+        json.dump(index, f, indent=2)
+    os.replace(index_path + '.tmp', index_path)
+
+
+class FeatureSet:
+    """
+    Cleaned feature matrix, target and train/test split indices, as stored
+    by the feature store. Arrays loaded from the store are memory-mapped.
+    """
+    def __init__(self, X, y, train_idx, test_idx, meta):
+        self.X = X
+        self.y = y
+        self.train_idx = train_idx
+        self.test_idx = test_idx
+        self.meta = meta
+
+    @property
+    def feature_names(self):
+        return self.meta['feature_names']
+
+    def split(self):
+        """
+        :return: x_train, x_test, y_train, y_test, as split_data returns them.
+        """
+        names = self.feature_names
+        target = self.meta['target']
+        return (
+            pd.DataFrame(self.X[self.train_idx], columns=names, index=self.train_idx),
+            pd.DataFrame(self.X[self.test_idx], columns=names, index=self.test_idx),
+            pd.Series(self.y[self.train_idx], name=target, index=self.train_idx),
+            pd.Series(self.y[self.test_idx], name=target, index=self.test_idx),
+        )
+
+
+def build_features(file_path, test_size=0.2, chunksize=None, status_labels=None):
+    """
+    Cleans a source file and splits it the way split_data does.
+    :param file_path: Source CSV.
+    :param test_size: Fraction of data in the test split.
+    :param chunksize: Rows per chunk to stream the cleaning; None cleans in memory.
+    :param status_labels: Existing Status encoding to keep codes consistent with.
+    :return: FeatureSet held in memory.
+    """
+    if chunksize is None:
+        df = clean_data(load_data(file_path), status_labels)
+        labels = df.attrs['status_labels']
+        df = df.reset_index(drop=True)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_meta = stream_clean_to_cache(file_path, tmp, chunksize, status_labels)
+            df, _ = load_cache(tmp)
+            df = df.copy()
+        labels = cache_meta['status_labels']
+
+    features = df.drop(columns=[TARGET_COLUMN])
+    X = np.ascontiguousarray(features.to_numpy())
+    y = df[TARGET_COLUMN].to_numpy()
+    # Splitting row numbers with the same arguments gives the same rows as split_data.
+    train_idx, test_idx = train_test_split(
+        np.arange(len(y)), test_size=test_size, stratify=y, random_state=SPLIT_RANDOM_STATE
+    )
+    meta = {
+        'feature_names': list(features.columns),
+        'target': TARGET_COLUMN,
+        'status_labels': labels,
+        'rows': len(y),
+    }
+    return FeatureSet(X, y, train_idx, test_idx, meta)
+
+
+def save_features(feature_set, directory):
+    """
+    Writes a feature set as .npy files plus meta.json. The files are written
+    to a temporary directory first and moved into place, so readers never see
+    a partial store entry.
+    :param feature_set: FeatureSet to save.
+    :param directory: Final directory of the entry.
+    """
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent)
+    try:
+        for name in ('X', 'y', 'train_idx', 'test_idx'):
+            np.save(os.path.join(tmp, f'{name}.npy'), getattr(feature_set, name))
+        with open(os.path.join(tmp, META_FILE), 'w') as f:
+            json.dump(feature_set.meta, f, indent=2)
+        os.replace(tmp, directory)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.exists(os.path.join(directory, META_FILE)):
+            raise
+
+
+def open_features(directory):
+    """
+    :param directory: Directory of a saved feature set.
+    :return: FeatureSet whose arrays are memory-mapped read-only.
+    """
+    with open(os.path.join(directory, META_FILE)) as f:
+        meta = json.load(f)
+    arrays = [
+        np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+        for name in ('X', 'y', 'train_idx', 'test_idx')
+    ]
+    return FeatureSet(*arrays, meta)
+
+
+def load_features(file_path, store_dir=DEFAULT_STORE_DIR, test_size=0.2, chunksize=None, status_labels=None):
+    """
+    Returns the cleaned, split features of a source file, building and storing
+    them on the first call and memory-mapping the stored copy afterwards.
+    :param file_path: Source CSV.
+    :param store_dir: Feature store directory.
+    :param test_size: Fraction of data in the test split.
+    :param chunksize: Rows per chunk to stream the cleaning; None cleans in memory.
+    :param status_labels: Existing Status encoding to keep codes consistent with.
+    :return: FeatureSet; meta['status_labels'] holds the labels in code order.
+    """
+    # Entries are keyed by the final label order rather than the labels passed
+    # in, so a first run without an encoding and later runs with the encoding
+    # it saved share one entry.
+    fingerprint = source_fingerprint(file_path, store_dir)
+    base_key = feature_key(fingerprint, cleaning_config(test_size, chunksize))
+    seen = _read_seen_labels(store_dir).get(base_key)
+    if seen is not None:
+        config = cleaning_config(test_size, chunksize, extend_status_labels(status_labels, seen))
+        directory = os.path.join(store_dir, feature_key(fingerprint, config))
+        if os.path.exists(os.path.join(directory, META_FILE)):
+            return open_features(directory)
+
+    feature_set = build_features(file_path, test_size, chunksize, status_labels)
+    labels = feature_set.meta['status_labels']
+    config = cleaning_config(test_size, chunksize, labels)
+    key = feature_key(fingerprint, config)
+    directory = os.path.join(store_dir, key)
+    feature_set.meta.update({'key': key, 'source': os.path.abspath(file_path), 'config': config})
+    save_features(feature_set, directory)
+    remember_seen_labels(store_dir, base_key, [labels[code] for code in np.unique(feature_set.y)])
+    return open_features(directory)
@@ -1,9 +1,23 @@
+import argparse
+import json
 import os
 import joblib
+import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import GridSearchCV
 from imblearn.over_sampling import SMOTE
-from preprocess import load_data, clean_data, split_data
+from feature_store import load_features
+from preprocess import load_status_encoding, save_status_encoding
+from tuning import halving_search, fit_with_early_stopping
+
+MODEL_PATH = "../models/cyclone_model.pkl"
+# Flattened copy of the forest that the server memory-maps (App/forest_predictor.py).
+FOREST_DIR = "../models/cyclone_forest"
+FOREST_FORMAT_VERSION = 1
+# Columns of the exported node table, as read by App/forest_predictor.py.
+FOREST_NODE_COLUMNS = ("left", "right", "threshold", "feature")
+# Status label of each class code, saved next to the model and read by the server.
+STATUS_ENCODING_PATH = "../models/status_encoding.json"
 
 
 def oversample_data(x_train, y_train):
@@ -13,16 +27,21 @@ def oversample_data(x_train, y_train):
     return x_resampled, y_resampled
 
 
-def hyperparameter_tuning(x_train, y_train):
-    """Perform hyperparameter tuning using GridSearchCV."""
-    model = RandomForestClassifier(random_state=42, n_jobs=-1)
+def hyperparameter_tuning(x_train, y_train, mode="halving", n_jobs=-1):
+    """Tune and fit the forest, by successive halving (default) or exhaustive grid search."""
+    if mode == "halving":
+        best_params, _ = halving_search(x_train, y_train, n_jobs=n_jobs)
+        return fit_with_early_stopping(best_params, x_train, y_train, n_jobs=n_jobs)
+
+    # The search parallelises over fits, so each forest stays single-threaded.
+    model = RandomForestClassifier(random_state=42, n_jobs=1)
     param_grid = {
         "n_estimators": [100, 200, 300],
         "max_depth": [None, 10, 20],
         "max_features": ["sqrt", 0.1, 0.2],
         "class_weight": ["balanced", "balanced_subsample"],
     }
-    grid_search = GridSearchCV(model, param_grid, cv=3, scoring="accuracy", n_jobs=-1)
+    grid_search = GridSearchCV(model, param_grid, cv=3, scoring="accuracy", n_jobs=n_jobs)
     grid_search.fit(x_train, y_train)
     print("Best Parameters:", grid_search.best_params_)
     return grid_search.best_estimator_
@@ -34,18 +53,88 @@ def save_model(model, file_path):
     joblib.dump(model, file_path)
 
 
+def export_forest(model, directory):
+    """
+    Flatten a fitted RandomForestClassifier into one int32 table with a
+    16-byte row per node (FOREST_NODE_COLUMNS), so a traversal step reads a
+    single row. Thresholds are float32 bit patterns, rounded down so that
+    x <= threshold gives the same result as sklearn for every float32 x.
+    Leaf class probabilities are float32.
+    """
+    trees = [estimator.tree_ for estimator in model.estimators_]
+
+    node_counts = np.array([tree.node_count for tree in trees])
+    offsets = np.concatenate([[0], np.cumsum(node_counts)[:-1]])
+    total_nodes = int(node_counts.sum())
+    if total_nodes > np.iinfo(np.int32).max:
+        raise ValueError("Too many nodes for int32 node indices.")
+
+    nodes = np.empty((total_nodes, len(FOREST_NODE_COLUMNS)), dtype=np.int32)
+    left, right, threshold, feature = (nodes[:, i] for i in range(len(FOREST_NODE_COLUMNS)))
+    leaf_values = []
+    n_leaves = 0
+    for tree, offset in zip(trees, offsets):
+        block = slice(offset, offset + tree.node_count)
+        is_leaf = tree.children_left < 0
+        leaf_rows = n_leaves + np.arange(is_leaf.sum())
+        n_leaves += len(leaf_rows)
+
+        rounded = tree.threshold.astype(np.float32)
+        too_high = rounded > tree.threshold
+        rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+        rounded[is_leaf] = 0
+        feature[block] = np.where(is_leaf, 0, tree.feature)
+        threshold[block] = rounded.view(np.int32)
+        children = tree.children_left + offset
+        children[is_leaf] = -1 - leaf_rows
+        left[block] = children
+        right[block] = np.where(is_leaf, 0, tree.children_right + offset)
+
+        values = tree.value[is_leaf, 0, :]
+        leaf_values.append(values / values.sum(axis=1, keepdims=True))
+
+    os.makedirs(directory, exist_ok=True)
+    arrays = {
+        "nodes": nodes,
+        "roots": offsets.astype(np.int32),
+        "leaf_values": np.concatenate(leaf_values).astype(np.float32),
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f"{name}.npy"), array)
+    with open(os.path.join(directory, "meta.json"), "w") as f:
+        json.dump({
+            "version": FOREST_FORMAT_VERSION,
+            "classes": model.classes_.tolist(),
+            "feature_names": [str(name) for name in getattr(
+                model, "feature_names_in_", [f"x{i}" for i in range(model.n_features_in_)]
+            )],
+            "n_trees": len(trees),
+            "n_nodes": total_nodes,
+            "n_leaves": n_leaves,
+        }, f, indent=2)
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the cyclone status model.")
+    parser.add_argument("--tuning", choices=["halving", "grid"], default="halving",
+                        help="Hyperparameter search: successive halving with early stopping, or the full grid.")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Total CPU cores to use.")
+    args = parser.parse_args()
+
     file_path = "/mnt/c/Users/athul/Desktop/Disaster-Alert-and-Location-Monitoring-system/Data/atlantic.csv"
-    df = load_data(file_path)
-    clean_df = clean_data(df)
-    x_train, x_test, y_train, y_test = split_data(clean_df)
+    # Cleaned and split once per source file; later runs memory-map the stored copy.
+    # Retraining extends the existing Status encoding so class codes never change meaning.
+    features = load_features(file_path, status_labels=load_status_encoding(STATUS_ENCODING_PATH))
+    x_train, x_test, y_train, y_test = features.split()
 
     # Handle class imbalance
     x_train, y_train = oversample_data(x_train, y_train)
 
     # Train the model with hyperparameter tuning
-    model = hyperparameter_tuning(x_train, y_train)
+    model = hyperparameter_tuning(x_train, y_train, mode=args.tuning, n_jobs=args.n_jobs)
 
     # Save the best model
-    save_model(model, "../models/cyclone_model.pkl")
+    save_model(model, MODEL_PATH)
+    export_forest(model, FOREST_DIR)
+    save_status_encoding(features.meta["status_labels"], STATUS_ENCODING_PATH)
     print("Model training complete and saved.")
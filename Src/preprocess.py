@@ -1,9 +1,18 @@
+import json
+import os
 import pandas as pd
 import numpy as np
-import re
 from sklearn.model_selection import train_test_split
 
 
+NAN_VALUE = -999
+DROPPED_FEATURES = ['ID', 'Name', 'Date', 'Time', 'Event']
+# Rows per chunk when streaming; peak memory scales with this, not with the file.
+STREAM_CHUNKSIZE = 500_000
+CACHE_META_FILE = 'meta.json'
+STATUS_ENCODING_VERSION = 1
+
+
 def load_data(file_path):
     """
     :param file_path: Path to the CSV file containing cyclone data.
@@ -12,36 +21,251 @@ def load_data(file_path):
     return pd.read_csv(file_path)
 
 
-def clean_data(df):
+# Hemisphere letters (positive, negative) and magnitude limit of each coordinate column.
+COORDINATE_FORMATS = {
+    'Latitude': (b'N', b'S', 90.0),
+    'Longitude': (b'E', b'W', 180.0),
+}
+POWERS_OF_TEN = 10.0 ** np.arange(16)
+
+
+def parse_coordinates(values, positive=b'N', negative=b'S', limit=90.0):
+    """
+    Vectorized parser for HURDAT-style coordinates such as '28.0N' or '94.8W'.
+    The strings are viewed as a fixed-width byte matrix, validated with array
+    comparisons and converted with integer arithmetic, with no per-cell Python
+    code. Digits accumulate into an exact integer mantissa that is divided by a
+    power of ten once, which rounds exactly like float() on the same text.
+    :param values: Series or array of coordinate strings.
+    :param positive: Hemisphere letter of positive values.
+    :param negative: Hemisphere letter of negative values.
+    :param limit: Largest valid magnitude.
+    :return: float64 array of signed coordinates.
+    :raises ValueError: If any value is not digits with at most one '.', followed by a valid hemisphere letter.
+    """
+    values = pd.Series(values)
+    try:
+        # Non-string cells (e.g. NaN) become text like b'nan' and fail validation below.
+        raw = values.to_numpy(dtype='S')
+    except UnicodeEncodeError:
+        raise ValueError("Coordinates must be ASCII strings.")
+
+    n = len(raw)
+    width = raw.dtype.itemsize
+    codes = raw.view(np.uint8).reshape(n, width)
+    length = np.count_nonzero(codes, axis=1)
+    hemisphere = codes[np.arange(n), np.maximum(length - 1, 0)]
+
+    body = np.arange(width) < (length - 1)[:, None]
+    digits = (codes >= ord('0')) & (codes <= ord('9')) & body
+    dots = (codes == ord('.')) & body
+    n_digits = np.count_nonzero(digits, axis=1)
+    n_dots = np.count_nonzero(dots, axis=1)
+    valid = (
+        (length >= 2)
+        & ((hemisphere == positive[0]) | (hemisphere == negative[0]))
+        & digits[:, 0]
+        & (n_digits + n_dots == length - 1)
+        & (n_dots <= 1)
+        & (n_digits <= 15)  # Mantissa stays exact in float64.
+    )
+
+    mantissa = np.zeros(n, dtype=np.int64)
+    for column in range(width):
+        mantissa = np.where(digits[:, column], mantissa * 10 + (codes[:, column] - ord('0')), mantissa)
+    # Every body byte before the dot is a digit, so the dot index counts the integer digits.
+    decimals = np.where(n_dots > 0, n_digits - dots.argmax(axis=1), 0)
+    numbers = mantissa / POWERS_OF_TEN[np.minimum(decimals, 15)]
+
+    valid &= numbers <= limit
+    if not valid.all():
+        bad = values[~valid]
+        raise ValueError(f"{len(bad)} malformed coordinates, e.g. {bad.head().tolist()}")
+    return np.where(hemisphere == positive[0], numbers, -numbers)
+
+
+def extend_status_labels(known, seen):
+    """
+    Status labels in code order. Known labels keep their codes and unseen ones
+    are appended in sorted order, so with no known labels this is the sorted
+    order astype('category') uses.
+    :param known: Labels of an existing encoding, or None.
+    :param seen: Labels present in the data.
+    :return: List of labels; a label's code is its index.
+    """
+    known = list(known or [])
+    return known + sorted(set(seen) - set(known))
+
+
+def encode_status(labels_column, status_labels):
+    """
+    :param labels_column: Series of Status labels.
+    :param status_labels: Labels in code order.
+    :return: Integer codes (int8 while there are fewer than 128 labels).
+    """
+    codes = pd.Categorical(labels_column, categories=status_labels).codes
+    if (codes < 0).any():
+        raise ValueError(f"Status labels missing from the encoding: {set(labels_column[codes < 0])}")
+    return codes
+
+
+def save_status_encoding(status_labels, file_path):
+    """
+    Writes the Status encoding artifact that the server uses to decode predictions.
+    :param status_labels: Labels in code order.
+    :param file_path: Output JSON file, normally next to the model.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    with open(file_path, 'w') as f:
+        json.dump({'version': STATUS_ENCODING_VERSION, 'labels': list(status_labels)}, f, indent=2)
+
+
+def load_status_encoding(file_path):
+    """
+    :param file_path: Status encoding artifact.
+    :return: Labels in code order, or None if the file does not exist.
+    """
+    try:
+        with open(file_path) as f:
+            encoding = json.load(f)
+    except FileNotFoundError:
+        return None
+    if encoding.get('version') != STATUS_ENCODING_VERSION:
+        raise ValueError(f"Unsupported Status encoding version: {encoding.get('version')}")
+    return encoding['labels']
+
+
+def clean_data(df, status_labels=None):
     """
     :param df: Raw DataFrame.
-    :return: Cleaned DataFrame.
+    :param status_labels: Existing Status encoding to keep codes consistent with; None derives it from the data.
+    :return: Cleaned DataFrame; the Status labels in code order are in df.attrs['status_labels'].
     """
-    NaNvalue = -999
-    df = df.replace(NaNvalue, np.nan)
+    df = df.replace(NAN_VALUE, np.nan)
 
     # Convert Latitude and Longitude to numerical values
-    def to_numerical(coord):
-        direction = re.findall(r'[NSWE]', coord)[0]  # Extract direction
-        num = re.match(r'[\d.]+', coord)[0]         # Extract numeric value
-        return float(num) if direction in ['N', 'E'] else -float(num)
-
-    df['Latitude'] = df['Latitude'].apply(to_numerical)
-    df['Longitude'] = df['Longitude'].apply(to_numerical)
+    for column, (positive, negative, limit) in COORDINATE_FORMATS.items():
+        df[column] = parse_coordinates(df[column], positive, negative, limit)
 
     # Drop unnecessary columns
-    dropped_features = ['ID', 'Name', 'Date', 'Time', 'Event']
-    df = df.drop(columns=dropped_features, errors='ignore')
+    df = df.drop(columns=DROPPED_FEATURES, errors='ignore')
 
     # Drop rows with missing values
     df = df.dropna()
 
     # Encode the 'Status' column as a categorical feature
-    df['Status'] = df['Status'].astype('category').cat.codes
+    labels = extend_status_labels(status_labels, df['Status'].unique())
+    df['Status'] = encode_status(df['Status'], labels)
+    df.attrs['status_labels'] = labels
 
     return df
 
 
+def clean_chunk(chunk, status_codes):
+    """
+    Applies the clean_data steps to one chunk of a streamed file. Status labels
+    are encoded with a mapping shared by all chunks, so the same label gets the
+    same code everywhere; labels not seen before are appended to it.
+    :param chunk: Raw DataFrame chunk with float32 numeric columns.
+    :param status_codes: Dict of Status label -> provisional code, updated in place.
+    :return: Cleaned chunk with float32 features and int16 provisional Status codes.
+    """
+    chunk = chunk.replace(NAN_VALUE, np.nan)
+    for column, (positive, negative, limit) in COORDINATE_FORMATS.items():
+        chunk[column] = parse_coordinates(chunk[column], positive, negative, limit).astype(np.float32)
+    chunk = chunk.drop(columns=DROPPED_FEATURES, errors='ignore').dropna()
+
+    for label in chunk['Status'].unique():
+        status_codes.setdefault(label, len(status_codes))
+    chunk['Status'] = chunk['Status'].map(status_codes).astype(np.int16)
+    return chunk
+
+
+def _column_file(column):
+    return column.replace(' ', '_') + '.bin'
+
+
+def stream_clean_to_cache(file_path, cache_dir, chunksize=STREAM_CHUNKSIZE, status_labels=None):
+    """
+    Cleans a CSV too large for memory chunk by chunk and writes the result as a
+    columnar cache: one raw binary file per column plus a meta.json describing
+    them. Features are stored as float32 and Status as int8 codes. The codes
+    match clean_data, i.e. extend_status_labels over every label in the file,
+    which is only known after the last chunk, so they are remapped in a final
+    chunked pass over the Status column.
+    :param file_path: Path to the CSV file containing cyclone data.
+    :param cache_dir: Directory to write the cache to.
+    :param chunksize: Rows read per chunk.
+    :param status_labels: Existing Status encoding to keep codes consistent with.
+    :return: The cache metadata.
+    """
+    header = pd.read_csv(file_path, nrows=0).columns
+    columns = [column for column in header if column not in DROPPED_FEATURES]
+    text_columns = set(COORDINATE_FORMATS) | {'Status'}
+    dtypes = {column: str if column in text_columns else np.float32 for column in columns}
+
+    os.makedirs(cache_dir, exist_ok=True)
+    status_codes = {}
+    rows = 0
+    files = {column: open(os.path.join(cache_dir, _column_file(column)), 'wb') for column in columns}
+    try:
+        for chunk in pd.read_csv(file_path, usecols=columns, dtype=dtypes, chunksize=chunksize):
+            chunk = clean_chunk(chunk, status_codes)
+            for column in columns:
+                chunk[column].to_numpy().tofile(files[column])
+            rows += len(chunk)
+    finally:
+        for f in files.values():
+            f.close()
+
+    labels = extend_status_labels(status_labels, status_codes)
+    status_dtype = np.int8 if len(labels) <= np.iinfo(np.int8).max else np.int16
+    final_codes = {label: code for code, label in enumerate(labels)}
+    remap = np.empty(len(status_codes), dtype=status_dtype)
+    for label, provisional_code in status_codes.items():
+        remap[provisional_code] = final_codes[label]
+    status_path = os.path.join(cache_dir, _column_file('Status'))
+    provisional = np.fromfile(status_path, dtype=np.int16) if rows == 0 else \
+        np.memmap(status_path, dtype=np.int16, mode='r', shape=(rows,))
+    with open(status_path + '.tmp', 'wb') as f:
+        for start in range(0, rows, chunksize):
+            remap[provisional[start:start + chunksize]].tofile(f)
+    del provisional
+    os.replace(status_path + '.tmp', status_path)
+
+    column_dtypes = {column: np.dtype(np.float32).name for column in columns}
+    column_dtypes['Status'] = np.dtype(status_dtype).name
+    meta = {
+        'source': os.path.abspath(file_path),
+        'rows': rows,
+        'columns': columns,
+        'dtypes': column_dtypes,
+        'files': {column: _column_file(column) for column in columns},
+        'status_labels': labels,
+    }
+    with open(os.path.join(cache_dir, CACHE_META_FILE), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def load_cache(cache_dir):
+    """
+    Loads a cache written by stream_clean_to_cache. Columns are memory-mapped,
+    so only the pages that are used are read.
+    :param cache_dir: Cache directory.
+    :return: (cleaned DataFrame, cache metadata)
+    """
+    with open(os.path.join(cache_dir, CACHE_META_FILE)) as f:
+        meta = json.load(f)
+    data = {}
+    for column in meta['columns']:
+        path = os.path.join(cache_dir, meta['files'][column])
+        dtype = np.dtype(meta['dtypes'][column])
+        data[column] = np.memmap(path, dtype=dtype, mode='r', shape=(meta['rows'],)) if meta['rows'] \
+            else np.empty(0, dtype=dtype)
+    return pd.DataFrame(data, columns=meta['columns']), meta
+
+
 def split_data(df, target_column='Status', test_size=0.2):
     """
     Split the dataset into training and testing sets.
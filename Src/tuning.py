@@ -0,0 +1,191 @@
+import contextlib
+import os
+import sys
+import time
+import warnings
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import ParameterSampler, StratifiedKFold
+
+try:
+    import resource
+except ImportError:  # Windows has no resource module; peak memory is then not logged.
+    resource = None
+
+# Search space of the successive-halving mode; a superset of the old grid.
+PARAM_SPACE = {
+    "max_depth": [None, 10, 20, 30],
+    "max_features": ["sqrt", 0.1, 0.2, 0.3],
+    "class_weight": ["balanced", "balanced_subsample"],
+    "min_samples_leaf": [1, 2, 4],
+}
+N_CANDIDATES = 27
+MIN_ESTIMATORS = 25
+MAX_ESTIMATORS = 300
+HALVING_FACTOR = 3
+# Bytes of one sklearn tree node struct, for the per-trial memory log.
+TREE_NODE_BYTES = 64
+
+
+@contextlib.contextmanager
+def warm_start_warnings_ignored():
+    """
+    Each warm-started forest is always refit on the same data, which is the case
+    sklearn's warning about balanced class weights with warm_start allows for.
+    The filter is restored on exit, so importing this module changes nothing.
+    """
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message='class_weight presets "balanced"', category=UserWarning)
+        yield
+
+
+def parallel_budget(n_jobs, n_tasks):
+    """
+    Splits a core budget between concurrent trials and the threads of each forest,
+    so that outer * inner never exceeds it.
+    :param n_jobs: Total cores to use; -1 or None uses all of them.
+    :param n_tasks: Number of trials that could run at once.
+    :return: (outer, inner) job counts.
+    """
+    total = os.cpu_count() if n_jobs in (None, -1) else n_jobs
+    outer = max(1, min(n_tasks, total))
+    return outer, max(1, total // outer)
+
+
+def forest_nbytes(forest):
+    """
+    :param forest: Fitted RandomForestClassifier.
+    :return: Approximate bytes held by its trees.
+    """
+    total = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        total += tree.node_count * (TREE_NODE_BYTES + tree.n_outputs * tree.max_n_classes * 8)
+    return total
+
+
+def peak_rss_mb():
+    """
+    :return: Peak resident memory of this process in MB, or None where it is not available.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux.
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def _run_trial(forest, n_estimators, fold, n_jobs):
+    x_fit, y_fit, x_val, y_val = fold
+    start = time.perf_counter()
+    # warm_start: only the trees beyond the previous rung are grown.
+    forest.set_params(n_estimators=n_estimators, n_jobs=n_jobs)
+    forest.fit(x_fit, y_fit)
+    score = forest.score(x_val, y_val)
+    return time.perf_counter() - start, score, forest_nbytes(forest)
+
+
+def halving_search(x_train, y_train, n_candidates=N_CANDIDATES, cv=3, n_jobs=-1,
+                   factor=HALVING_FACTOR, random_state=42):
+    """
+    Successive-halving search over PARAM_SPACE with n_estimators as the resource.
+    Every candidate starts with MIN_ESTIMATORS trees per fold; after each rung only
+    the best 1/factor survive, and their forests are warm-started with factor times
+    more trees instead of being refit from scratch.
+    :param x_train: Training features.
+    :param y_train: Training labels.
+    :param n_candidates: Parameter sets sampled from PARAM_SPACE.
+    :param cv: Number of stratified folds.
+    :param n_jobs: Total core budget.
+    :param factor: Share of candidates kept per rung is 1/factor; trees grow by factor.
+    :param random_state: Seed of the sampling, folds and forests.
+    :return: (best parameters, list of per-trial log records)
+    """
+    X = np.ascontiguousarray(x_train, dtype=np.float32)
+    y = np.asarray(y_train)
+    candidates = list(ParameterSampler(PARAM_SPACE, n_candidates, random_state=random_state))
+    folds = [
+        (X[fit], y[fit], X[val], y[val])
+        for fit, val in StratifiedKFold(cv, shuffle=True, random_state=random_state).split(X, y)
+    ]
+    forests = {
+        (c, f): RandomForestClassifier(warm_start=True, random_state=random_state, **candidates[c])
+        for c in range(len(candidates)) for f in range(cv)
+    }
+
+    alive = list(range(len(candidates)))
+    n_estimators = MIN_ESTIMATORS
+    history = []
+    rung = 0
+    while True:
+        tasks = [(c, f) for c in alive for f in range(cv)]
+        outer, inner = parallel_budget(n_jobs, len(tasks))
+        with warm_start_warnings_ignored():
+            results = Parallel(n_jobs=outer, prefer="threads")(
+                delayed(_run_trial)(forests[task], n_estimators, folds[task[1]], inner) for task in tasks
+            )
+        scores = {c: [] for c in alive}
+        for (c, f), (wall, score, nbytes) in zip(tasks, results):
+            scores[c].append(score)
+            history.append({
+                "rung": rung, "candidate": c, "fold": f, "n_estimators": n_estimators,
+                "wall_s": wall, "score": score, "forest_mb": nbytes / 2**20
+            })
+            print(f"rung {rung} candidate {c:>2} fold {f} trees {n_estimators:>3} "
+                  f"{wall:7.2f}s acc {score:.4f} forest {nbytes / 2**20:7.1f} MB")
+        rss = peak_rss_mb()
+        print(f"rung {rung}: {len(alive)} candidates, {outer}x{inner} jobs, "
+              f"peak RSS {'n/a' if rss is None else f'{rss:.0f} MB'}")
+
+        ranked = sorted(alive, key=lambda c: np.mean(scores[c]), reverse=True)
+        alive = ranked[:max(1, len(alive) // factor)]
+        for c in ranked[len(alive):]:
+            for f in range(cv):
+                del forests[c, f]
+        if len(alive) == 1 or n_estimators >= MAX_ESTIMATORS:
+            break
+        n_estimators = min(n_estimators * factor, MAX_ESTIMATORS)
+        rung += 1
+
+    best = candidates[alive[0]]
+    print("Best Parameters:", best)
+    return best, history
+
+
+def fit_with_early_stopping(params, x_train, y_train, n_jobs=-1, step=MIN_ESTIMATORS,
+                            max_estimators=MAX_ESTIMATORS, tol=1e-4, patience=2, random_state=42):
+    """
+    Fits the final forest by warm-starting it step trees at a time and stopping
+    once the out-of-bag accuracy has not improved by tol for patience steps.
+    :param params: Forest parameters.
+    :param x_train: Training features.
+    :param y_train: Training labels.
+    :param n_jobs: Threads for the forest.
+    :param step: Trees added per step.
+    :param max_estimators: Upper bound on the number of trees.
+    :param tol: Smallest OOB improvement that counts.
+    :param patience: Steps without improvement before stopping.
+    :param random_state: Seed of the forest.
+    :return: Fitted RandomForestClassifier.
+    """
+    forest = RandomForestClassifier(
+        warm_start=True, oob_score=True, n_jobs=n_jobs, random_state=random_state, **params
+    )
+    best_score = -np.inf
+    stale = 0
+    for n_estimators in range(step, max_estimators + 1, step):
+        start = time.perf_counter()
+        forest.set_params(n_estimators=n_estimators)
+        with warm_start_warnings_ignored():
+            forest.fit(x_train, y_train)
+        print(f"final fit: {n_estimators:>3} trees, OOB acc {forest.oob_score_:.4f}, "
+              f"{time.perf_counter() - start:.2f}s, forest {forest_nbytes(forest) / 2**20:.1f} MB")
+        if forest.oob_score_ > best_score + tol:
+            best_score = forest.oob_score_
+            stale = 0
+        else:
+            stale += 1
+            if stale >= patience:
+                break
+    return forest
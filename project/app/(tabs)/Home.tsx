@@ -153,37 +153,103 @@ export default function HomeScreen() {
   // We track if we've already triggered the alert once.
   const [alertTriggered, setAlertTriggered] = useState(false);
 
-  // -------------- Fetch Real-Time Prediction --------------
+  // -------------- Real-Time Prediction --------------
+  const API_HOST = '192.168.168.251:8001';
+
+  const applyPrediction = (data: any) => {
+    setPrediction(data);
+
+    // Convert timestamp
+    const ts = data.timestamp ? new Date(data.timestamp) : new Date();
+    const formattedTime = ts.toLocaleTimeString([], {
+      hour: '2-digit',
+      minute: '2-digit',
+      second: '2-digit',
+      hour12: true,
+    });
+    setLastUpdatedTime(formattedTime);
+    setIsInitialLoad(false);
+  };
+
   const fetchData = async () => {
     try {
-      const response = await fetch('http://192.168.168.251:8001/real_time_prediction');
+      const response = await fetch(`http://${API_HOST}/real_time_prediction`);
       const data = await response.json();
       if (data) {
-        setPrediction(data);
-
-        // Convert timestamp
-        const ts = data.timestamp ? new Date(data.timestamp) : new Date();
-        const formattedTime = ts.toLocaleTimeString([], {
-          hour: '2-digit',
-          minute: '2-digit',
-          second: '2-digit',
-          hour12: true,
-        });
-        setLastUpdatedTime(formattedTime);
-        if (isInitialLoad) {
-          setIsInitialLoad(false);
-        }
+        applyPrediction(data);
       }
     } catch (err) {
       console.error('Error fetching real-time prediction:', err);
     }
   };
 
-  // Initiate the fetch, then poll every 10s
+  // Subscribe to pushed weather updates instead of polling. The server sends a
+  // snapshot, then deltas of the changed fields; a gap in versions triggers a resync.
   useEffect(() => {
-    fetchData();
-    const intervalId = setInterval(fetchData, 10000);
-    return () => clearInterval(intervalId);
+    let ws: WebSocket | null = null;
+    let unmounted = false;
+    let retryTimer: ReturnType<typeof setTimeout> | undefined;
+    let current: any = { version: -1, weather_data: {}, cyclone_prediction: null };
+
+    const connect = () => {
+      ws = new WebSocket(`ws://${API_HOST}/ws`);
+      ws.onopen = () => {
+        ws?.send(JSON.stringify({ action: 'subscribe', channel: 'weather' }));
+      };
+      ws.onmessage = (event) => {
+        let message: any;
+        try {
+          message = JSON.parse(event.data);
+        } catch {
+          return; // Plain-text alerts and echoes.
+        }
+        if (message.type === 'snapshot') {
+          current = {
+            version: message.version,
+            timestamp: message.timestamp,
+            weather_data: message.weather_data,
+            cyclone_prediction: message.cyclone_prediction,
+          };
+        } else if (message.type === 'delta') {
+          if (message.version <= current.version) {
+            return;
+          }
+          if (message.base_version !== current.version) {
+            ws?.send(JSON.stringify({ action: 'resync', channel: 'weather' }));
+            return;
+          }
+          const weatherData = { ...current.weather_data, ...message.changes };
+          (message.removed || []).forEach((key: string) => delete weatherData[key]);
+          current = {
+            version: message.version,
+            weather_data: weatherData,
+            cyclone_prediction: message.cyclone_prediction ?? current.cyclone_prediction,
+          };
+        } else {
+          return;
+        }
+        if (Object.keys(current.weather_data).length > 0) {
+          applyPrediction(current);
+        }
+      };
+      ws.onerror = (error) => console.log('WebSocket error:', error);
+      ws.onclose = () => {
+        if (!unmounted) {
+          // Fall back to a single fetch while reconnecting.
+          fetchData();
+          retryTimer = setTimeout(connect, 5000);
+        }
+      };
+    };
+
+    connect();
+    return () => {
+      unmounted = true;
+      if (retryTimer) {
+        clearTimeout(retryTimer);
+      }
+      ws?.close();
+    };
   }, []);
 
   // Hardcode status to 6 for demonstration